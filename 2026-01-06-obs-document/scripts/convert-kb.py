@@ -2,13 +2,51 @@
 """
 Convert HTML files to markdown using trafilatura.
 
+Only files that are new or changed since the last run (or converted with
+another converter version or options) are converted; see manifest.py.
+
 Usage:
     uv run scripts/convert-kb.py
+    uv run scripts/convert-kb.py --force   # Reconvert everything
 """
 
+import argparse
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
 import trafilatura
+from trafilatura.settings import Extractor
+
+from manifest import Manifest
+from runner import Runner
+
+# Bump when the conversion changes in a way the options don't capture
+CONVERTER = f"convert-kb/1 trafilatura/{trafilatura.__version__}"
+EXTRACT_OPTIONS = {
+    'output_format': 'markdown',
+    'include_comments': False,
+    'include_tables': True,
+    'include_images': True,
+    'include_links': True,
+}
+
+
+_extractor = None  # Per worker process, see init_worker()
+
+
+def init_worker():
+    """Build the trafilatura options once per worker instead of in every extract() call."""
+    global _extractor
+    _extractor = Extractor(
+        output_format=EXTRACT_OPTIONS['output_format'],
+        comments=EXTRACT_OPTIONS['include_comments'],
+        tables=EXTRACT_OPTIONS['include_tables'],
+        images=EXTRACT_OPTIONS['include_images'],
+        links=EXTRACT_OPTIONS['include_links'],
+    )
+
+
+def output_path(html_path: Path, html_root: Path, md_root: Path) -> Path:
+    return md_root / html_path.relative_to(html_root).with_suffix('.md')
+
 
 def convert_file(html_path: Path, html_root: Path, md_root: Path) -> tuple[Path, bool, str]:
     """
@@ -18,23 +56,16 @@ def convert_file(html_path: Path, html_root: Path, md_root: Path) -> tuple[Path,
         (output_path, success, error_message)
     """
     try:
-        # Calculate relative path and output path
-        rel_path = html_path.relative_to(html_root)
-        md_path = md_root / rel_path.with_suffix('.md')
+        md_path = output_path(html_path, html_root, md_root)
 
         # Create output directory
         md_path.parent.mkdir(parents=True, exist_ok=True)
 
         # Read HTML and convert to markdown
         html_content = html_path.read_text(encoding='utf-8')
-        markdown = trafilatura.extract(
-            html_content,
-            output_format='markdown',
-            include_comments=False,
-            include_tables=True,
-            include_images=True,
-            include_links=True,
-        )
+        if _extractor is None:
+            init_worker()
+        markdown = trafilatura.extract(html_content, options=_extractor)
 
         if markdown:
             md_path.write_text(markdown, encoding='utf-8')
@@ -47,10 +78,16 @@ def convert_file(html_path: Path, html_root: Path, md_root: Path) -> tuple[Path,
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Convert OBS KB HTML files to markdown")
+    parser.add_argument('--force', action='store_true', help="Reconvert all files, even unchanged ones")
+    parser.add_argument('--workers', '-j', type=int, help="Worker processes (default: available cores)")
+    args = parser.parse_args()
+
     # Define paths
     base_dir = Path(__file__).parent.parent
     html_root = base_dir / 'data' / 'html' / 'obsproject.com' / 'kb'
     md_root = base_dir / 'data' / 'md' / 'obsproject.com' / 'kb'
+    manifest = Manifest(base_dir / 'data' / 'md-manifest.json', html_root, md_root, CONVERTER, EXTRACT_OPTIONS)
 
     # Find all HTML files (exclude category pages and pagination)
     html_files = [
@@ -58,8 +95,16 @@ def main():
         if 'category' not in f.parts  # Skip category index pages
     ]
 
-    total = len(html_files)
-    print(f"Found {total} HTML files to convert")
+    # Drop outputs of pages that are gone, then skip the unchanged ones
+    removed = manifest.prune(html_files)
+    pending = [
+        f for f in html_files
+        if args.force or not manifest.is_current(f, output_path(f, html_root, md_root))
+    ]
+    skipped = len(html_files) - len(pending)
+
+    total = len(pending)
+    print(f"Found {len(html_files)} HTML files, {total} to convert ({skipped} unchanged)")
     print(f"Input:  {html_root}")
     print(f"Output: {md_root}")
     print()
@@ -69,28 +114,25 @@ def main():
     error_count = 0
     errors = []
 
-    with ProcessPoolExecutor(max_workers=4) as executor:
-        # Submit all tasks
-        futures = {
-            executor.submit(convert_file, html_file, html_root, md_root): html_file
-            for html_file in html_files
-        }
-
+    runner = Runner(convert_file, init_worker, args.workers)
+    try:
         # Process results as they complete
-        for i, future in enumerate(as_completed(futures), 1):
-            html_file = futures[future]
-            md_path, success, error_msg = future.result()
-
+        for i, (html_file, (md_path, success, error_msg)) in enumerate(runner.run(pending, html_root, md_root), 1):
             if success:
                 success_count += 1
                 status = "OK"
+                manifest.record(html_file, md_path)
             else:
                 error_count += 1
                 status = "ERR"
                 errors.append((html_file.name, error_msg))
+                manifest.forget(html_file)
 
             # Show progress
             print(f"[{i}/{total}] {status} {html_file.name}")
+    finally:
+        # Keep what was converted even if the run is interrupted
+        manifest.save()
 
     # Summary
     print()
@@ -98,6 +140,10 @@ def main():
     print(f"Conversion complete!")
     print(f"  Success: {success_count}")
     print(f"  Errors:  {error_count}")
+    print(f"  Skipped: {skipped} unchanged")
+    print(f"  Removed: {len(removed)} (source gone)")
+    if runner.pages:
+        print(f"  Rate:    {runner.rate:.1f} pages/s ({runner.workers} workers, {runner.elapsed:.1f}s)")
 
     if errors:
         print()
@@ -0,0 +1,103 @@
+"""
+Process pool for the conversion scripts.
+
+The pool is sized from the cores this process may run on, and the
+converter is set up once per worker process (initializer) instead of for
+every page. Files are submitted largest first, in chunks, with at most
+IN_FLIGHT_PER_WORKER chunks per worker queued at a time: the biggest pages
+start right away instead of ending up as the last lone tasks, and the
+small ones at the end keep every worker busy until the pool drains.
+Chunks are cut by total size, not file count, so a chunk of the largest
+pages isn't many times the work of the others.
+"""
+
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+IN_FLIGHT_PER_WORKER = 2
+MAX_CHUNK = 16  # Files per task, at most
+
+
+def available_cpus() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0  # Gone since it was listed; convert reports the error
+
+
+def _convert_chunk(convert, files: list[Path], args: tuple) -> list:
+    return [convert(f, *args) for f in files]
+
+
+class Runner:
+    def __init__(self, convert, initializer=None, workers: int | None = None):
+        """convert(path, *args) runs in the workers; initializer() once in each worker."""
+        self.convert = convert
+        self.initializer = initializer
+        self.workers = workers or available_cpus()
+        self.pages = 0
+        self.elapsed = 0.0
+
+    @property
+    def rate(self) -> float:
+        """Pages converted per second."""
+        return self.pages / self.elapsed if self.elapsed else 0.0
+
+    def _chunks(self, files: list[Path]) -> list[list[Path]]:
+        sizes = {f: _size(f) for f in files}
+        files = sorted(files, key=sizes.get, reverse=True)
+        # At least ~4 chunks' worth of bytes per worker, so the work evens out
+        target = sum(sizes.values()) / (self.workers * 4)
+        chunks, chunk, chunk_bytes = [], [], 0
+        for f in files:
+            chunk.append(f)
+            chunk_bytes += sizes[f]
+            if chunk_bytes >= target or len(chunk) >= MAX_CHUNK:
+                chunks.append(chunk)
+                chunk, chunk_bytes = [], 0
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def run(self, files: list[Path], *args):
+        """Yield (path, convert(path, *args)) for each file, as its chunk finishes."""
+        start = time.perf_counter()
+        chunks = self._chunks(files)
+        self.workers = max(1, min(self.workers, len(chunks)))
+        try:
+            if self.workers == 1:
+                # Not worth a pool; also easier to debug
+                if self.initializer:
+                    self.initializer()
+                for chunk in chunks:
+                    for path in chunk:
+                        yield path, self.convert(path, *args)
+                        self.pages += 1
+                return
+
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer) as executor:
+                queued = iter(chunks)
+                in_flight = {}
+                while True:
+                    for chunk in queued:
+                        in_flight[executor.submit(_convert_chunk, self.convert, chunk, args)] = chunk
+                        if len(in_flight) >= self.workers * IN_FLIGHT_PER_WORKER:
+                            break
+                    if not in_flight:
+                        break
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        chunk = in_flight.pop(future)
+                        for path, result in zip(chunk, future.result()):
+                            yield path, result
+                            self.pages += 1
+        finally:
+            self.elapsed = time.perf_counter() - start
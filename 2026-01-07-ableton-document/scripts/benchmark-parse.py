@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Compare the two ways convert-manual.py extracts #chapter_content.
+
+For every downloaded page, times the lxml path and the BeautifulSoup
+html.parser path (extraction alone, and with the markdown conversion),
+single-threaded, and checks that both give the same markdown.
+
+Usage:
+    uv run scripts/benchmark-parse.py
+    uv run scripts/benchmark-parse.py --repeat 3 --limit 10
+"""
+
+import argparse
+import importlib
+import time
+from pathlib import Path
+
+convert = importlib.import_module('convert-manual')
+
+
+def timed(fn, arg, repeat: int):
+    """(result, best time in seconds) over repeat runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark lxml vs html.parser extraction of the Ableton manual")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per page; the fastest counts (default: 1)")
+    parser.add_argument('--limit', type=int, help="Only the first N pages")
+    args = parser.parse_args()
+
+    base_dir = Path(__file__).parent.parent
+    html_root = base_dir / 'data' / 'html' / 'www.ableton.com' / 'en' / 'live-manual' / '12'
+    html_files = sorted(html_root.rglob('*.html'))[:args.limit]
+    if not html_files:
+        print(f"Error: No HTML files found in {html_root}")
+        print("Run wget first (see plan.md).")
+        return 1
+
+    pages = [(f, f.read_bytes()) for f in html_files]
+    total_bytes = sum(len(data) for _, data in pages)
+    print(f"Pages: {len(pages)} ({total_bytes / 1024 / 1024:.2f} MB), best of {args.repeat}")
+    print()
+
+    times = {'lxml': [0.0, 0.0], 'html.parser': [0.0, 0.0]}  # extract, markdown
+    missing = {'lxml': 0, 'html.parser': 0}
+    differ = []
+    convert.init_worker()
+    for html_file, data in pages:
+        markdown = {}
+        for name, extract, source in [
+            ('lxml', convert.extract_lxml, data),
+            ('html.parser', convert.extract_bs4, data.decode('utf-8')),
+        ]:
+            chapter_html, extract_time = timed(extract, source, args.repeat)
+            times[name][0] += extract_time
+            if chapter_html is None:
+                missing[name] += 1
+                continue
+            markdown[name], markdown_time = timed(convert.to_markdown, chapter_html, args.repeat)
+            times[name][1] += markdown_time
+        if markdown.get('lxml') != markdown.get('html.parser'):
+            differ.append(html_file.relative_to(html_root))
+
+    print(f"{'path':<12} {'extract':>9} {'ms/page':>8} {'MB/s':>7} {'+ markdown':>11} {'pages/s':>8}")
+    for name, (extract_time, markdown_time) in times.items():
+        total = extract_time + markdown_time
+        print(f"{name:<12} {extract_time:>8.2f}s {1000 * extract_time / len(pages):>8.1f} "
+              f"{total_bytes / 1024 / 1024 / extract_time:>7.1f} {total:>10.2f}s {len(pages) / total:>8.1f}")
+
+    fast, slow = times['lxml'], times['html.parser']
+    print()
+    print(f"Extraction speedup: {slow[0] / fast[0]:.1f}x, end to end: {sum(slow) / sum(fast):.2f}x")
+    for name, n in missing.items():
+        if n:
+            print(f"No #{convert.CONTENT_ID} with {name}: {n} pages")
+    if differ:
+        print(f"Different markdown: {len(differ)} pages")
+        for path in differ[:10]:
+            print(f"  - {path}")
+    else:
+        print("Markdown identical on all pages")
+    return 0
+
+
+if __name__ == '__main__':
+    exit(main())
@@ -1,18 +1,83 @@
 #!/usr/bin/env python3
 """
-Convert Ableton manual HTML files to markdown using html2text + BeautifulSoup.
+Convert Ableton manual HTML files to markdown using html2text.
+
+The #chapter_content div is extracted with lxml (--parser lxml, the
+default): the page is parsed and the div serialized in C, which is an
+order of magnitude faster than BeautifulSoup's pure-Python html.parser.
+Pages lxml can't handle fall back to BeautifulSoup, which is also used
+for everything with --parser html.parser. See benchmark-parse.py.
+
+Only files that are new or changed since the last run (or converted with
+another converter version or options) are converted; see manifest.py.
 
 Usage:
     uv run scripts/convert-manual.py
+    uv run scripts/convert-manual.py --force   # Reconvert everything
 """
 
+import argparse
 from pathlib import Path
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import bs4
 import html2text
+import lxml
+import lxml.html
 from bs4 import BeautifulSoup
+from lxml import etree
+
+from manifest import Manifest
+from runner import Runner
+
+# Bump when the conversion changes in a way the options don't capture
+CONVERTER = (f"convert-manual/1 html2text/{'.'.join(map(str, html2text.__version__))} "
+             f"beautifulsoup4/{bs4.__version__} lxml/{lxml.__version__}")
+CONTENT_ID = 'chapter_content'
+PARSERS = ('lxml', 'html.parser')
+HTML2TEXT_OPTIONS = {
+    'body_width': 0,  # Don't wrap lines
+    'ignore_links': False,
+    'ignore_images': False,
+}
+
+
+_lxml_parser = None  # Per worker process, see init_worker()
+
+
+def init_worker():
+    """Create the lxml parser once per worker."""
+    global _lxml_parser
+    _lxml_parser = lxml.html.HTMLParser(encoding='utf-8')
+
+
+def extract_lxml(html_bytes: bytes) -> str | None:
+    """Markup of the #chapter_content div, parsed and serialized by lxml (None if missing)."""
+    if _lxml_parser is None:
+        init_worker()
+    root = lxml.html.fromstring(html_bytes, parser=_lxml_parser)
+    found = root.xpath('//div[@id=$id]', id=CONTENT_ID)
+    return lxml.html.tostring(found[0], encoding='unicode', with_tail=False) if found else None
+
+
+def extract_bs4(html_content: str) -> str | None:
+    """Markup of the #chapter_content div, via BeautifulSoup's html.parser (None if missing)."""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    chapter_div = soup.find('div', id=CONTENT_ID)
+    return str(chapter_div) if chapter_div else None
+
+
+def to_markdown(chapter_html: str) -> str:
+    # A new HTML2Text per page: it keeps parser state between calls
+    h = html2text.HTML2Text()
+    for name, value in HTML2TEXT_OPTIONS.items():
+        setattr(h, name, value)
+    return h.handle(chapter_html)
+
 
+def output_path(html_path: Path, html_root: Path, md_root: Path) -> Path:
+    return md_root / html_path.relative_to(html_root).with_suffix('.md')
 
-def convert_file(html_path: Path, html_root: Path, md_root: Path) -> tuple[Path, bool, str]:
+
+def convert_file(html_path: Path, html_root: Path, md_root: Path, parser: str = 'lxml') -> tuple[Path, bool, str]:
     """
     Convert a single HTML file to markdown.
 
@@ -20,29 +85,26 @@ def convert_file(html_path: Path, html_root: Path, md_root: Path) -> tuple[Path,
         (output_path, success, error_message)
     """
     try:
-        # Calculate relative path and output path
-        rel_path = html_path.relative_to(html_root)
-        md_path = md_root / rel_path.with_suffix('.md')
+        md_path = output_path(html_path, html_root, md_root)
 
         # Create output directory
         md_path.parent.mkdir(parents=True, exist_ok=True)
 
-        # Read HTML
-        html_content = html_path.read_text(encoding='utf-8')
-
-        # Extract chapter content div
-        soup = BeautifulSoup(html_content, 'html.parser')
-        chapter_div = soup.find('div', id='chapter_content')
-
-        if not chapter_div:
+        # Extract chapter content div (BeautifulSoup if lxml fails or doesn't find it)
+        chapter_html = None
+        if parser == 'lxml':
+            try:
+                chapter_html = extract_lxml(html_path.read_bytes())
+            except (etree.LxmlError, ValueError):
+                pass
+        if chapter_html is None:
+            chapter_html = extract_bs4(html_path.read_text(encoding='utf-8'))
+
+        if not chapter_html:
             return (md_path, False, "No #chapter_content div found")
 
         # Convert to markdown
-        h = html2text.HTML2Text()
-        h.body_width = 0  # Don't wrap lines
-        h.ignore_links = False
-        h.ignore_images = False
-        markdown = h.handle(str(chapter_div))
+        markdown = to_markdown(chapter_html)
 
         if markdown.strip():
             md_path.write_text(markdown, encoding='utf-8')
@@ -55,10 +117,19 @@ def convert_file(html_path: Path, html_root: Path, md_root: Path) -> tuple[Path,
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Convert Ableton manual HTML files to markdown")
+    parser.add_argument('--force', action='store_true', help="Reconvert all files, even unchanged ones")
+    parser.add_argument('--workers', '-j', type=int, help="Worker processes (default: available cores)")
+    parser.add_argument('--parser', choices=PARSERS, default='lxml',
+                        help="How to extract #chapter_content (default: lxml, falling back to html.parser)")
+    args = parser.parse_args()
+
     # Define paths
     base_dir = Path(__file__).parent.parent
     html_root = base_dir / 'data' / 'html' / 'www.ableton.com' / 'en' / 'live-manual' / '12'
     md_root = base_dir / 'data' / 'md'
+    manifest = Manifest(base_dir / 'data' / 'md-manifest.json', html_root, md_root, CONVERTER,
+                        {'content_id': CONTENT_ID, 'parser': args.parser, **HTML2TEXT_OPTIONS})
 
     if not html_root.exists():
         print(f"Error: HTML directory not found: {html_root}")
@@ -72,43 +143,49 @@ def main():
     # Find all HTML files
     html_files = list(html_root.rglob('*.html'))
 
-    total = len(html_files)
-    print(f"Found {total} HTML files to convert")
+    if not html_files:
+        print("No HTML files found!")
+        return 1
+
+    # Drop outputs of pages that are gone, then skip the unchanged ones
+    removed = manifest.prune(html_files)
+    pending = [
+        f for f in html_files
+        if args.force or not manifest.is_current(f, output_path(f, html_root, md_root))
+    ]
+    skipped = len(html_files) - len(pending)
+
+    total = len(pending)
+    print(f"Found {len(html_files)} HTML files, {total} to convert ({skipped} unchanged)")
     print(f"Input:  {html_root}")
     print(f"Output: {md_root}")
     print()
 
-    if total == 0:
-        print("No HTML files found!")
-        return 1
-
     # Convert files in parallel
     success_count = 0
     error_count = 0
     errors = []
 
-    with ProcessPoolExecutor(max_workers=4) as executor:
-        # Submit all tasks
-        futures = {
-            executor.submit(convert_file, html_file, html_root, md_root): html_file
-            for html_file in html_files
-        }
-
+    runner = Runner(convert_file, init_worker, args.workers)
+    try:
         # Process results as they complete
-        for i, future in enumerate(as_completed(futures), 1):
-            html_file = futures[future]
-            md_path, success, error_msg = future.result()
-
+        results = runner.run(pending, html_root, md_root, args.parser)
+        for i, (html_file, (md_path, success, error_msg)) in enumerate(results, 1):
             if success:
                 success_count += 1
                 status = "OK"
+                manifest.record(html_file, md_path)
             else:
                 error_count += 1
                 status = "ERR"
                 errors.append((html_file.name, error_msg))
+                manifest.forget(html_file)
 
             # Show progress
             print(f"[{i}/{total}] {status} {html_file.name}")
+    finally:
+        # Keep what was converted even if the run is interrupted
+        manifest.save()
 
     # Summary
     print()
@@ -116,6 +193,10 @@ def main():
     print(f"Conversion complete!")
     print(f"  Success: {success_count}")
     print(f"  Errors:  {error_count}")
+    print(f"  Skipped: {skipped} unchanged")
+    print(f"  Removed: {len(removed)} (source gone)")
+    if runner.pages:
+        print(f"  Rate:    {runner.rate:.1f} pages/s ({runner.workers} workers, {runner.elapsed:.1f}s)")
 
     if errors:
         print()
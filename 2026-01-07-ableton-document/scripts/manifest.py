@@ -0,0 +1,94 @@
+"""
+Manifest of converted files, for incremental conversion.
+
+For each HTML file converted successfully, the manifest records the
+SHA-256 of the source, the converter version and the conversion options
+that produced its markdown. A later run converts only the files whose
+entry doesn't match (new or changed pages, or a new converter version or
+options) and deletes the markdown of sources that are gone.
+
+Source size and mtime are recorded too: a file whose size and mtime are
+unchanged isn't hashed again, and one that wget rewrote with the same
+content is hashed once and then skipped.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+
+def file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class Manifest:
+    def __init__(self, path: Path, html_root: Path, md_root: Path, converter: str, options: dict):
+        self.path = path
+        self.html_root = html_root
+        self.md_root = md_root
+        self.converter = converter
+        self.options = options
+        self.entries = self._load()  # source path (relative to html_root) -> entry
+
+    def _load(self) -> dict:
+        try:
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            if data.get('version') == MANIFEST_VERSION:
+                return data['files']
+        except (OSError, ValueError, KeyError):
+            pass
+        return {}
+
+    def _key(self, html_path: Path) -> str:
+        return html_path.relative_to(self.html_root).as_posix()
+
+    def is_current(self, html_path: Path, md_path: Path) -> bool:
+        """True if md_path was converted from this exact source with the current converter and options."""
+        entry = self.entries.get(self._key(html_path))
+        if (not entry or entry['converter'] != self.converter or entry['options'] != self.options
+                or not md_path.exists()):
+            return False
+        stat = html_path.stat()
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns == entry['mtime']:
+            return True
+        if file_hash(html_path) != entry['sha256']:
+            return False
+        entry['mtime'] = stat.st_mtime_ns  # Same content re-downloaded; don't hash it next time
+        return True
+
+    def record(self, html_path: Path, md_path: Path):
+        """Remember that md_path was converted from html_path's current content."""
+        stat = html_path.stat()
+        self.entries[self._key(html_path)] = {
+            'output': md_path.relative_to(self.md_root).as_posix(),
+            'sha256': file_hash(html_path),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'converter': self.converter,
+            'options': self.options,
+        }
+
+    def forget(self, html_path: Path):
+        self.entries.pop(self._key(html_path), None)
+
+    def prune(self, html_files: list[Path]) -> list[Path]:
+        """Delete outputs whose source is no longer among html_files; returns the deleted paths."""
+        keep = {self._key(f) for f in html_files}
+        removed = []
+        for key in [k for k in self.entries if k not in keep]:
+            md_path = self.md_root / self.entries.pop(key)['output']
+            if md_path.exists():
+                md_path.unlink()
+                removed.append(md_path)
+        return removed
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps({'version': MANIFEST_VERSION, 'files': self.entries}, indent=1), encoding='utf-8')
+        os.replace(tmp, self.path)
@@ -0,0 +1,132 @@
+"""Content-addressed blob store for large, repeated message payloads.
+
+Tool results and tool inputs repeat the same file contents across many
+sessions. Caches built from sessions store them here once, keyed by
+SHA-256, and keep only the hash. The store also records which blobs each
+cached session holds (and which version of its file they came from), so
+a blob's reference count is the number of sessions holding it and it is
+deleted when that drops to zero: when a session is re-cached, or dropped
+because its file is gone (see messages.prune_messages).
+
+Swapping a session's references is one IMMEDIATE transaction, so
+concurrent re-caches of the same session (web request threads, export
+workers) can't release the same references twice.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+from functools import lru_cache
+from pathlib import Path
+
+from history import CACHE_DIR
+
+DEFAULT_PATH = CACHE_DIR / "blobs.sqlite"
+
+# Payloads shorter than this are cheaper to keep inline
+BLOB_THRESHOLD = 1024
+
+
+def blob_hash(data: str) -> str:
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class BlobStore:
+    def __init__(self, path: Path = DEFAULT_PATH):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        # Export workers share the store; wait on each other's writes
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        with self.db:
+            # Serialized, so only the first connection to a store without session_blobs clears it
+            self.db.execute("BEGIN IMMEDIATE")
+            upgrade = not self.db.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'session_blobs'"
+            ).fetchall()
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS blobs ("
+                "hash TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, refs INTEGER NOT NULL)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, path TEXT NOT NULL, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL)"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS session_blobs ("
+                "session TEXT NOT NULL, hash TEXT NOT NULL, PRIMARY KEY (session, hash)) WITHOUT ROWID"
+            )
+            if upgrade:
+                # References used to be listed only in the message caches; those are re-parsed
+                self.db.execute("DELETE FROM blobs")
+        # Decode each blob at most once per store
+        self.get = lru_cache(maxsize=1024)(self._get)
+
+    def session_key(self, session_id: str) -> tuple | None:
+        """(path, mtime_ns, size) of the file session_id's references were taken for."""
+        # fetchall, not fetchone: an unfinished statement would pin a read snapshot,
+        # and a later BEGIN IMMEDIATE on this connection would fail instead of waiting
+        rows = self.db.execute("SELECT path, mtime_ns, size FROM sessions WHERE id = ?", (session_id,)).fetchall()
+        return rows[0] if rows else None
+
+    def set_refs(self, session_id: str, key: tuple | None, blobs: dict[str, str]):
+        """Make session_id hold exactly {hash: data} (storing new blobs) for file version key.
+
+        Blobs it no longer holds lose a reference; None as key drops the session.
+        """
+        with self.db:
+            self.db.execute("BEGIN IMMEDIATE")
+            old = {h for (h,) in self.db.execute("SELECT hash FROM session_blobs WHERE session = ?", (session_id,))}
+            added = [h for h in blobs if h not in old]
+            removed = [h for h in old if h not in blobs]
+            for h in added:
+                cur = self.db.execute("UPDATE blobs SET refs = refs + 1 WHERE hash = ?", (h,))
+                if cur.rowcount == 0:
+                    raw = blobs[h].encode()
+                    self.db.execute(
+                        "INSERT INTO blobs (hash, data, size, refs) VALUES (?, ?, ?, 1)",
+                        (h, zlib.compress(raw), len(raw)),
+                    )
+            self.db.executemany("UPDATE blobs SET refs = refs - 1 WHERE hash = ?", [(h,) for h in removed])
+            self.db.execute("DELETE FROM blobs WHERE refs <= 0")
+            self.db.executemany("INSERT INTO session_blobs VALUES (?, ?)", [(session_id, h) for h in added])
+            self.db.executemany(
+                "DELETE FROM session_blobs WHERE session = ? AND hash = ?", [(session_id, h) for h in removed]
+            )
+            if key is None:
+                self.db.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            else:
+                self.db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)", (session_id, *key))
+
+    def sessions(self) -> list[tuple[str, str]]:
+        """(session id, path) of every session holding references."""
+        return self.db.execute("SELECT id, path FROM sessions").fetchall()
+
+    def _get(self, h: str) -> str:
+        rows = self.db.execute("SELECT data FROM blobs WHERE hash = ?", (h,)).fetchall()
+        if not rows:
+            raise KeyError(h)
+        return zlib.decompress(rows[0][0]).decode()
+
+    def stats(self) -> dict:
+        count, stored, logical, refs = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0), COALESCE(SUM(size), 0), COALESCE(SUM(refs), 0) FROM blobs"
+        ).fetchone()
+        return {"blobs": count, "stored_bytes": stored, "unique_bytes": logical, "refs": refs}
+
+
+_local = threading.local()
+
+
+def get_store(path: Path = DEFAULT_PATH) -> BlobStore:
+    """Per-thread store (sqlite connections can't cross threads or fork)."""
+    stores = getattr(_local, "stores", None)
+    if stores is None:
+        stores = _local.stores = {}
+    # A forked worker inherits the parent thread's stores; the pid tells them apart
+    key = (os.getpid(), path)
+    if key not in stores:
+        stores[key] = BlobStore(path)
+    return stores[key]
@@ -0,0 +1,192 @@
+"""Incremental static-site export of the web UI.
+
+Pages are rendered through the Flask app (same templates as web.py) and
+written as <url>/index.html, so the output can be served by any static
+file server. A manifest records each session's source mtime/size; later
+exports only re-render sessions that changed and the project pages that
+list them.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from history import group_by_project, iter_history, load_index
+from messages import prune_messages
+
+BASE_DIR = Path(__file__).parent
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Pages per worker task; small enough to balance, large enough to amortize IPC
+CHUNK_SIZE = 16
+
+
+def _templates_hash() -> str:
+    """Hash templates and static assets so a UI change forces a full rebuild."""
+    h = hashlib.sha1()
+    for path in sorted([*(BASE_DIR / "templates").glob("*"), *(BASE_DIR / "static").glob("*")]):
+        h.update(path.name.encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def _load_manifest(out_dir: Path) -> dict:
+    try:
+        with open(out_dir / MANIFEST_NAME) as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {"version": MANIFEST_VERSION, "templates": None, "sessions": {}, "history": None}
+
+
+def _save_manifest(out_dir: Path, manifest: dict):
+    tmp = out_dir / (MANIFEST_NAME + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, out_dir / MANIFEST_NAME)
+
+
+def _page_path(out_dir: Path, url: str) -> Path:
+    return out_dir / url.strip("/") / "index.html"
+
+
+# Worker state, set once per process by _init_worker
+_client = None
+_out_dir = None
+
+
+def _init_worker(sessions: dict, out_dir: Path):
+    global _client, _out_dir
+    import web
+
+    web.INDEX = sessions
+    _client = web.app.test_client()
+    _out_dir = out_dir
+
+
+def _render_pages(urls: list[str]) -> list[tuple[str, str]]:
+    """Render and write pages. Returns [(url, error)] for pages that failed."""
+    errors = []
+    for url in urls:
+        resp = _client.get(url)
+        if resp.status_code != 200:
+            errors.append((url, f"HTTP {resp.status_code}"))
+            continue
+        page = _page_path(_out_dir, url)
+        page.parent.mkdir(parents=True, exist_ok=True)
+        page.write_bytes(resp.data)
+    return errors
+
+
+def _write_search(out_dir: Path, roots: list[Path]):
+    """Write the client-side search page and its JSON index."""
+    import web
+    from flask import render_template
+
+    entries = [
+        {
+            "timestamp": datetime.fromtimestamp(e.get("timestamp", 0) / 1000).strftime("%Y-%m-%d %H:%M"),
+            "session_id": e.get("sessionId", ""),
+            "display": e.get("display", "")[:150],
+        }
+        for e in iter_history(roots)
+    ]
+    # Most recent first, like web.search_history
+    entries.reverse()
+    (out_dir / "search-index.json").write_text(json.dumps(entries, ensure_ascii=False))
+
+    with web.app.test_request_context("/search"):
+        html = render_template("search_static.html")
+    page = _page_path(out_dir, "/search")
+    page.parent.mkdir(parents=True, exist_ok=True)
+    page.write_text(html)
+
+
+def _history_stamp(roots: list[Path]) -> list:
+    stamp = []
+    for root in roots:
+        history_file = root / "history.jsonl"
+        if history_file.exists():
+            stat = history_file.stat()
+            stamp.append([str(history_file), stat.st_mtime_ns, stat.st_size])
+    return stamp
+
+
+def export_html(out_dir: Path, roots: list[Path], force: bool = False, workers: int | None = None):
+    """Export all projects, sessions and search to out_dir, re-rendering only what changed."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest = _load_manifest(out_dir)
+    templates = _templates_hash()
+    if manifest["templates"] != templates:
+        force = True
+
+    sessions = load_index(roots)
+    old = manifest["sessions"]
+    pruned = prune_messages(sessions)
+    if pruned:
+        print(f"Dropped {pruned} cached sessions whose files are gone")
+
+    changed = [
+        sid for sid, e in sessions.items()
+        if force or sid not in old or (old[sid]["mtime_ns"], old[sid]["size"]) != (e["mtime_ns"], e["size"])
+    ]
+    removed = [sid for sid in old if sid not in sessions]
+
+    # Projects listing a changed/removed session need their session list re-rendered
+    projects = group_by_project(sessions)
+    dirty_projects = {sessions[sid]["project"] for sid in changed}
+    dirty_projects |= {old[sid]["project"] for sid in removed}
+
+    for sid in removed:
+        shutil.rmtree(out_dir / "session" / sid, ignore_errors=True)
+    for encoded in dirty_projects - projects.keys():
+        shutil.rmtree(out_dir / "project" / encoded, ignore_errors=True)
+
+    urls = [f"/session/{sid}" for sid in changed]
+    urls += [f"/project/{encoded}" for encoded in sorted(dirty_projects & projects.keys())]
+    if urls or removed or force:
+        urls.append("/")
+
+    print(f"Sessions: {len(sessions)} ({len(changed)} changed, {len(removed)} removed)")
+    print(f"Pages to render: {len(urls)}")
+
+    errors = []
+    if urls:
+        chunks = [urls[i:i + CHUNK_SIZE] for i in range(0, len(urls), CHUNK_SIZE)]
+        if len(chunks) == 1:
+            _init_worker(sessions, out_dir)
+            errors = _render_pages(urls)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(sessions, out_dir)) as executor:
+                for i, chunk_errors in enumerate(executor.map(_render_pages, chunks), 1):
+                    errors.extend(chunk_errors)
+                    print(f"  [{min(i * CHUNK_SIZE, len(urls))}/{len(urls)}]")
+
+    history = _history_stamp(roots)
+    if force or manifest["history"] != history:
+        _write_search(out_dir, roots)
+        print("Search index updated")
+
+    if force or not (out_dir / "static").exists():
+        shutil.copytree(BASE_DIR / "static", out_dir / "static", dirs_exist_ok=True)
+
+    failed = {url.removeprefix("/session/") for url, _ in errors}
+    manifest["templates"] = templates
+    manifest["history"] = history
+    manifest["sessions"] = {
+        sid: {"mtime_ns": e["mtime_ns"], "size": e["size"], "project": e["project"]}
+        for sid, e in sessions.items() if sid not in failed
+    }
+    _save_manifest(out_dir, manifest)
+
+    for url, msg in errors:
+        print(f"  Error: {url}: {msg}")
+    print(f"Exported to {out_dir} (serve with: python -m http.server -d {out_dir})")
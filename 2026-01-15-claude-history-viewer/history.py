@@ -0,0 +1,248 @@
+"""Shared history index across one or more ~/.claude roots.
+
+Each root (e.g. ~/.claude synced from different machines) gets its own
+cached index under ~/.cache/claude-history, keyed by the root's path.
+Only session files whose mtime/size changed since the last run are
+re-read, so adding a root indexes just that root.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_ROOT = Path.home() / ".claude"
+CACHE_DIR = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "claude-history"
+
+# Below this many stale files, a process pool costs more than it saves
+PARALLEL_THRESHOLD = 32
+
+
+def get_roots(roots: list[str] | None = None) -> list[Path]:
+    """Resolve history roots from arguments, $CLAUDE_HISTORY_ROOTS, or the default.
+
+    $CLAUDE_HISTORY_ROOTS is a path list like $PATH (":"-separated).
+    """
+    if not roots:
+        env = os.environ.get("CLAUDE_HISTORY_ROOTS", "")
+        roots = [r for r in env.split(os.pathsep) if r]
+    if not roots:
+        return [DEFAULT_ROOT]
+    return [Path(r).expanduser() for r in roots]
+
+
+def index_session(session_file: Path) -> dict:
+    """Read the metadata the listings need from one session file."""
+    stat = session_file.stat()
+    preview = ""
+    try:
+        with open(session_file) as f:
+            for line in f:
+                msg = json.loads(line)
+                if msg.get("type") == "user":
+                    content = msg.get("message", {}).get("content", "")
+                    if isinstance(content, str):
+                        preview = content[:100].replace("\n", " ")
+                        break
+    except (OSError, ValueError):
+        pass
+
+    return {
+        "id": session_file.stem,
+        "project": session_file.parent.name,
+        "path": str(session_file),
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "preview": preview,
+    }
+
+
+def _root_cache_file(root: Path) -> Path:
+    key = hashlib.sha1(str(root.resolve()).encode()).hexdigest()[:16]
+    return CACHE_DIR / "roots" / f"{key}.json"
+
+
+def _load_root_cache(root: Path) -> dict:
+    try:
+        with open(_root_cache_file(root)) as f:
+            return json.load(f)["sessions"]
+    except (OSError, ValueError, KeyError):
+        return {}
+
+
+def _save_root_cache(root: Path, sessions: dict):
+    cache_file = _root_cache_file(root)
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"root": str(root), "sessions": sessions}, f)
+    os.replace(tmp, cache_file)
+
+
+def build_root_indexes(roots: list[Path]) -> dict[Path, dict]:
+    """Return {root: {relpath: entry}}, re-reading only changed session files.
+
+    Stale files from all roots are indexed together on one process pool.
+    """
+    indexes = {}
+    dirty = set()
+    stale = []  # (root, relpath, path)
+
+    for root in roots:
+        projects_dir = root / "projects"
+        cached = _load_root_cache(root)
+        current = {}
+        if projects_dir.is_dir():
+            for session_file in projects_dir.glob("*/*.jsonl"):
+                rel = f"{session_file.parent.name}/{session_file.name}"
+                stat = session_file.stat()
+                entry = cached.get(rel)
+                if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    current[rel] = entry
+                else:
+                    stale.append((root, rel, session_file))
+                    dirty.add(root)
+        if len(current) != len(cached):
+            dirty.add(root)  # session files were removed
+        indexes[root] = current
+
+    if len(stale) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor() as executor:
+            entries = list(executor.map(index_session, [p for _, _, p in stale], chunksize=16))
+    else:
+        entries = [index_session(p) for _, _, p in stale]
+
+    for (root, rel, _), entry in zip(stale, entries):
+        indexes[root][rel] = entry
+
+    for root in dirty:
+        _save_root_cache(root, indexes[root])
+
+    return indexes
+
+
+def load_index(roots: list[Path] | None = None) -> dict[str, dict]:
+    """Merge all roots into {session_id: entry}.
+
+    A session synced to several roots keeps the most complete copy
+    (largest file, then most recently modified).
+    """
+    roots = roots or get_roots()
+    sessions = {}
+    for root_index in build_root_indexes(roots).values():
+        for entry in root_index.values():
+            existing = sessions.get(entry["id"])
+            if existing is None or (entry["size"], entry["mtime_ns"]) > (existing["size"], existing["mtime_ns"]):
+                sessions[entry["id"]] = entry
+    return sessions
+
+
+def group_by_project(sessions: dict[str, dict]) -> dict[str, list[dict]]:
+    """Group session entries by encoded project name, newest first."""
+    projects = {}
+    for entry in sessions.values():
+        projects.setdefault(entry["project"], []).append(entry)
+    for entries in projects.values():
+        entries.sort(key=lambda e: e["mtime_ns"], reverse=True)
+    return projects
+
+
+def find_session(sessions: dict[str, dict], session_id: str) -> dict | None:
+    """Find a session by full or partial (prefix) ID."""
+    if session_id in sessions:
+        return sessions[session_id]
+    for sid in sorted(sessions):
+        if sid.startswith(session_id):
+            return sessions[sid]
+    return None
+
+
+def entry_mtime(entry: dict) -> datetime:
+    return datetime.fromtimestamp(entry["mtime_ns"] / 1e9)
+
+
+def iter_history(roots: list[Path] | None = None):
+    """Yield history.jsonl entries from all roots, de-duplicated, oldest first."""
+    roots = roots or get_roots()
+    seen = set()
+    entries = []
+    for root in roots:
+        history_file = root / "history.jsonl"
+        if not history_file.exists():
+            continue
+        with open(history_file) as f:
+            for line in f:
+                entry = json.loads(line)
+                key = (entry.get("sessionId"), entry.get("timestamp"), entry.get("display"))
+                if key not in seen:
+                    seen.add(key)
+                    entries.append(entry)
+    if len(roots) > 1:
+        entries.sort(key=lambda e: e.get("timestamp", 0))
+    yield from entries
+
+
+def read_lines_reversed(path, block_size: int = 1 << 16):
+    """Yield a file's lines (bytes, without newline) from last to first.
+
+    Reads fixed-size blocks backwards, so consuming only the last few lines
+    of a large session touches only the end of the file.
+    """
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        tail = b""
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            lines = (f.read(step) + tail).split(b"\n")
+            # First piece may be the end of a line that starts in an earlier block
+            tail = lines.pop(0)
+            for line in reversed(lines):
+                if line:
+                    yield line
+        if tail:
+            yield tail
+
+
+def offset_index(entry: dict) -> dict[str, int]:
+    """{message uuid: byte offset of its line} for a session, cached and extended incrementally.
+
+    Session files only grow, so a cached index is extended from where it
+    stopped; a file that shrank or moved is re-indexed from the start.
+    """
+    cache_file = CACHE_DIR / "offsets" / f"{entry['id']}.json"
+    offsets, start = {}, 0
+    try:
+        with open(cache_file) as f:
+            cached = json.load(f)
+        if cached["path"] == entry["path"] and cached["end"] <= entry["size"]:
+            offsets, start = cached["offsets"], cached["end"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    if start == entry["size"]:
+        return offsets
+
+    end = start
+    with open(entry["path"], "rb") as f:
+        f.seek(start)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # partially written; index it next time
+            try:
+                uuid = json.loads(line).get("uuid")
+            except ValueError:
+                uuid = None
+            if uuid:
+                offsets[uuid] = end
+            end += len(line)
+
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp = cache_file.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"path": entry["path"], "end": end, "offsets": offsets}, f)
+    os.replace(tmp, cache_file)
+    return offsets
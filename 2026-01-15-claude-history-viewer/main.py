@@ -3,126 +3,168 @@
 
 import json
 import argparse
-from pathlib import Path
+import os
+import re
+import sys
 from datetime import datetime
+from pathlib import Path
 
-CLAUDE_DIR = Path.home() / ".claude"
-PROJECTS_DIR = CLAUDE_DIR / "projects"
+from history import (
+    entry_mtime, find_session, get_roots, group_by_project, iter_history, load_index, offset_index, read_lines_reversed,
+)
 
 
-def list_projects():
+def list_projects(roots):
     """List all projects with sessions."""
-    for project_dir in sorted(PROJECTS_DIR.iterdir()):
-        if project_dir.is_dir():
-            sessions = list(project_dir.glob("*.jsonl"))
-            # Decode path: -home-user-code becomes /home/user/code
-            decoded = "/" + project_dir.name.replace("-", "/")
-            print(f"{decoded}  ({len(sessions)} sessions)")
+    projects = group_by_project(load_index(roots))
+    for encoded in sorted(projects):
+        # Decode path: -home-user-code becomes /home/user/code
+        decoded = "/" + encoded.replace("-", "/")
+        print(f"{decoded}  ({len(projects[encoded])} sessions)")
 
 
-def list_sessions(project_path: str):
+def list_sessions(roots, project_path: str):
     """List sessions for a project."""
     # Encode path: /home/user/code becomes -home-user-code
     encoded = project_path.replace("/", "-").lstrip("-")
-    project_dir = PROJECTS_DIR / encoded
+    projects = group_by_project(load_index(roots))
+    sessions = projects.get(encoded)
 
-    if not project_dir.exists():
+    if sessions is None:
         # Try partial match
-        matches = [p for p in PROJECTS_DIR.iterdir() if encoded in p.name]
+        matches = [name for name in sorted(projects) if encoded in name]
         if matches:
-            project_dir = matches[0]
+            sessions = projects[matches[0]]
         else:
             print(f"Project not found: {project_path}")
             return
 
-    sessions = sorted(project_dir.glob("*.jsonl"), key=lambda p: p.stat().st_mtime, reverse=True)
-    for session_file in sessions:
-        mtime = datetime.fromtimestamp(session_file.stat().st_mtime)
-        size_kb = session_file.stat().st_size // 1024
-
-        # Get first user message as preview
-        preview = ""
-        with open(session_file) as f:
-            for line in f:
-                msg = json.loads(line)
-                if msg.get("type") == "user":
-                    content = msg.get("message", {}).get("content", "")
-                    if isinstance(content, str):
-                        preview = content[:60].replace("\n", " ")
-                        break
-
-        print(f"{session_file.stem}  {mtime:%Y-%m-%d %H:%M}  {size_kb:>4}KB  {preview}...")
-
-
-def print_session(session_id: str, show_thinking: bool = False, show_tools: bool = False):
-    """Pretty print a session's conversation."""
-    # Find the session file
-    session_file = None
-    for project_dir in PROJECTS_DIR.iterdir():
-        candidate = project_dir / f"{session_id}.jsonl"
-        if candidate.exists():
-            session_file = candidate
-            break
-        # Try partial match
-        for f in project_dir.glob(f"{session_id}*.jsonl"):
-            session_file = f
-            break
-
-    if not session_file:
+    for entry in sessions:
+        mtime = entry_mtime(entry)
+        size_kb = entry["size"] // 1024
+        preview = entry["preview"][:60]
+        print(f"{entry['id']}  {mtime:%Y-%m-%d %H:%M}  {size_kb:>4}KB  {preview}...")
+
+
+def format_message(msg: dict, show_thinking: bool = False, show_tools: bool = False) -> str | None:
+    """Render one session record as printable text (None if nothing to show)."""
+    out = []
+    msg_type = msg.get("type")
+
+    if msg_type == "user":
+        content = msg.get("message", {}).get("content", "")
+        if isinstance(content, str):
+            out.append(f"\n{'='*60}")
+            out.append("USER:")
+            out.append(content)
+        elif show_tools:
+            # Tool results
+            for item in content:
+                if item.get("type") == "tool_result":
+                    result = item.get("content", "")[:200]
+                    out.append(f"\n[tool_result: {result}...]")
+
+    elif msg_type == "assistant":
+        content = msg.get("message", {}).get("content", [])
+        for block in content:
+            block_type = block.get("type")
+
+            if block_type == "thinking" and show_thinking:
+                out.append(f"\n<thinking>\n{block.get('thinking', '')}\n</thinking>")
+
+            elif block_type == "text":
+                out.append(f"\n{'-'*60}")
+                out.append("ASSISTANT:")
+                out.append(block.get("text", ""))
+
+            elif block_type == "tool_use" and show_tools:
+                name = block.get("name", "")
+                inp = json.dumps(block.get("input", {}), indent=2)[:200]
+                out.append(f"\n[tool: {name}]\n{inp}")
+
+    return "\n".join(out) if out else None
+
+
+def print_session(roots, session_id: str, show_thinking: bool = False, show_tools: bool = False,
+                  tail: int | None = None, from_uuid: str | None = None, grep: str | None = None):
+    """Pretty print a session's conversation.
+
+    tail: only the last N shown messages, read backwards from the end of the file
+          (the CLI doesn't allow it with from_uuid; from_uuid is ignored then)
+    from_uuid: start at this message (full or prefix UUID), via the offset index
+    grep: only messages whose printed text matches this regex (case-insensitive)
+    """
+    entry = find_session(load_index(roots), session_id)
+    if not entry:
         print(f"Session not found: {session_id}")
         return
 
-    with open(session_file) as f:
-        for line in f:
+    pattern = re.compile(grep, re.IGNORECASE) if grep else None
+
+    def render(line) -> str | None:
+        try:
             msg = json.loads(line)
-            msg_type = msg.get("type")
-
-            if msg_type == "user":
-                content = msg.get("message", {}).get("content", "")
-                if isinstance(content, str):
-                    print(f"\n{'='*60}")
-                    print("USER:")
-                    print(content)
-                elif show_tools:
-                    # Tool results
-                    for item in content:
-                        if item.get("type") == "tool_result":
-                            result = item.get("content", "")[:200]
-                            print(f"\n[tool_result: {result}...]")
-
-            elif msg_type == "assistant":
-                content = msg.get("message", {}).get("content", [])
-                for block in content:
-                    block_type = block.get("type")
-
-                    if block_type == "thinking" and show_thinking:
-                        print(f"\n<thinking>\n{block.get('thinking', '')}\n</thinking>")
-
-                    elif block_type == "text":
-                        print(f"\n{'-'*60}")
-                        print("ASSISTANT:")
-                        print(block.get("text", ""))
-
-                    elif block_type == "tool_use" and show_tools:
-                        name = block.get("name", "")
-                        inp = json.dumps(block.get("input", {}), indent=2)[:200]
-                        print(f"\n[tool: {name}]\n{inp}")
-
-
-def search_history(query: str, limit: int = 20):
+        except ValueError:
+            return None
+        text = format_message(msg, show_thinking, show_tools)
+        if text and pattern and not pattern.search(text):
+            return None
+        return text
+
+    if tail is not None:
+        # A live session's last line may be partially written; skip it like offset_index does
+        partial = False
+        with open(entry["path"], "rb") as f:
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                partial = f.read(1) != b"\n"
+        # Collect newest first, stop as soon as we have enough
+        chunks = []
+        lines = read_lines_reversed(entry["path"])
+        if partial:
+            next(lines, None)
+        for line in lines:
+            if len(chunks) >= tail:
+                break
+            text = render(line)
+            if text:
+                chunks.append(text)
+        for text in reversed(chunks):
+            print(text)
+        return
+
+    start = 0
+    if from_uuid:
+        offsets = offset_index(entry)
+        match = offsets.get(from_uuid)
+        if match is None:
+            match = next((offsets[u] for u in sorted(offsets) if u.startswith(from_uuid)), None)
+        if match is None:
+            print(f"Message not found: {from_uuid}")
+            return
+        start = match
+
+    with open(entry["path"], "rb") as f:
+        f.seek(start)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # partially written
+            text = render(line)
+            if text:
+                print(text)
+
+
+def search_history(roots, query: str, limit: int = 20):
     """Search history.jsonl for matching prompts."""
-    history_file = CLAUDE_DIR / "history.jsonl"
-    if not history_file.exists():
+    if not any((root / "history.jsonl").exists() for root in roots):
         print("history.jsonl not found")
         return
 
     matches = []
-    with open(history_file) as f:
-        for line in f:
-            entry = json.loads(line)
-            display = entry.get("display", "")
-            if query.lower() in display.lower():
-                matches.append(entry)
+    for entry in iter_history(roots):
+        display = entry.get("display", "")
+        if query.lower() in display.lower():
+            matches.append(entry)
 
     # Show most recent first
     for entry in matches[-limit:]:
@@ -134,6 +176,8 @@ def search_history(query: str, limit: int = 20):
 
 def main():
     parser = argparse.ArgumentParser(description="Browse Claude Code history")
+    parser.add_argument("-r", "--root", action="append",
+                        help="History root, repeatable (default: $CLAUDE_HISTORY_ROOTS or ~/.claude)")
     sub = parser.add_subparsers(dest="command")
 
     sub.add_parser("projects", help="List projects")
@@ -145,24 +189,51 @@ def main():
     show.add_argument("session", help="Session ID (can be partial)")
     show.add_argument("-t", "--thinking", action="store_true", help="Show thinking")
     show.add_argument("-T", "--tools", action="store_true", help="Show tool calls")
+    start = show.add_mutually_exclusive_group()
+    start.add_argument("--tail", type=int, metavar="N", help="Only the last N messages")
+    start.add_argument("--from-uuid", metavar="UUID", help="Start at this message (can be partial)")
+    show.add_argument("--grep", metavar="REGEX", help="Only messages matching REGEX (case-insensitive)")
 
     search = sub.add_parser("search", help="Search history")
     search.add_argument("query", help="Search term")
     search.add_argument("-n", "--limit", type=int, default=20, help="Max results")
 
+    export = sub.add_parser("export-html", help="Export static HTML site (incremental)")
+    export.add_argument("out", help="Output directory")
+    export.add_argument("-f", "--force", action="store_true", help="Re-render every page")
+    export.add_argument("-j", "--jobs", type=int, help="Worker processes (default: all cores)")
+
+    export_db = sub.add_parser("export-db", help="Export sessions as tables for SQL/dataframes (incremental)")
+    export_db.add_argument("out", help="SQLite file, or directory for Parquet")
+    export_db.add_argument("--format", choices=["sqlite", "parquet"], default="sqlite")
+    export_db.add_argument("-j", "--jobs", type=int, help="Worker processes (default: all cores)")
+
     args = parser.parse_args()
+    roots = get_roots(args.root)
 
     if args.command == "projects":
-        list_projects()
+        list_projects(roots)
     elif args.command == "ls":
-        list_sessions(args.project)
+        list_sessions(roots, args.project)
     elif args.command == "show":
-        print_session(args.session, args.thinking, args.tools)
+        print_session(roots, args.session, args.thinking, args.tools, args.tail, args.from_uuid, args.grep)
     elif args.command == "search":
-        search_history(args.query, args.limit)
+        search_history(roots, args.query, args.limit)
+    elif args.command == "export-html":
+        # Needs flask, unlike the rest of the CLI
+        from export import export_html
+        export_html(Path(args.out), roots, args.force, args.jobs)
+    elif args.command == "export-db":
+        from tables import export_tables
+        export_tables(Path(args.out), roots, args.format, args.jobs)
     else:
         parser.print_help()
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except BrokenPipeError:
+        # Output piped into a pager/head that exited early
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
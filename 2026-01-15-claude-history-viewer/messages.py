@@ -0,0 +1,151 @@
+"""Parsed-message cache for sessions, with large payloads in the blob store.
+
+A session is parsed once into the list of messages the web UI renders
+and cached under ~/.cache/claude-history/messages/<session>.json until
+its source file changes. Tool results and tool inputs above
+BLOB_THRESHOLD are replaced by {"$blob": <sha256>}, so repeated file
+contents are stored (and decoded) once across sessions. File-history
+snapshots aren't rendered, so they aren't cached here (export-db keeps
+them).
+
+Cached sessions whose source file is gone are dropped by
+prune_messages, which releases their blob references.
+"""
+
+import json
+import os
+import threading
+
+from blobs import BLOB_THRESHOLD, blob_hash, get_store
+from history import CACHE_DIR
+
+MESSAGES_DIR = CACHE_DIR / "messages"
+MESSAGES_VERSION = 3
+
+
+def _maybe_blob(value: str, blobs: dict):
+    if isinstance(value, str) and len(value) >= BLOB_THRESHOLD:
+        h = blob_hash(value)
+        blobs[h] = value
+        return {"$blob": h}
+    return value
+
+
+def parse_session(session_file) -> tuple[list[dict], dict[str, str]]:
+    """Parse a session file into UI messages. Returns (messages, {hash: data})."""
+    messages = []
+    blobs = {}
+    with open(session_file) as f:
+        for line in f:
+            msg = json.loads(line)
+            msg_type = msg.get("type")
+
+            if msg_type == "user":
+                content = msg.get("message", {}).get("content", "")
+                if isinstance(content, str):
+                    messages.append({
+                        "role": "user",
+                        "content": content,
+                        "timestamp": msg.get("timestamp"),
+                    })
+                else:
+                    # Tool results - collect them
+                    tool_results = []
+                    for item in content:
+                        if item.get("type") == "tool_result":
+                            tool_results.append(_maybe_blob(item.get("content", ""), blobs))
+                    if tool_results:
+                        messages.append({
+                            "role": "tool_result",
+                            "results": tool_results,
+                            "timestamp": msg.get("timestamp"),
+                        })
+
+            elif msg_type == "assistant":
+                content = msg.get("message", {}).get("content", [])
+                blocks = []
+                for block in content:
+                    block_type = block.get("type")
+                    if block_type == "thinking":
+                        blocks.append({"type": "thinking", "content": block.get("thinking", "")})
+                    elif block_type == "text":
+                        blocks.append({"type": "text", "content": block.get("text", "")})
+                    elif block_type == "tool_use":
+                        blocks.append({
+                            "type": "tool_use",
+                            "name": block.get("name", ""),
+                            "input": _maybe_blob(json.dumps(block.get("input", {}), indent=2), blobs),
+                        })
+                if blocks:
+                    messages.append({
+                        "role": "assistant",
+                        "blocks": blocks,
+                        "timestamp": msg.get("timestamp"),
+                    })
+
+    return messages, blobs
+
+
+def load_messages(entry: dict, store=None) -> list[dict]:
+    """Cached parsed messages for an index entry (payloads still as blob refs).
+
+    The cache file is used only if the blob store holds references for the
+    same file version, so a cache written by a run that didn't commit its
+    references (crash, or a concurrent re-cache that lost) is parsed again.
+    """
+    store = store or get_store()
+    cache_file = MESSAGES_DIR / f"{entry['id']}.json"
+    key = (entry["path"], entry["mtime_ns"], entry["size"])
+    try:
+        with open(cache_file) as f:
+            cached = json.load(f)
+        if (cached["version"], cached["path"], cached["mtime_ns"], cached["size"]) == (MESSAGES_VERSION, *key) \
+                and store.session_key(entry["id"]) == key:
+            return cached["messages"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    messages, blobs = parse_session(entry["path"])
+
+    MESSAGES_DIR.mkdir(parents=True, exist_ok=True)
+    # Request threads and export workers may re-cache the same session at once
+    tmp = cache_file.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({
+            "version": MESSAGES_VERSION,
+            "path": entry["path"],
+            "mtime_ns": entry["mtime_ns"],
+            "size": entry["size"],
+            "messages": messages,
+        }, f)
+    os.replace(tmp, cache_file)
+    store.set_refs(entry["id"], key, blobs)
+    return messages
+
+
+def prune_messages(sessions: dict[str, dict], store=None) -> int:
+    """Drop cached sessions whose source file is gone, releasing their blobs. Returns how many.
+
+    Sessions in the index are kept as they are; others may belong to roots
+    this process wasn't given, so only a missing file counts.
+    """
+    store = store or get_store()
+    dropped = 0
+    for session_id, path in store.sessions():
+        if session_id in sessions or os.path.exists(path):
+            continue
+        (MESSAGES_DIR / f"{session_id}.json").unlink(missing_ok=True)
+        store.set_refs(session_id, None, {})
+        dropped += 1
+    return dropped
+
+
+def resolve(value, store=None):
+    """Replace {"$blob": hash} references (at any depth) with their contents."""
+    if isinstance(value, dict):
+        if "$blob" in value and len(value) == 1:
+            return (store or get_store()).get(value["$blob"])
+        return {k: resolve(v, store) for k, v in value.items()}
+    if isinstance(value, list):
+        return [resolve(v, store) for v in value]
+    return value
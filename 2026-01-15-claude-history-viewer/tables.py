@@ -0,0 +1,335 @@
+"""Flatten sessions into normalized tables (SQLite or Parquet) for analysis.
+
+Tables:
+  sessions        one row per session file
+  messages        one row per JSONL record (user/assistant/system/...)
+  content_blocks  text/thinking/tool_use/tool_result blocks of a message
+  tool_calls      tool_use blocks with their name and input
+  usage           token usage of assistant messages
+  blobs           large payloads, stored once by SHA-256 (see blobs.py)
+
+Session files are append-only, so each export remembers how far it read
+every file and the next run only flattens new lines. The SQLite export
+keeps these offsets in its own _export_state table, written in the same
+transaction as the session's rows, so an interrupted run never leaves
+rows without their offset; the Parquet export keeps them in
+_export_state.json next to the files. Files are parsed on
+a process pool with a bounded number of files in flight, and rows are
+flushed per file (SQLite) or per row group (Parquet), so memory stays
+bounded by the largest session rather than the whole history.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from blobs import BLOB_THRESHOLD, blob_hash
+from history import load_index
+
+SCHEMA = {
+    "sessions": ["session_id", "project", "path", "mtime_ns", "size"],
+    "messages": ["session_id", "line", "uuid", "parent_uuid", "type", "role", "timestamp", "model", "cwd", "run_id"],
+    "content_blocks": ["session_id", "line", "idx", "type", "text", "blob_hash", "tool_use_id", "run_id"],
+    "tool_calls": ["session_id", "line", "tool_use_id", "name", "input", "blob_hash", "run_id"],
+    "usage": ["session_id", "line", "model", "input_tokens", "output_tokens",
+              "cache_creation_input_tokens", "cache_read_input_tokens", "run_id"],
+    "blobs": ["hash", "data"],
+}
+
+# Tables whose rows belong to a session and are re-written when it is
+SESSION_TABLES = ["messages", "content_blocks", "tool_calls", "usage"]
+
+# Everything else is a string column (Parquet needs explicit types for all-null batches)
+INT_COLUMNS = {"mtime_ns", "size", "line", "idx", "run_id", "input_tokens", "output_tokens",
+               "cache_creation_input_tokens", "cache_read_input_tokens"}
+
+STATE_NAME = "_export_state.json"
+ROW_GROUP_SIZE = 50_000
+# Also flush a buffer past this many bytes of text (blobs hold whole tool outputs)
+ROW_GROUP_BYTES = 64 << 20
+MAX_IN_FLIGHT = 32
+
+
+def _payload(value) -> tuple[str | None, str | None, dict]:
+    """Return (inline_text, blob_hash, {hash: data}) for a block payload."""
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False)
+    if len(value) >= BLOB_THRESHOLD:
+        h = blob_hash(value)
+        return None, h, {h: value}
+    return value, None, {}
+
+
+def flatten_session(session_file: str, session_id: str, start: int, line_no: int,
+                    run_id: int) -> tuple[int, int, dict, dict]:
+    """Flatten lines of a session file from byte offset `start` (line `line_no`).
+
+    Returns (end_offset, end_line, {table: [rows]}, {hash: data}).
+    Only complete lines are consumed; a partially written last line is
+    left for the next run.
+    """
+    rows = {name: [] for name in SESSION_TABLES}
+    blobs = {}
+
+    with open(session_file, "rb") as f:
+        f.seek(start)
+        end = start
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            end += len(raw)
+            line_no += 1
+            try:
+                msg = json.loads(raw)
+            except ValueError:
+                continue
+
+            message = msg.get("message") or {}
+            msg_type = msg.get("type")
+            rows["messages"].append((
+                session_id, line_no, msg.get("uuid"), msg.get("parentUuid"), msg_type,
+                message.get("role"), msg.get("timestamp"), message.get("model"), msg.get("cwd"), run_id,
+            ))
+
+            content = message.get("content")
+            if isinstance(content, str):
+                content = [{"type": "text", "text": content}]
+            for idx, block in enumerate(content if isinstance(content, list) else []):
+                block_type = block.get("type")
+                tool_use_id = None
+                if block_type == "text":
+                    value = block.get("text", "")
+                elif block_type == "thinking":
+                    value = block.get("thinking", "")
+                elif block_type == "tool_use":
+                    value = block.get("input", {})
+                    tool_use_id = block.get("id")
+                elif block_type == "tool_result":
+                    value = block.get("content", "")
+                    tool_use_id = block.get("tool_use_id")
+                else:
+                    value = block
+                text, h, new_blobs = _payload(value)
+                blobs.update(new_blobs)
+                rows["content_blocks"].append((session_id, line_no, idx, block_type, text, h, tool_use_id, run_id))
+                if block_type == "tool_use":
+                    rows["tool_calls"].append((session_id, line_no, tool_use_id, block.get("name"), text, h, run_id))
+
+            if msg_type == "file-history-snapshot":
+                text, h, new_blobs = _payload(msg.get("snapshot", {}))
+                blobs.update(new_blobs)
+                rows["content_blocks"].append((session_id, line_no, 0, "snapshot", text, h, None, run_id))
+
+            usage = message.get("usage")
+            if usage:
+                rows["usage"].append((
+                    session_id, line_no, message.get("model"), usage.get("input_tokens"),
+                    usage.get("output_tokens"), usage.get("cache_creation_input_tokens"),
+                    usage.get("cache_read_input_tokens"), run_id,
+                ))
+
+    return end, line_no, rows, blobs
+
+
+class SqliteSink:
+    def __init__(self, out: Path):
+        import sqlite3
+
+        self.db = sqlite3.connect(out)
+        for name, columns in SCHEMA.items():
+            self.db.execute(f"CREATE TABLE IF NOT EXISTS {name} ({', '.join(columns)})")
+        self.db.execute("CREATE UNIQUE INDEX IF NOT EXISTS sessions_id ON sessions (session_id)")
+        self.db.execute("CREATE UNIQUE INDEX IF NOT EXISTS blobs_hash ON blobs (hash)")
+        for name in SESSION_TABLES:
+            self.db.execute(f"CREATE INDEX IF NOT EXISTS {name}_session ON {name} (session_id, line)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS _export_state "
+                        "(session_id TEXT PRIMARY KEY, path TEXT, offset INTEGER, line INTEGER)")
+
+    def load_state(self, legacy_path: Path) -> dict:
+        """Offsets of the previous runs; the run counter is the database's user_version.
+
+        Exports made before the offsets moved into the database have them in
+        legacy_path, which is imported once.
+        """
+        sessions = {sid: {"path": path, "offset": offset, "line": line}
+                    for sid, path, offset, line in self.db.execute("SELECT * FROM _export_state")}
+        run_id = self.db.execute("PRAGMA user_version").fetchone()[0]
+        exported = self.db.execute("SELECT 1 FROM sessions LIMIT 1").fetchone()
+        if not sessions and exported and legacy_path.exists():
+            legacy = _load_state(legacy_path)
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO _export_state VALUES (?, ?, ?, ?)",
+                                    [(sid, s["path"], s["offset"], s["line"]) for sid, s in legacy["sessions"].items()])
+                self.db.execute(f"PRAGMA user_version = {int(legacy['run_id'])}")
+            return self.load_state(legacy_path)
+        return {"run_id": run_id, "sessions": sessions, "blobs": []}
+
+    def start_run(self, run_id: int):
+        with self.db:
+            self.db.execute(f"PRAGMA user_version = {int(run_id)}")
+
+    def write(self, session: tuple, rows: dict, blobs: dict, rewrite: bool, end: int, line: int):
+        with self.db:
+            if rewrite:
+                for name in SESSION_TABLES:
+                    self.db.execute(f"DELETE FROM {name} WHERE session_id = ?", (session[0],))
+            self.db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)", session)
+            for name, table_rows in rows.items():
+                marks = ", ".join("?" * len(SCHEMA[name]))
+                self.db.executemany(f"INSERT INTO {name} VALUES ({marks})", table_rows)
+            self.db.executemany("INSERT OR IGNORE INTO blobs VALUES (?, ?)", blobs.items())
+            self.db.execute("INSERT OR REPLACE INTO _export_state VALUES (?, ?, ?, ?)",
+                            (session[0], session[2], end, line))
+
+    def close(self):
+        self.db.close()
+
+
+class ParquetSink:
+    """One Parquet file per table per run under out/<table>/, written in row groups.
+
+    Parquet files can't be edited: each run appends a `sessions` row per
+    exported session, and a rewritten session (file shrank) is exported
+    again in full, so readers should keep the rows with the highest run_id
+    per session.
+    """
+
+    def __init__(self, out: Path, run_id: int, seen_blobs: set):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("Parquet export needs pyarrow: uv run --extra parquet python main.py ...")
+        self.out = out
+        self.run_id = run_id
+        self.seen_blobs = seen_blobs
+        self.buffers = {name: [] for name in SCHEMA}
+        self.buffer_bytes = dict.fromkeys(SCHEMA, 0)  # text in each buffer (characters, roughly bytes)
+        self.writers = {}
+
+    def _append(self, name: str, rows: list):
+        self.buffers[name].extend(rows)
+        self.buffer_bytes[name] += sum(len(v) for row in rows for v in row if isinstance(v, str))
+        if len(self.buffers[name]) >= ROW_GROUP_SIZE or self.buffer_bytes[name] >= ROW_GROUP_BYTES:
+            self._flush(name)
+
+    def write(self, session: tuple, rows: dict, blobs: dict, rewrite: bool, end: int, line: int):
+        self._append("sessions", [session])
+        for name, table_rows in rows.items():
+            self._append(name, table_rows)
+        new_blobs = [(h, data) for h, data in blobs.items() if h not in self.seen_blobs]
+        self.seen_blobs.update(h for h, _ in new_blobs)
+        self._append("blobs", new_blobs)
+
+    def _flush(self, name: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        buffer = self.buffers[name]
+        if not buffer:
+            return
+        columns = SCHEMA[name]
+        schema = pa.schema([(c, pa.int64() if c in INT_COLUMNS else pa.string()) for c in columns])
+        table = pa.Table.from_arrays([pa.array(col, schema.field(c).type) for c, col in zip(columns, zip(*buffer))],
+                                     schema=schema)
+        if name not in self.writers:
+            path = self.out / name / f"run-{self.run_id:06d}.parquet"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.writers[name] = pq.ParquetWriter(path, schema)
+        self.writers[name].write_table(table)
+        buffer.clear()
+        self.buffer_bytes[name] = 0
+
+    def close(self):
+        for name in self.buffers:
+            self._flush(name)
+        for writer in self.writers.values():
+            writer.close()
+
+
+def _load_state(path: Path) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"run_id": 0, "sessions": {}, "blobs": []}
+
+
+def export_tables(out: Path, roots: list[Path], fmt: str = "sqlite", workers: int | None = None):
+    """Export all sessions to `out` (a .sqlite file or a Parquet directory), appending new lines only."""
+    if fmt == "parquet":
+        out.mkdir(parents=True, exist_ok=True)
+        state_path = out / STATE_NAME
+        state = _load_state(state_path)
+    else:
+        out.parent.mkdir(parents=True, exist_ok=True)
+        state_path = out.with_name(out.name + STATE_NAME)
+        sink = SqliteSink(out)
+        state = sink.load_state(state_path)
+    run_id = state["run_id"] + 1
+
+    jobs = []  # (entry, start_offset, start_line, rewrite)
+    for entry in load_index(roots).values():
+        prev = state["sessions"].get(entry["id"])
+        if prev and prev["path"] == entry["path"] and prev["offset"] <= entry["size"]:
+            if prev["offset"] < entry["size"]:
+                jobs.append((entry, prev["offset"], prev["line"], False))
+        else:
+            # New, moved to another root, or rewritten (shrank): export from scratch
+            jobs.append((entry, 0, 0, prev is not None))
+
+    print(f"Sessions to export: {len(jobs)} ({sum(1 for *_, r in jobs if r)} rewritten)")
+    if fmt == "parquet":
+        if not jobs:
+            return
+        sink = ParquetSink(out, run_id, set(state["blobs"]))
+    else:
+        if state_path.exists():
+            state_path.unlink()  # Imported into the database by load_state
+        if not jobs:
+            sink.close()
+            return
+        sink.start_run(run_id)
+
+    start_time = time.monotonic()
+    rows_written = 0
+    pending = iter(jobs)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+
+        def submit_next():
+            job = next(pending, None)
+            if job:
+                entry, start, line, _ = job
+                future = executor.submit(flatten_session, entry["path"], entry["id"], start, line, run_id)
+                in_flight[future] = job
+
+        for _ in range(MAX_IN_FLIGHT):
+            submit_next()
+
+        done_count = 0
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                entry, _, _, rewrite = in_flight.pop(future)
+                end, line, rows, blobs = future.result()
+                session = (entry["id"], entry["project"], entry["path"], entry["mtime_ns"], entry["size"])
+                sink.write(session, rows, blobs, rewrite, end, line)
+                state["sessions"][entry["id"]] = {"path": entry["path"], "offset": end, "line": line}
+                rows_written += sum(len(r) for r in rows.values())
+                done_count += 1
+                submit_next()
+            print(f"  [{done_count}/{len(jobs)}] {rows_written:,} rows", end="\r")
+
+    sink.close()
+    if fmt == "parquet":
+        state["blobs"] = sorted(sink.seen_blobs)
+        state["run_id"] = run_id
+        tmp = state_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, state_path)
+
+    elapsed = time.monotonic() - start_time
+    print(f"\nExported {rows_written:,} rows from {len(jobs)} sessions in {elapsed:.1f}s → {out}")
@@ -1,15 +1,54 @@
 #!/usr/bin/env python3
 """Web UI for browsing Claude Code conversation history."""
 
-import json
+import argparse
+import os
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 from flask import Flask, render_template, request
 
+from history import entry_mtime, find_session, get_roots, group_by_project, index_session, iter_history, load_index
+from messages import load_messages, prune_messages, resolve
+
 app = Flask(__name__)
 
-CLAUDE_DIR = Path.home() / ".claude"
-PROJECTS_DIR = CLAUDE_DIR / "projects"
+ROOTS = get_roots()
+
+# Pinned session index for batch rendering (see export.py); None uses the scanned index below
+INDEX = None
+
+# Seconds a scanned index is reused across requests before the roots are re-scanned
+INDEX_TTL = 5.0
+_index = None
+_index_at = 0.0
+_index_lock = threading.Lock()
+
+
+def current_index():
+    global _index, _index_at
+    if INDEX is not None:
+        return INDEX
+    with _index_lock:
+        if _index is None or time.monotonic() - _index_at > INDEX_TTL:
+            _index = load_index(ROOTS)
+            _index_at = time.monotonic()
+            prune_messages(_index)
+        return _index
+
+
+def fresh_entry(entry: dict) -> dict:
+    """entry, re-read if its session file changed since the index was scanned."""
+    if INDEX is not None:
+        return entry
+    try:
+        stat = os.stat(entry["path"])
+    except OSError:
+        return entry
+    if (stat.st_mtime_ns, stat.st_size) == (entry["mtime_ns"], entry["size"]):
+        return entry
+    return index_session(Path(entry["path"]))
 
 
 def decode_project_path(encoded: str) -> str:
@@ -71,148 +110,59 @@ def decode_project_path(encoded: str) -> str:
 def get_projects():
     """Get all projects with session counts."""
     projects = []
-    for project_dir in sorted(PROJECTS_DIR.iterdir()):
-        if project_dir.is_dir():
-            sessions = list(project_dir.glob("*.jsonl"))
-            if sessions:
-                # Get most recent session time
-                latest = max(s.stat().st_mtime for s in sessions)
-                projects.append({
-                    "encoded": project_dir.name,
-                    "path": decode_project_path(project_dir.name),
-                    "session_count": len(sessions),
-                    "latest": datetime.fromtimestamp(latest),
-                })
+    for encoded, sessions in group_by_project(current_index()).items():
+        projects.append({
+            "encoded": encoded,
+            "path": decode_project_path(encoded),
+            "session_count": len(sessions),
+            # Sessions are sorted newest first
+            "latest": entry_mtime(sessions[0]),
+        })
     # Sort by most recent activity
     return sorted(projects, key=lambda p: p["latest"], reverse=True)
 
 
 def get_sessions(encoded_project: str):
     """Get sessions for a project."""
-    project_dir = PROJECTS_DIR / encoded_project
-    if not project_dir.exists():
-        return []
-
     sessions = []
-    for session_file in sorted(project_dir.glob("*.jsonl"), key=lambda p: p.stat().st_mtime, reverse=True):
-        mtime = datetime.fromtimestamp(session_file.stat().st_mtime)
-        size_kb = session_file.stat().st_size // 1024
-
-        # Get first user message as preview
-        preview = ""
-        try:
-            with open(session_file) as f:
-                for line in f:
-                    msg = json.loads(line)
-                    if msg.get("type") == "user":
-                        content = msg.get("message", {}).get("content", "")
-                        if isinstance(content, str):
-                            preview = content[:100].replace("\n", " ")
-                            break
-        except:
-            pass
-
+    for entry in group_by_project(current_index()).get(encoded_project, []):
         sessions.append({
-            "id": session_file.stem,
-            "date": mtime,
-            "size_kb": size_kb,
-            "preview": preview,
+            "id": entry["id"],
+            "date": entry_mtime(entry),
+            "size_kb": entry["size"] // 1024,
+            "preview": entry["preview"],
         })
     return sessions
 
 
 def get_session_messages(session_id: str):
     """Get all messages from a session."""
-    # Find the session file
-    session_file = None
-    project_encoded = None
-    for project_dir in PROJECTS_DIR.iterdir():
-        candidate = project_dir / f"{session_id}.jsonl"
-        if candidate.exists():
-            session_file = candidate
-            project_encoded = project_dir.name
-            break
-        # Try partial match
-        for f in project_dir.glob(f"{session_id}*.jsonl"):
-            session_file = f
-            project_encoded = project_dir.name
-            break
-        if session_file:
-            break
-
-    if not session_file:
+    entry = find_session(current_index(), session_id)
+    if not entry:
         return None, None
+    entry = fresh_entry(entry)
 
-    messages = []
-    with open(session_file) as f:
-        for line in f:
-            msg = json.loads(line)
-            msg_type = msg.get("type")
-
-            if msg_type == "user":
-                content = msg.get("message", {}).get("content", "")
-                if isinstance(content, str):
-                    messages.append({
-                        "role": "user",
-                        "content": content,
-                        "timestamp": msg.get("timestamp"),
-                    })
-                else:
-                    # Tool results - collect them
-                    tool_results = []
-                    for item in content:
-                        if item.get("type") == "tool_result":
-                            tool_results.append(item.get("content", ""))
-                    if tool_results:
-                        messages.append({
-                            "role": "tool_result",
-                            "results": tool_results,
-                            "timestamp": msg.get("timestamp"),
-                        })
-
-            elif msg_type == "assistant":
-                content = msg.get("message", {}).get("content", [])
-                blocks = []
-                for block in content:
-                    block_type = block.get("type")
-                    if block_type == "thinking":
-                        blocks.append({"type": "thinking", "content": block.get("thinking", "")})
-                    elif block_type == "text":
-                        blocks.append({"type": "text", "content": block.get("text", "")})
-                    elif block_type == "tool_use":
-                        blocks.append({
-                            "type": "tool_use",
-                            "name": block.get("name", ""),
-                            "input": json.dumps(block.get("input", {}), indent=2),
-                        })
-                if blocks:
-                    messages.append({
-                        "role": "assistant",
-                        "blocks": blocks,
-                        "timestamp": msg.get("timestamp"),
-                    })
-
-    return messages, project_encoded
+    try:
+        messages = [resolve(m) for m in load_messages(entry)]
+    except KeyError:
+        # Another request re-cached a changed file in between and released this version's blobs
+        entry = fresh_entry(entry)
+        messages = [resolve(m) for m in load_messages(entry)]
+    return messages, entry["project"]
 
 
 def search_history(query: str, limit: int = 50):
     """Search history.jsonl for matching prompts."""
-    history_file = CLAUDE_DIR / "history.jsonl"
-    if not history_file.exists():
-        return []
-
     matches = []
-    with open(history_file) as f:
-        for line in f:
-            entry = json.loads(line)
-            display = entry.get("display", "")
-            if query.lower() in display.lower():
-                matches.append({
-                    "timestamp": datetime.fromtimestamp(entry.get("timestamp", 0) / 1000),
-                    "session_id": entry.get("sessionId", ""),
-                    "display": display[:150],
-                    "project": entry.get("project", ""),
-                })
+    for entry in iter_history(ROOTS):
+        display = entry.get("display", "")
+        if query.lower() in display.lower():
+            matches.append({
+                "timestamp": datetime.fromtimestamp(entry.get("timestamp", 0) / 1000),
+                "session_id": entry.get("sessionId", ""),
+                "display": display[:150],
+                "project": entry.get("project", ""),
+            })
 
     # Return most recent first
     return matches[-limit:][::-1]
@@ -251,4 +201,11 @@ def search():
 
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
+    parser = argparse.ArgumentParser(description="Web UI for Claude Code history")
+    parser.add_argument("-r", "--root", action="append",
+                        help="History root, repeatable (default: $CLAUDE_HISTORY_ROOTS or ~/.claude)")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+    if args.root:
+        ROOTS = get_roots(args.root)
+    app.run(debug=True, port=args.port)
@@ -0,0 +1,93 @@
+"""AIMD concurrency limit for YouTube searches.
+
+Like TCP congestion control: while searches succeed with healthy latency
+and few errors, the limit grows by one per "round" (as many successes as
+the current limit); on a throttling error (HTTP 429 or a bot check) it is
+halved and every search pauses for a backoff that doubles while throttling
+continues. Throttles that arrive together (from searches started before
+the cut) only count once.
+"""
+
+import asyncio
+import time
+
+from batch_executor import is_throttled
+
+BOT_CHECK_MARKERS = ("not a bot", "Sign in to confirm", "HTTP Error 429")
+
+
+def is_search_throttled(error: str) -> bool:
+    return is_throttled(Exception(error)) or any(marker in error for marker in BOT_CHECK_MARKERS)
+
+
+class AimdLimiter:
+    def __init__(self, maximum: int, initial: int = 2, minimum: int = 1, latency_target: float = 5.0,
+                 max_error_rate: float = 0.2):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = max(minimum, min(initial, maximum))
+        self.latency_target = latency_target
+        self.max_error_rate = max_error_rate
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+        self.round_ok = 0
+        self.round_errors = 0
+        self.round_latency = 0.0
+        self.last_cut = 0.0
+        self.backoff = 0.0
+        self.resume_at = 0.0
+        self.stats = {"throttled": 0, "peak": self.limit, "cuts": 0}
+
+    async def __aenter__(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        delay = self.resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self
+
+    async def __aexit__(self, *exc):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    async def _set_limit(self, limit: int):
+        async with self.condition:
+            self.limit = limit
+            self.condition.notify_all()
+
+    async def success(self, started: float):
+        """Record a successful search started at `started` (time.monotonic())."""
+        self.round_latency += time.monotonic() - started
+        self.round_ok += 1
+        if started > self.last_cut:
+            self.backoff = 0.0
+        if self.round_ok + self.round_errors < self.limit:
+            return
+        healthy = (self.round_latency / self.round_ok <= self.latency_target
+                   and self.round_errors <= self.max_error_rate * (self.round_ok + self.round_errors))
+        self.round_ok = self.round_errors = 0
+        self.round_latency = 0.0
+        if healthy and self.limit < self.maximum:
+            await self._set_limit(self.limit + 1)
+            self.stats["peak"] = max(self.stats["peak"], self.limit)
+
+    def error(self):
+        """A failed search that wasn't throttling (counts against increasing the limit)."""
+        self.round_errors += 1
+
+    async def throttled(self, started: float):
+        """Record a throttling error for a search started at `started` (time.monotonic())."""
+        self.stats["throttled"] += 1
+        if started < self.last_cut:
+            return  # already cut for this burst
+        now = time.monotonic()
+        self.last_cut = now
+        self.backoff = min(60.0, max(2.0, self.backoff * 2))
+        self.resume_at = now + self.backoff
+        self.round_ok = self.round_errors = 0
+        self.round_latency = 0.0
+        self.stats["cuts"] += 1
+        await self._set_limit(max(self.minimum, self.limit // 2))
+        print(f"  Throttled: concurrency → {self.limit}, pausing {self.backoff:.0f}s")
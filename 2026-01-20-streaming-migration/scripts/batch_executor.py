@@ -0,0 +1,166 @@
+"""Shared executor for batched YTMusic mutations.
+
+Batches run on a small thread pool behind a token-bucket rate limiter.
+Throttling errors (HTTP 429) are retried with exponential backoff and
+jitter. Auth failures (HTTP 401/403) aren't about any one item: the
+batch fails as a whole and the run stops, with the remaining items
+reported as not attempted. Any other failure splits the batch in half
+and retries the halves, so one bad item only fails itself. Every item
+ends up in the report as succeeded or failed (with the error).
+"""
+
+import json
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+import telemetry
+
+THROTTLE_MARKERS = ("429", "Too Many Requests", "RESOURCE_EXHAUSTED", "rate limit")
+# Errors that would fail every batch alike: splitting can't isolate a bad item
+FATAL_MARKERS = ("HTTP 401", "HTTP 403", "Unauthorized", "Forbidden", "UNAUTHENTICATED", "PERMISSION_DENIED")
+
+
+class TokenBucket:
+    """Allow `rate` calls per second on average, with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+
+def is_throttled(error: Exception) -> bool:
+    message = str(error)
+    return any(marker in message for marker in THROTTLE_MARKERS)
+
+
+def is_fatal(error: Exception) -> bool:
+    message = str(error)
+    return any(marker in message for marker in FATAL_MARKERS)
+
+
+def check_status(result):
+    """Raise unless a ytmusicapi edit result reports success.
+
+    add_playlist_items returns a dict with "status", remove_playlist_items a
+    status string; both return the raw response on failure.
+    """
+    status = result.get("status") if isinstance(result, dict) else result
+    if isinstance(status, str) and "SUCCEEDED" in status:
+        return result
+    raise RuntimeError(f"Unexpected response: {str(result)[:200]}")
+
+
+def check_feedback(result: dict):
+    """Raise unless every token of an edit_song_library_status call was processed."""
+    responses = result.get("feedbackResponses", [])
+    if responses and all(r.get("isProcessed") for r in responses):
+        return result
+    raise RuntimeError(f"Feedback not processed: {str(result)[:200]}")
+
+
+def add_executor_args(parser, concurrency: int = 4):
+    parser.add_argument("--concurrency", type=int, default=concurrency,
+                        help=f"Parallel batches (default: {concurrency}; >1 doesn't preserve order across batches)")
+    parser.add_argument("--rate", type=float, default=2.0, help="Max calls per second (default: 2)")
+    parser.add_argument("--report", help="Write per-item success/failure report (JSON) to this path")
+
+
+def run_batches(items: list, call, batch_size: int = 50, concurrency: int = 4, rate: float = 2.0,
+                max_retries: int = 5, on_success=None, label: str = "done") -> dict:
+    """Run call(batch) over items in batches.
+
+    on_success(batch, result) is called (serialized) after each successful call.
+    Returns {"succeeded": [item, ...], "failed": [(item, error), ...], "calls": n, "retries": n}.
+    """
+    report = {"succeeded": [], "failed": [], "calls": 0, "retries": 0}
+    lock = threading.Lock()
+    bucket = TokenBucket(rate, burst=max(1, concurrency))
+    fatal = []  # The error that stopped the run
+
+    def run(batch: list) -> list[list]:
+        """Returns sub-batches to retry (after a split), else []."""
+        attempt = 0
+        while True:
+            bucket.acquire()
+            if fatal:
+                with lock:
+                    report["failed"].extend((item, f"Not attempted: {fatal[0]}") for item in batch)
+                return []
+            try:
+                with lock:
+                    report["calls"] += 1
+                telemetry.set_attempt(attempt)
+                result = call(batch)
+            except Exception as e:
+                if is_throttled(e) and attempt < max_retries:
+                    delay = min(60, 2 ** attempt) * (1 + random.random())
+                    print(f"  Throttled, retrying {len(batch)} items in {delay:.1f}s")
+                    with lock:
+                        report["retries"] += 1
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                if is_fatal(e):
+                    with lock:
+                        if not fatal:
+                            fatal.append(str(e).splitlines()[0])
+                            print(f"  Stopping: {e}")
+                        report["failed"].extend((item, str(e)) for item in batch)
+                    return []
+                if len(batch) > 1:
+                    mid = len(batch) // 2
+                    print(f"  Error on {len(batch)} items, splitting: {e}")
+                    return [batch[:mid], batch[mid:]]
+                with lock:
+                    report["failed"].append((batch[0], str(e)))
+                    print(f"  Failed: {batch[0]!r:.60} ({e})")
+                return []
+            with lock:
+                report["succeeded"].extend(batch)
+                if on_success:
+                    on_success(batch, result)
+                print(f"  {len(batch)} {label} ({len(report['succeeded'])}/{len(items)})")
+            return []
+
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = {executor.submit(run, batch) for batch in batches}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for sub in future.result():
+                    pending.add(executor.submit(run, sub))
+
+    return report
+
+
+def save_report(report: dict, path: str | None):
+    if not path:
+        return
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({
+            "succeeded": report["succeeded"],
+            "failed": [{"item": item, "error": error} for item, error in report["failed"]],
+            "calls": report["calls"],
+            "retries": report["retries"],
+        }, f, indent=2, ensure_ascii=False)
+    print(f"Report written to {path}")
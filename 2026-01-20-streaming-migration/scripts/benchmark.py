@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Benchmark the migration scripts against FakeYTMusic.
+
+Each run generates a playlist workload, runs one script (through its
+migrate.py entry point, with the fake as the client) in a scratch
+directory, and reports tracks/second with the calls, throttles and
+failures the fake saw. Every run starts cold, like a separate process:
+the auth check passed by an earlier run isn't reused (the library index
+is per directory already). Scenarios set the fake's latency, throttling and
+failure injection; --concurrency, --rate and --batch-size take lists to
+sweep.
+
+    benchmark.py --scenario ideal --scenario throttled --concurrency 1,4,8 --rate 2,10
+    benchmark.py --script import --batch-size 25,50,100 --tracks 5000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import client
+import telemetry
+from client import AUTH_FILE
+from fake_ytmusic import FakeYTMusic
+from migrate import run
+
+SCENARIOS = {
+    "ideal": {"latency": 0.05},
+    "slow": {"latency": 0.3, "per_item": 0.004},
+    "throttled": {"latency": 0.05, "rate_limit": 4},
+    "flaky": {"latency": 0.05, "failure_rate": 0.05, "bad_rate": 0.002},
+}
+SCRIPTS = ["import", "sync", "remove-duplicates", "to-library", "export-non-library"]
+# Scripts with a --batch-size option
+BATCHED = {"import", "sync"}
+
+SOURCE = "PLbenchmarkSource"
+TARGET = "PLbenchmarkTarget"
+
+
+def write_ids(path: Path, video_ids: list[str]):
+    with open(path, "w") as f:
+        for i, vid in enumerate(video_ids):
+            f.write(json.dumps({"index": i, "video_id": vid, "confidence": "high"}) + "\n")
+
+
+def workload(script: str, yt: FakeYTMusic, tracks: int, rng: random.Random) -> list[str]:
+    """Set up yt for script; returns the script's arguments."""
+    if script == "import":
+        write_ids(Path("ids.jsonl"), yt.new_video_ids(tracks))
+        return ["-i", "ids.jsonl", "-p", TARGET]
+    if script == "sync":
+        current = list(dict.fromkeys(yt.create_playlist_with(SOURCE, tracks)))
+        # Keep 80% (partly reordered), add 20% new
+        desired = rng.sample(current, int(len(current) * 0.8))
+        desired.sort(key=lambda v: current.index(v) + rng.gauss(0, 3))
+        desired += yt.new_video_ids(tracks - len(desired))
+        write_ids(Path("ids.jsonl"), desired)
+        return ["-i", "ids.jsonl", "-p", SOURCE]
+    yt.create_playlist_with(SOURCE, tracks)
+    if script == "export-non-library":
+        return ["-s", SOURCE, "-t", TARGET]
+    return ["-p", SOURCE]
+
+
+def bench(script: str, fake: dict, tracks: int, concurrency: int, rate: float | None, batch_size: int | None,
+          extra: list[str], seed: int, verbose: bool) -> dict:
+    yt = FakeYTMusic(seed=seed, **fake)
+    client._verified.clear()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            Path(AUTH_FILE).parent.mkdir(parents=True)
+            Path(AUTH_FILE).write_text("{}")
+            argv = workload(script, yt, tracks, random.Random(seed))
+            argv += ["--concurrency", str(concurrency)] + extra
+            if rate:
+                argv += ["--rate", str(rate)]
+                if script == "export-non-library":
+                    argv += ["--resolve-rate", str(rate)]
+            if batch_size:
+                argv += ["--batch-size", str(batch_size)]
+            output = sys.stdout if verbose else io.StringIO()
+            error = None
+            started = time.monotonic()
+            with contextlib.redirect_stdout(output):
+                try:
+                    run([script] + argv, telemetry.instrument(yt))
+                except SystemExit as e:
+                    if e.code not in (None, 0):
+                        error = f"exit {e.code}"
+                except Exception as e:
+                    error = f"{type(e).__name__}: {str(e).splitlines()[0]}"
+            elapsed = time.monotonic() - started
+        finally:
+            os.chdir(cwd)
+
+    writes = {k: v for k, v in yt.stats.items() if k not in ("get_playlist", "get_watch_playlist")}
+    return {
+        "script": script,
+        "concurrency": concurrency,
+        "rate": rate,
+        "batch_size": batch_size,
+        "tracks": tracks,
+        "seconds": round(elapsed, 2),
+        "tracks_per_second": round(tracks / elapsed, 1) if elapsed else None,
+        "calls": sum(s["calls"] for s in yt.stats.values()),
+        "write_calls": sum(s["calls"] for s in writes.values()),
+        "items_written": sum(s["items"] for s in writes.values()),
+        "throttled": sum(s["throttled"] for s in yt.stats.values()),
+        "failed": sum(s["failed"] for s in yt.stats.values()),
+        "error": error,
+        "endpoints": {k: dict(v) for k, v in yt.stats.items()},
+    }
+
+
+def int_list(value: str) -> list[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def float_list(value: str) -> list[float]:
+    return [float(v) for v in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark migration scripts against a fake YouTube Music")
+    parser.add_argument("--script", action="append", choices=SCRIPTS, help="Script to run (repeatable, default: all)")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="Latency/throttling/failure preset (repeatable, default: ideal)")
+    parser.add_argument("--tracks", type=int, default=2000, help="Tracks per workload (default: 2000)")
+    parser.add_argument("--concurrency", type=int_list, default=[4], help="Comma-separated values to sweep (default: 4)")
+    parser.add_argument("--rate", type=float_list, default=[None],
+                        help="Comma-separated calls/sec to sweep, also used as export-non-library's --resolve-rate "
+                             "(default: script default)")
+    parser.add_argument("--batch-size", type=int_list, default=[None],
+                        help="Comma-separated values to sweep, for import and sync (default: script default)")
+    parser.add_argument("--latency", type=float, help="Override the scenario's seconds per call")
+    parser.add_argument("--per-item", type=float, help="Override the scenario's extra seconds per item in a call")
+    parser.add_argument("--rate-limit", type=float, help="Override the scenario's calls/sec before HTTP 429")
+    parser.add_argument("--failure-rate", type=float, help="Override the scenario's fraction of failing calls")
+    parser.add_argument("--bad-rate", type=float, help="Override the scenario's fraction of always-failing items")
+    parser.add_argument("--script-args", default="", help="Extra arguments for every script run, e.g. '--rate 10'")
+    parser.add_argument("--seed", type=int, default=0, help="Workload and fault injection seed (default: 0)")
+    parser.add_argument("--json", help="Also write all results to this JSON file")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Show script output")
+    args = parser.parse_args()
+
+    # Runs happen in scratch directories; keep the telemetry log here
+    telemetry.RUN_DIR = telemetry.RUN_DIR.resolve()
+
+    overrides = {k: getattr(args, k) for k in ("latency", "per_item", "rate_limit", "failure_rate", "bad_rate")
+                 if getattr(args, k) is not None}
+    extra = args.script_args.split()
+
+    results = []
+    print(f"{'script':<19} {'scenario':<10} {'conc':>4} {'rate':>5} {'batch':>5} {'seconds':>8} {'tracks/s':>9} "
+          f"{'calls':>6} {'429s':>5} {'fails':>5}")
+    runs = [(scenario, script, concurrency, rate, batch_size)
+            for scenario in args.scenario or ["ideal"]
+            for script in args.script or SCRIPTS
+            for concurrency in args.concurrency
+            for rate in args.rate
+            for batch_size in (args.batch_size if script in BATCHED else [None])]
+    for scenario, script, concurrency, rate, batch_size in runs:
+        fake = {**SCENARIOS[scenario], **overrides}
+        telemetry.start(f"{script}/{scenario}")
+        result = bench(script, fake, args.tracks, concurrency, rate, batch_size, extra, args.seed, args.verbose)
+        result["scenario"] = scenario
+        result["fake"] = fake
+        results.append(result)
+        print(f"{script:<19} {scenario:<10} {concurrency:>4} {rate or '-':>5} {batch_size or '-':>5} {result['seconds']:>8.2f} "
+              f"{result['tracks_per_second']:>9.1f} {result['calls']:>6} {result['throttled']:>5} {result['failed']:>5}"
+              + (f"  ({result['error']})" if result["error"] else ""))
+
+    telemetry.flush()
+    if telemetry.run_file():
+        print(f"\nCall log: telemetry.py report {telemetry.run_file().stem}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
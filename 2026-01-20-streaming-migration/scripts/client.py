@@ -0,0 +1,117 @@
+"""Shared YTMusic client and auth check for the migration scripts.
+
+One authenticated client per process, on a requests.Session with a
+keep-alive connection pool sized for the scripts' thread pools, so chained
+commands (migrate.py) and concurrent batches reuse connections. Its calls
+are recorded in the telemetry run log (telemetry.py).
+
+The auth check (a known counterpart lookup) costs a round trip, so a
+passing check is remembered for AUTH_TTL seconds: in memory for the
+process and in data/cache/auth.json for later runs (e.g. a shell loop).
+The cached result is tied to a hash of the auth file, so pasting fresh
+credentials always triggers a new check.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from ytmusicapi import YTMusic
+
+import telemetry
+
+AUTH_FILE = "data/ytmusicapi-browser.json"
+AUTH_CACHE = Path("data/cache/auth.json")
+# Seconds a passing auth check is trusted (credentials go stale in hours)
+AUTH_TTL = float(os.environ.get("YTM_AUTH_TTL", 600))
+# Enough connections for the largest thread pools (counterpart lookups, batches)
+POOL_SIZE = 16
+
+_client = None
+_verified = {}  # auth file fingerprint -> time of last passing check
+
+
+def check_auth(yt: YTMusic) -> bool:
+    """Verify credentials by testing counterpart lookup on known video pair."""
+    try:
+        # Dirty Loops - Next to You: ATV (rT_isNWT4gQ) <-> OMV (rV9uCmlMQ1c)
+        watch = yt.get_watch_playlist("rT_isNWT4gQ")
+        counterpart = watch["tracks"][0].get("counterpart")
+        return counterpart is not None and counterpart.get("videoId") == "rV9uCmlMQ1c"
+    except Exception:
+        return False
+
+
+def _fingerprint(auth_file: str) -> str:
+    with open(auth_file, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _load_cache() -> dict:
+    try:
+        with open(AUTH_CACHE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache: dict):
+    AUTH_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = AUTH_CACHE.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, AUTH_CACHE)
+
+
+def auth_ok(yt: YTMusic, auth_file: str = AUTH_FILE, ttl: float | None = None) -> bool:
+    """check_auth, skipped if it passed for the same auth file within ttl seconds."""
+    ttl = AUTH_TTL if ttl is None else ttl
+    key = _fingerprint(auth_file)
+    now = time.time()
+    if now - _verified.get(key, 0) < ttl:
+        return True
+
+    cache = _load_cache()
+    if cache.get("fingerprint") == key and now - cache.get("checkedAt", 0) < ttl:
+        _verified[key] = cache["checkedAt"]
+        print(f"Auth OK (checked {now - cache['checkedAt']:.0f}s ago)")
+        return True
+
+    print("Checking credentials...")
+    if not check_auth(yt):
+        _verified.pop(key, None)
+        if cache.get("fingerprint") == key:
+            _save_cache({})
+        return False
+    _verified[key] = now
+    _save_cache({"fingerprint": key, "checkedAt": now})
+    print("Auth OK")
+    return True
+
+
+def get_client(auth_file: str = AUTH_FILE) -> YTMusic:
+    """The process-wide YTMusic client (created on first use)."""
+    global _client
+    if _client is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+        session.mount("https://", adapter)
+        _client = telemetry.instrument(YTMusic(auth_file, requests_session=session))
+    return _client
+
+
+def connect(yt: YTMusic | None = None, check: bool = True) -> YTMusic:
+    """yt, or the shared client, with verified credentials (exits if they're stale)."""
+    yt = yt or get_client()
+    if check and not auth_ok(yt):
+        print("Error: Auth credentials are stale. Please refresh:")
+        print("  1. Go to music.youtube.com (logged in)")
+        print("  2. DevTools → Network → find any POST request")
+        print(f"  3. Update {AUTH_FILE} (see \"Auth setup\" in plan.md)")
+        sys.exit(1)
+    return yt
@@ -0,0 +1,126 @@
+"""Resolve OMV/UGC videos to their Art Track (ATV) counterparts.
+
+get_watch_playlist(videoId) returns the song with a `counterpart`: the
+ATV for an official music video (and vice versa). An OMV whose ATV
+counterpart has an add token can go to the library instead of the
+fallback playlist.
+
+Lookups run concurrently behind the shared token bucket, with the same
+throttling backoff as batch mutations, and results are cached in
+data/cache/counterparts.json (including "no counterpart"), so thousands
+of tracks are resolved once and later runs only look up new videos and
+entries older than COUNTERPART_TTL. Whether a counterpart is in the
+library isn't cached: it changes with every add, so callers check the
+library index instead.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import telemetry
+from batch_executor import TokenBucket, is_throttled
+
+CACHE_FILE = Path("data/cache/counterparts.json")
+ATV = "MUSIC_VIDEO_TYPE_ATV"
+SAVE_EVERY = 100
+# Seconds a cached lookup is trusted (new ATVs appear, add tokens change)
+COUNTERPART_TTL = float(os.environ.get("YTM_COUNTERPART_TTL", 30 * 86400))
+
+
+def _compact(counterpart: dict | None) -> dict | None:
+    if not counterpart or not counterpart.get("videoId"):
+        return None
+    artists = counterpart.get("artists") or []
+    tokens = counterpart.get("feedbackTokens") or {}
+    return {
+        "videoId": counterpart["videoId"],
+        "videoType": counterpart.get("videoType"),
+        "title": counterpart.get("title") or "Unknown",
+        "artist": artists[0].get("name", "Unknown") if artists else "Unknown",
+        "addToken": tokens.get("add"),
+    }
+
+
+def load_cache() -> dict:
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache: dict):
+    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE_FILE.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp, CACHE_FILE)
+
+
+def lookup(yt, video_id: str) -> dict | None:
+    """Compact counterpart of video_id, or None if it has none."""
+    watch = yt.get_watch_playlist(video_id, limit=1)
+    tracks = watch.get("tracks") or []
+    return _compact(tracks[0].get("counterpart")) if tracks else None
+
+
+def resolve(yt, video_ids: list[str], concurrency: int = 8, rate: float = 5.0, refresh: bool = False,
+            max_retries: int = 5, ttl: float | None = None) -> dict[str, dict | None]:
+    """Counterparts for video_ids ({videoId: counterpart or None}); failed lookups are left out.
+
+    Cached entries checked more than ttl seconds ago (default COUNTERPART_TTL)
+    are looked up again; if that lookup fails, the old entry is used.
+    """
+    cache = {} if refresh else load_cache()
+    oldest = time.time() - (COUNTERPART_TTL if ttl is None else ttl)
+    todo = [v for v in dict.fromkeys(video_ids) if v not in cache or cache[v].get("checkedAt", 0) < oldest]
+    expired = sum(1 for v in todo if v in cache)
+    print(f"Counterparts: {len(video_ids) - len(todo)} cached, {len(todo)} to look up ({expired} expired)")
+
+    bucket = TokenBucket(rate, burst=max(1, concurrency))
+    lock = threading.Lock()
+    done = 0
+    failed = 0
+
+    def fetch(video_id: str):
+        nonlocal done, failed
+        for attempt in range(max_retries + 1):
+            bucket.acquire()
+            try:
+                telemetry.set_attempt(attempt)
+                result = lookup(yt, video_id)
+                break
+            except Exception as e:
+                if is_throttled(e) and attempt < max_retries:
+                    time.sleep(min(60, 2 ** attempt) * (1 + random.random()))
+                    continue
+                with lock:
+                    failed += 1
+                    print(f"  Failed: {video_id} ({e})")
+                return
+        with lock:
+            cache[video_id] = {"counterpart": result, "checkedAt": time.time()}
+            done += 1
+            if done % SAVE_EVERY == 0:
+                save_cache(cache)
+                print(f"  {done}/{len(todo)} looked up")
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(fetch, todo))
+        save_cache(cache)
+        print(f"  Looked up {done} ({failed} failed)")
+
+    return {v: cache[v]["counterpart"] for v in video_ids if v in cache}
+
+
+def add_resolver_args(parser):
+    parser.add_argument("--no-resolve", action="store_true", help="Don't look up ATV counterparts")
+    parser.add_argument("--resolve-concurrency", type=int, default=8, help="Parallel counterpart lookups (default: 8)")
+    parser.add_argument("--resolve-rate", type=float, default=5.0, help="Max counterpart lookups per second (default: 5)")
+    parser.add_argument("--refresh-counterparts", action="store_true", help="Look up counterparts again instead of using the cache")
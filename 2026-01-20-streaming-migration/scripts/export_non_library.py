@@ -2,50 +2,38 @@
 """Export non-library-able songs (OMV/UGC) to a fallback playlist.
 
 These are songs that can't be added to the YT Music Artists tab.
+OMVs whose Art Track counterpart can be added are added to the library
+(as the ATV) instead of the fallback playlist.
 """
 
 import argparse
-import sys
 
 from ytmusicapi import YTMusic
 
-AUTH_FILE = "data/ytmusicapi-browser.json"
+from batch_executor import add_executor_args, check_status, run_batches, save_report
+from client import connect
+from counterparts import ATV, add_resolver_args, resolve
+from library_index import add_library_args, get_library, mark_in_library
+from playlist_cache import get_tracks, record_added
+from playlist_to_library import add_to_library
 
 
-def check_auth(yt: YTMusic) -> bool:
-    """Verify credentials by testing counterpart lookup on known video pair."""
-    try:
-        # Dirty Loops - Next to You: ATV (rT_isNWT4gQ) <-> OMV (rV9uCmlMQ1c)
-        watch = yt.get_watch_playlist("rT_isNWT4gQ")
-        counterpart = watch["tracks"][0].get("counterpart")
-        return counterpart is not None and counterpart.get("videoId") == "rV9uCmlMQ1c"
-    except Exception:
-        return False
-
-
-def main():
+def main(argv: list[str] | None = None, yt: YTMusic | None = None):
     parser = argparse.ArgumentParser(description="Export non-library songs to fallback playlist")
     parser.add_argument("--source", "-s", required=True, help="Source playlist ID")
     parser.add_argument("--target", "-t", required=True, help="Target fallback playlist ID")
     parser.add_argument("--dry-run", "-n", action="store_true", help="Show what would be done")
-    args = parser.parse_args()
-
-    yt = YTMusic(AUTH_FILE)
+    add_executor_args(parser)
+    parser.add_argument("--refresh", action="store_true", help="Refetch playlists instead of using the local snapshot")
+    add_resolver_args(parser)
+    add_library_args(parser)
+    args = parser.parse_args(argv)
 
-    # Verify auth is valid
-    print("Checking credentials...")
-    if not check_auth(yt):
-        print("Error: Auth credentials are stale. Please refresh:")
-        print("  1. Go to music.youtube.com (logged in)")
-        print("  2. DevTools → Network → find any POST request")
-        print("  3. Update data/ytmusicapi-browser.json")
-        sys.exit(1)
-    print("Auth OK")
+    yt = connect(yt)
 
     # Fetch source playlist
     print(f"Fetching source playlist {args.source}...")
-    source = yt.get_playlist(args.source, limit=None)
-    tracks = source.get("tracks", [])
+    tracks = get_tracks(yt, args.source, args.refresh)
     print(f"Found {len(tracks)} tracks")
 
     # Collect non-ATV video IDs
@@ -53,22 +41,55 @@ def main():
     atv_count = 0
 
     for track in tracks:
-        video_type = track.get("videoType")
-        video_id = track.get("videoId")
+        video_type = track["videoType"]
+        video_id = track["videoId"]
 
         if video_type == "MUSIC_VIDEO_TYPE_ATV":
             atv_count += 1
         elif video_id:
-            non_atv.append({
-                "videoId": video_id,
-                "title": track.get("title", "Unknown"),
-                "artist": track.get("artists", [{}])[0].get("name", "Unknown") if track.get("artists") else "Unknown",
-                "videoType": video_type,
-            })
+            non_atv.append(track)
 
     print(f"\nArt Tracks (skip): {atv_count}")
+    print(f"Non-ATV: {len(non_atv)}")
+
+    # Route tracks with an addable ATV counterpart to the library instead
+    to_library = {}  # add token -> tracks it stands in for
+    video_of = {}  # add token -> counterpart videoId
+    counterpart_in_library = 0
+    if non_atv and not args.no_resolve:
+        print(f"\nResolving ATV counterparts...")
+        counterparts = resolve(yt, [t["videoId"] for t in non_atv], args.resolve_concurrency,
+                               args.resolve_rate, args.refresh_counterparts)
+        library = get_library(yt, args.refresh_library)
+        fallback = []
+        for t in non_atv:
+            counterpart = counterparts.get(t["videoId"])
+            if not counterpart or counterpart["videoType"] != ATV:
+                fallback.append(t)
+            elif counterpart["videoId"] in library:
+                counterpart_in_library += 1
+            elif counterpart["addToken"]:
+                to_library.setdefault(counterpart["addToken"], []).append(t)
+                video_of[counterpart["addToken"]] = counterpart["videoId"]
+            else:
+                fallback.append(t)
+        non_atv = fallback
+        print(f"ATV counterpart → library: {len(to_library)}")
+        print(f"ATV counterpart already in library: {counterpart_in_library}")
+
     print(f"Non-ATV (export): {len(non_atv)}")
 
+    if to_library:
+        if args.dry_run:
+            print(f"\n[DRY RUN] Would add {len(to_library)} ATV counterparts to library")
+        else:
+            print(f"\nAdding ATV counterparts to library...")
+            report = add_to_library(yt, list(to_library), args.concurrency, args.rate,
+                                    on_success=lambda batch, result: mark_in_library(video_of[t] for t in batch))
+            print(f"Added {len(report['succeeded'])} to library ({len(report['failed'])} failed)")
+            # Tracks whose counterpart couldn't be added go to the fallback playlist
+            non_atv += [t for token, _ in report["failed"] for t in to_library[token]]
+
     if not non_atv:
         print("\nNo non-ATV tracks to export")
         return
@@ -87,8 +108,7 @@ def main():
 
     # Fetch target playlist to check for existing tracks
     print(f"\nFetching target playlist {args.target}...")
-    target = yt.get_playlist(args.target, limit=None)
-    existing = {t.get("videoId") for t in target.get("tracks", [])}
+    existing = {t["videoId"] for t in get_tracks(yt, args.target, args.refresh)}
     print(f"Target has {len(existing)} existing tracks")
 
     # Filter out already-present tracks
@@ -112,21 +132,19 @@ def main():
     # Add to playlist
     print(f"\nAdding to fallback playlist...")
     video_ids = [t["videoId"] for t in to_add]
-    batch_size = 50
-    success = 0
-    failed = 0
-
-    for i in range(0, len(video_ids), batch_size):
-        batch = video_ids[i:i + batch_size]
-        try:
-            yt.add_playlist_items(args.target, batch, duplicates=True)
-            success += len(batch)
-            print(f"  Batch {i // batch_size + 1}: {len(batch)} added")
-        except Exception as e:
-            print(f"  Error: {e}")
-            failed += len(batch)
-
-    print(f"\nDone! Added {success} to fallback playlist ({failed} failed)")
+    known = {t["videoId"]: t for t in to_add}
+    # Sequential, so tracks keep their playlist order (--concurrency applies to library adds)
+    report = run_batches(
+        video_ids,
+        lambda batch: check_status(yt.add_playlist_items(args.target, batch, duplicates=True)),
+        concurrency=1,
+        rate=args.rate,
+        on_success=lambda batch, result: record_added(args.target, result, known),
+        label="added",
+    )
+    save_report(report, args.report)
+
+    print(f"\nDone! Added {len(report['succeeded'])} to fallback playlist ({len(report['failed'])} failed)")
 
 
 if __name__ == "__main__":
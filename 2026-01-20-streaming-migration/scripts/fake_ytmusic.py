@@ -0,0 +1,213 @@
+"""In-memory stand-in for YTMusic, for benchmarking the scripts offline.
+
+FakeYTMusic implements the calls the migration scripts make
+(get_playlist, get_library_songs, add_playlist_items, remove_playlist_items,
+edit_playlist, edit_song_library_status, get_watch_playlist) with the same response
+shapes, on playlists it generates itself. Each call can be slowed down,
+throttled or failed:
+
+    latency        seconds per call, plus per_item seconds per item in the call
+    jitter         latency is multiplied by a random factor in [1 - jitter, 1 + jitter]
+    rate_limit     calls per second across all threads; calls over it raise HTTP 429
+                   (playlist and library reads are exempt: the scripts don't retry them)
+    failure_rate   fraction of calls that raise HTTP 500
+    bad_rate       fraction of videos/tokens that always fail (so batches holding one fail)
+
+Errors are YTMusicServerError with the real messages, so the scripts'
+throttling and split-retry handling see what they would in production.
+`stats` counts calls, items, throttles and failures per endpoint.
+"""
+
+import random
+import threading
+import time
+from collections import defaultdict, deque
+
+from ytmusicapi.exceptions import YTMusicServerError
+
+ATV = "MUSIC_VIDEO_TYPE_ATV"
+OMV = "MUSIC_VIDEO_TYPE_OMV"
+UGC = "MUSIC_VIDEO_TYPE_UGC"
+
+# The pair client.check_auth looks up
+AUTH_PAIR = ("rT_isNWT4gQ", "rV9uCmlMQ1c")
+
+PAGE_SIZE = 100
+LIBRARY_PAGE_SIZE = 25
+
+
+class FakeYTMusic:
+    def __init__(self, latency: float = 0.05, per_item: float = 0.0, jitter: float = 0.2,
+                 rate_limit: float | None = None, failure_rate: float = 0.0, bad_rate: float = 0.0,
+                 seed: int = 0):
+        self.latency = latency
+        self.per_item = per_item
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.failure_rate = failure_rate
+        self.bad_rate = bad_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent = deque()  # call times within the last second, for rate_limit
+        self.playlists = {}  # playlistId -> [track, ...]
+        self.songs = {}  # videoId -> track template
+        self.library = {}  # videoIds, in the order they were added
+        self.bad = set()  # videoIds/tokens that always fail
+        self.next_set_id = 0
+        self.stats = defaultdict(lambda: {"calls": 0, "items": 0, "throttled": 0, "failed": 0})
+
+    # Test data
+
+    def _song(self, n: int, video_type: str) -> dict:
+        video_id = f"{video_type[-3:].lower()}{n:08d}"
+        song = {
+            "videoId": video_id,
+            "title": f"Song {n}",
+            "artists": [{"name": f"Artist {n % 997}"}],
+            "videoType": video_type,
+            "feedbackTokens": {"add": f"add-{video_id}", "remove": f"remove-{video_id}"} if video_type == ATV else None,
+        }
+        self.songs[video_id] = song
+        if self.random.random() < self.bad_rate:
+            self.bad.add(video_id)
+            if song["feedbackTokens"]:
+                self.bad.add(song["feedbackTokens"]["add"])
+        return song
+
+    def create_playlist_with(self, playlist_id: str, tracks: int, omv: float = 0.3, ugc: float = 0.1,
+                             duplicates: float = 0.05, in_library: float = 0.0) -> list[str]:
+        """Fill playlist_id with generated tracks; returns their videoIds in order.
+
+        omv/ugc: fraction of OMV and UGC uploads (each OMV has an ATV counterpart),
+        duplicates: fraction of entries repeating an earlier video,
+        in_library: fraction of ATVs already in the library.
+        """
+        items = []
+        for n in range(tracks):
+            if items and self.random.random() < duplicates:
+                items.append(self._entry(self.random.choice(items)["videoId"]))
+                continue
+            r = self.random.random()
+            video_type = OMV if r < omv else UGC if r < omv + ugc else ATV
+            song = self._song(len(self.songs), video_type)
+            if video_type == OMV:
+                song["counterpart"] = self._song(len(self.songs), ATV)["videoId"]
+            elif video_type == ATV and self.random.random() < in_library:
+                self.library[song["videoId"]] = None
+            items.append(self._entry(song["videoId"]))
+        self.playlists[playlist_id] = items
+        return [t["videoId"] for t in items]
+
+    def new_video_ids(self, count: int) -> list[str]:
+        """videoIds of generated ATVs not in any playlist (to import)."""
+        return [self._song(len(self.songs), ATV)["videoId"] for _ in range(count)]
+
+    def _entry(self, video_id: str) -> dict:
+        self.next_set_id += 1
+        return {"videoId": video_id, "setVideoId": f"set{self.next_set_id:010d}"}
+
+    def _track(self, entry: dict) -> dict:
+        song = self.songs.get(entry["videoId"]) or {"videoId": entry["videoId"], "title": "Unknown", "artists": []}
+        return {**song, "setVideoId": entry["setVideoId"], "inLibrary": song["videoId"] in self.library}
+
+    # Fault injection
+
+    def _call(self, endpoint: str, items: int = 1, keys=(), limited: bool = True):
+        stats = self.stats[endpoint]
+        with self.lock:
+            stats["calls"] += 1
+            now = time.monotonic()
+            if self.rate_limit and limited:
+                while self.recent and now - self.recent[0] >= 1.0:
+                    self.recent.popleft()
+                if len(self.recent) >= self.rate_limit:
+                    stats["throttled"] += 1
+                    raise YTMusicServerError("Server returned HTTP 429: Too Many Requests.\nRESOURCE_EXHAUSTED")
+                self.recent.append(now)
+            delay = (self.latency + self.per_item * items) * (1 + self.jitter * (2 * self.random.random() - 1))
+            fail = self.random.random() < self.failure_rate or any(k in self.bad for k in keys)
+        time.sleep(max(0.0, delay))
+        if fail:
+            with self.lock:
+                stats["failed"] += 1
+            raise YTMusicServerError("Server returned HTTP 500: Internal Server Error.\nInternal error encountered.")
+        with self.lock:
+            stats["items"] += items
+
+    # YTMusic API
+
+    def get_playlist(self, playlistId: str, limit: int | None = 100, related: bool = False, suggestions_limit: int = 0):
+        entries = self.playlists.get(playlistId, [])
+        count = len(entries) if limit is None else min(len(entries), limit)
+        # One request per page of 100
+        for page in range(max(1, -(-count // PAGE_SIZE))):
+            self._call("get_playlist", min(PAGE_SIZE, count - page * PAGE_SIZE), limited=False)
+        with self.lock:
+            return {"id": playlistId, "trackCount": len(entries), "tracks": [self._track(e) for e in entries[:count]]}
+
+    def get_library_songs(self, limit: int | None = 25, validate_responses: bool = False, order: str | None = None):
+        with self.lock:
+            video_ids = list(self.library)
+        if order == "recently_added":
+            video_ids.reverse()
+        count = len(video_ids) if limit is None else min(len(video_ids), limit)
+        for page in range(max(1, -(-count // LIBRARY_PAGE_SIZE))):
+            self._call("get_library_songs", min(LIBRARY_PAGE_SIZE, count - page * LIBRARY_PAGE_SIZE), limited=False)
+        with self.lock:
+            return [{**self.songs[v], "inLibrary": True} for v in video_ids[:count]]
+
+    def add_playlist_items(self, playlistId: str, videoIds: list[str] | None = None, source_playlist=None,
+                           duplicates: bool = False):
+        videoIds = videoIds or []
+        self._call("add_playlist_items", len(videoIds), videoIds)
+        with self.lock:
+            entries = self.playlists.setdefault(playlistId, [])
+            present = {e["videoId"] for e in entries}
+            new = [self._entry(v) for v in videoIds if duplicates or v not in present]
+            entries.extend(new)
+        return {"status": "STATUS_SUCCEEDED",
+                "playlistEditResults": [{"videoId": e["videoId"], "setVideoId": e["setVideoId"]} for e in new]}
+
+    def remove_playlist_items(self, playlistId: str, videos: list[dict]):
+        self._call("remove_playlist_items", len(videos), [v["videoId"] for v in videos])
+        removed = {v["setVideoId"] for v in videos}
+        with self.lock:
+            self.playlists[playlistId] = [e for e in self.playlists.get(playlistId, []) if e["setVideoId"] not in removed]
+        return "STATUS_SUCCEEDED"
+
+    def edit_playlist(self, playlistId: str, moveItem: str | tuple[str, str] | None = None, **kwargs):
+        self._call("edit_playlist")
+        if moveItem:
+            sid, successor = (moveItem, None) if isinstance(moveItem, str) else moveItem
+            with self.lock:
+                entries = self.playlists[playlistId]
+                entry = next(e for e in entries if e["setVideoId"] == sid)
+                entries.remove(entry)
+                at = next((i for i, e in enumerate(entries) if e["setVideoId"] == successor), len(entries))
+                entries.insert(at, entry)
+        return "STATUS_SUCCEEDED"
+
+    def edit_song_library_status(self, feedbackTokens: list[str] | None = None):
+        feedbackTokens = feedbackTokens or []
+        self._call("edit_song_library_status", len(feedbackTokens), feedbackTokens)
+        with self.lock:
+            for token in feedbackTokens:
+                if token.startswith("add-"):
+                    self.library[token[4:]] = None
+                elif token.startswith("remove-"):
+                    self.library.pop(token[7:], None)
+        return {"feedbackResponses": [{"isProcessed": True} for _ in feedbackTokens]}
+
+    def get_watch_playlist(self, videoId: str | None = None, playlistId: str | None = None, limit: int = 25, **kwargs):
+        self._call("get_watch_playlist")
+        if videoId == AUTH_PAIR[0]:
+            return {"tracks": [{"videoId": videoId, "counterpart": {"videoId": AUTH_PAIR[1]}}]}
+        with self.lock:
+            song = self.songs.get(videoId)
+            if not song:
+                return {"tracks": []}
+            track = {**song, "inLibrary": videoId in self.library}
+            counterpart = self.songs.get(song.get("counterpart"))
+            if counterpart:
+                track["counterpart"] = {**counterpart, "inLibrary": counterpart["videoId"] in self.library}
+        return {"tracks": [track]}
@@ -2,27 +2,54 @@
 """Find duplicate videos in a playlist."""
 
 import argparse
-import sys
 from collections import defaultdict
 
 from ytmusicapi import YTMusic
 
-AUTH_FILE = "data/ytmusicapi-browser.json"
+from client import connect
+from near_duplicates import DEFAULT_THRESHOLD, find_clusters
+from playlist_cache import get_tracks
 
 
-def main():
+def print_clusters(clusters: list[dict]):
+    if not clusters:
+        print("\nNo near-duplicates found")
+        return
+
+    print()
+    for cluster in sorted(clusters, key=lambda c: -len(c["duplicates"])):
+        canonical = cluster["canonical"]
+        print(f"[{len(cluster['duplicates']) + 1}x] {canonical['artist']} - {canonical['title']}")
+        for entry in [canonical] + cluster["duplicates"]:
+            keep = "keep" if entry is canonical else "    "
+            kind = (entry["videoType"] or "").removeprefix("MUSIC_VIDEO_TYPE_") or "?"
+            print(f"     {keep} #{entry['index']} {kind:<4} {entry['videoId']} {entry['artist']} - {entry['title']}")
+        print()
+
+    print(f"Found {len(clusters)} songs with near-duplicates")
+    print(f"Total duplicate entries: {sum(len(c['duplicates']) for c in clusters)}")
+
+
+def main(argv: list[str] | None = None, yt: YTMusic | None = None):
     parser = argparse.ArgumentParser(description="Find duplicate videos in a playlist")
     parser.add_argument("--playlist", "-p", required=True, help="Playlist ID")
-    args = parser.parse_args()
+    parser.add_argument("--refresh", action="store_true", help="Refetch playlists instead of using the local snapshot")
+    parser.add_argument("--near", action="store_true",
+                        help="Also match the same song under different videoIds (ATV/OMV/UGC) by artist and title")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Title similarity needed for --near (0-1, default: {DEFAULT_THRESHOLD})")
+    args = parser.parse_args(argv)
 
-    yt = YTMusic(AUTH_FILE)
+    yt = connect(yt, check=False)
 
     print(f"Fetching playlist {args.playlist}...")
-    playlist = yt.get_playlist(args.playlist, limit=None)
-
-    tracks = playlist.get("tracks", [])
+    tracks = get_tracks(yt, args.playlist, args.refresh)
     print(f"Found {len(tracks)} tracks")
 
+    if args.near:
+        print_clusters(find_clusters(tracks, args.threshold))
+        return
+
     # Group by video ID
     by_video_id = defaultdict(list)
     for i, track in enumerate(tracks):
@@ -30,9 +57,9 @@ def main():
         if video_id:
             by_video_id[video_id].append({
                 "index": i,
-                "title": track.get("title", "Unknown"),
-                "artist": track.get("artists", [{}])[0].get("name", "Unknown") if track.get("artists") else "Unknown",
-                "setVideoId": track.get("setVideoId"),
+                "title": track["title"],
+                "artist": track["artist"],
+                "setVideoId": track["setVideoId"],
             })
 
     # Find duplicates
@@ -9,16 +9,11 @@ from pathlib import Path
 
 from ytmusicapi import YTMusic
 
-AUTH_FILE = "data/ytmusicapi-browser.json"
-
-
-def check_auth(yt: YTMusic) -> bool:
-    """Verify credentials are valid with a lightweight API call."""
-    try:
-        yt.get_library_songs(limit=1)
-        return True
-    except Exception:
-        return False
+from batch_executor import add_executor_args, check_status, run_batches, save_report
+from client import connect
+from journal import Journal, add_journal_args, open_run
+from playlist_cache import get_tracks, record_added
+from results_store import ResultsStore
 
 
 def load_video_ids_jsonl(path: Path, confidence: str | None = None) -> list[str]:
@@ -35,6 +30,15 @@ def load_video_ids_jsonl(path: Path, confidence: str | None = None) -> list[str]
     return video_ids
 
 
+def load_video_ids_store(path: Path, confidence: str | None = None) -> list[str]:
+    """Load video IDs from the results store (one per query index), optionally filtering by exact confidence."""
+    store = ResultsStore(path)
+    try:
+        return store.video_ids(confidence)
+    finally:
+        store.close()
+
+
 def load_video_ids_tsv(path: Path) -> list[str]:
     """Load video IDs from review TSV (extracts from URL column)."""
     video_ids = []
@@ -50,80 +54,114 @@ def load_video_ids_tsv(path: Path) -> list[str]:
     return video_ids
 
 
-def get_existing_video_ids(yt: YTMusic, playlist_id: str) -> set[str]:
+def load_video_ids(path: Path, confidence: str | None = None) -> list[str]:
+    """Load video IDs from a results store, results JSONL or review TSV, by file type."""
+    if path.suffix in (".sqlite", ".db"):
+        return load_video_ids_store(path, confidence=confidence)
+    elif path.suffix == ".jsonl":
+        return load_video_ids_jsonl(path, confidence=confidence)
+    elif path.suffix == ".tsv":
+        return load_video_ids_tsv(path)
+    print(f"Error: Unsupported file type {path.suffix}")
+    sys.exit(1)
+
+
+def get_existing_video_ids(yt: YTMusic, playlist_id: str, refresh: bool = False) -> set[str]:
     """Fetch existing video IDs in playlist to avoid duplicates."""
     print(f"Fetching existing playlist contents...")
-    playlist = yt.get_playlist(playlist_id, limit=None)
-    existing = {track["videoId"] for track in playlist.get("tracks", []) if track.get("videoId")}
+    existing = {track["videoId"] for track in get_tracks(yt, playlist_id, refresh) if track["videoId"]}
     print(f"  Found {len(existing)} existing tracks")
     return existing
 
 
-def main():
+def main(argv: list[str] | None = None, yt: YTMusic | None = None):
     parser = argparse.ArgumentParser(description="Import videos to YouTube Music playlist")
-    parser.add_argument("--input", "-i", required=True, help="Input file (jsonl or tsv)")
-    parser.add_argument("--playlist", "-p", required=True, help="Target playlist ID")
+    parser.add_argument("--input", "-i", help="Input file (results.sqlite, jsonl or tsv)")
+    parser.add_argument("--playlist", "-p", help="Target playlist ID")
     parser.add_argument("--confidence", "-c", choices=["high", "medium", "low", "none"],
-                        help="Minimum confidence level (jsonl only)")
+                        help="Only this confidence level (sqlite/jsonl only)")
     parser.add_argument("--batch-size", "-b", type=int, default=50, help="Videos per batch (default: 50)")
     parser.add_argument("--dry-run", "-n", action="store_true", help="Show what would be done")
-    args = parser.parse_args()
-
-    input_path = Path(args.input)
-    if not input_path.exists():
-        print(f"Error: {input_path} not found")
-        sys.exit(1)
-
-    # Load video IDs based on file type
-    if input_path.suffix == ".jsonl":
-        video_ids = load_video_ids_jsonl(input_path, confidence=args.confidence)
-    elif input_path.suffix == ".tsv":
-        video_ids = load_video_ids_tsv(input_path)
+    # Parallel batches would add videos out of query order
+    add_executor_args(parser, concurrency=1)
+    parser.add_argument("--refresh", action="store_true", help="Refetch playlists instead of using the local snapshot")
+    add_journal_args(parser)
+    args = parser.parse_args(argv)
+
+    journal = open_run(args, "import_to_playlist", "add", args.playlist)
+    if journal:
+        args.playlist = journal.header["playlist"]
     else:
-        print(f"Error: Unsupported file type {input_path.suffix}")
-        sys.exit(1)
-
-    print(f"Loaded {len(video_ids)} video IDs from {input_path}")
+        if not args.input or not args.playlist:
+            parser.error("--input and --playlist are required (unless resuming a journal)")
+
+        input_path = Path(args.input)
+        if not input_path.exists():
+            print(f"Error: {input_path} not found")
+            sys.exit(1)
+
+        video_ids = load_video_ids(input_path, confidence=args.confidence)
+
+        print(f"Loaded {len(video_ids)} video IDs from {input_path}")
+
+    yt = connect(yt)
+
+    if args.verify or args.replay:
+        present = get_existing_video_ids(yt, args.playlist, refresh=True)
+        completed = journal.completed()
+        missing = [vid for vid in completed if vid not in present]
+        print(f"Run {journal.run_id}: {len(completed)} added, {len(missing)} of them missing from playlist")
+        print(f"  Pending: {len(journal.pending())}, failed: {len(journal.failed)}")
+        for vid in missing[:10]:
+            print(f"  missing: {vid}")
+        if args.verify:
+            return
+        new_ids = missing + journal.pending()
+    elif args.resume:
+        # Planned list comes from the journal; the target isn't re-read
+        new_ids = journal.pending()
+        print(f"Resuming {journal.run_id}: {len(new_ids)} of {len(journal.planned)} planned adds pending")
+    else:
+        # Get existing to avoid duplicates
+        existing = get_existing_video_ids(yt, args.playlist, args.refresh)
+        new_ids = [vid for vid in video_ids if vid not in existing]
+        print(f"New videos to add: {len(new_ids)} (skipping {len(video_ids) - len(new_ids)} duplicates)")
 
     if args.dry_run:
-        print(f"[DRY RUN] Would add {len(video_ids)} videos to playlist {args.playlist}")
+        print(f"[DRY RUN] Would add {len(new_ids)} videos to playlist {args.playlist}")
         return
 
-    # Initialize YTMusic
-    yt = YTMusic(AUTH_FILE)
-
-    # Verify auth is valid
-    print("Checking credentials...")
-    if not check_auth(yt):
-        print("Error: Auth credentials are stale. Please refresh:")
-        print("  1. Go to music.youtube.com (logged in)")
-        print("  2. DevTools → Network → find any POST request")
-        print("  3. Run: uv run ytmusicapi browser")
-        sys.exit(1)
-    print("Auth OK")
-
-    # Get existing to avoid duplicates
-    existing = get_existing_video_ids(yt, args.playlist)
-    new_ids = [vid for vid in video_ids if vid not in existing]
-    print(f"New videos to add: {len(new_ids)} (skipping {len(video_ids) - len(new_ids)} duplicates)")
+    if not journal:
+        journal = Journal.create("import_to_playlist", args.playlist, "add", new_ids)
 
     if not new_ids:
+        journal.finish()
         print("Nothing to add")
         return
 
+    def on_success(batch, result):
+        journal.record_done(batch)
+        record_added(args.playlist, result)
+
     # Add in batches
-    for i in range(0, len(new_ids), args.batch_size):
-        batch = new_ids[i:i + args.batch_size]
-        print(f"Adding batch {i // args.batch_size + 1}: {len(batch)} videos...")
-        try:
-            result = yt.add_playlist_items(args.playlist, batch, duplicates=True)
-            status = result.get("status", "unknown")
-            print(f"  Result: {status}")
-        except Exception as e:
-            print(f"  Error: {e}")
-            # Continue with next batch
-
-    print("Done!")
+    report = run_batches(
+        new_ids,
+        lambda batch: check_status(yt.add_playlist_items(args.playlist, batch, duplicates=True)),
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        on_success=on_success,
+        label="added",
+    )
+    save_report(report, args.report)
+    for item, error in report["failed"]:
+        journal.record_failed(item, error)
+    if not report["failed"]:
+        journal.finish()
+    else:
+        print(f"Retry failed items with: --resume {journal.run_id}")
+
+    print(f"Done! Added {len(report['succeeded'])} ({len(report['failed'])} failed)")
 
 
 if __name__ == "__main__":
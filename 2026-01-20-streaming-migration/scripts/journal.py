@@ -0,0 +1,140 @@
+"""Write-ahead journal of planned and completed playlist mutations.
+
+Each run writes data/journal/<script>-<timestamp>-<random>.jsonl (the
+suffix keeps parallel runs started in the same second apart; the file is
+created exclusively, so a collision fails instead of mixing two runs):
+
+    {"type": "run", "script": ..., "playlist": ..., "op": "add" | "remove", ...}
+    {"type": "planned", "items": [...]}          # fsynced before any mutation
+    {"type": "done", "items": [...]}             # after each successful batch
+    {"type": "failed", "item": ..., "error": ...}
+    {"type": "finished"}
+
+An interrupted run is resumed from the journal alone: pending items are
+planned minus done, so the target playlist isn't re-read and removal
+setVideoIds aren't recomputed.
+"""
+
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+JOURNAL_DIR = Path("data/journal")
+
+
+def item_key(item) -> str:
+    """Identity of a journaled item: videoId for adds, setVideoId for removes."""
+    return item["setVideoId"] if isinstance(item, dict) else item
+
+
+class Journal:
+    def __init__(self, path: Path):
+        self.path = path
+        self.header = None
+        self.planned = []
+        self.done = set()
+        self.failed = {}
+        self.finished = False
+        if path.exists():
+            with open(path) as f:
+                for line in f:
+                    self._apply(json.loads(line))
+
+    def _apply(self, record: dict):
+        kind = record["type"]
+        if kind == "run":
+            self.header = record
+        elif kind == "planned":
+            self.planned.extend(record["items"])
+        elif kind == "done":
+            self.done.update(item_key(i) for i in record["items"])
+        elif kind == "failed":
+            self.failed[item_key(record["item"])] = record["error"]
+        elif kind == "finished":
+            self.finished = True
+
+    def _write(self, record: dict, mode: str = "a"):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, mode) as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._apply(record)
+
+    @classmethod
+    def create(cls, script: str, playlist: str, op: str, items: list) -> "Journal":
+        run_id = f"{script}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        journal = cls(JOURNAL_DIR / f"{run_id}.jsonl")
+        journal._write({"type": "run", "script": script, "playlist": playlist, "op": op,
+                        "created": time.time()}, mode="x")
+        journal._write({"type": "planned", "items": items})
+        print(f"Journal: {journal.path}")
+        return journal
+
+    @classmethod
+    def open(cls, run_id: str) -> "Journal":
+        path = Path(run_id) if run_id.endswith(".jsonl") else JOURNAL_DIR / f"{run_id}.jsonl"
+        if not path.exists():
+            raise SystemExit(f"Error: journal {path} not found")
+        return cls(path)
+
+    @property
+    def run_id(self) -> str:
+        return self.path.stem
+
+    def pending(self) -> list:
+        """Planned items not yet done, in planned order."""
+        return [i for i in self.planned if item_key(i) not in self.done]
+
+    def completed(self) -> list:
+        return [i for i in self.planned if item_key(i) in self.done]
+
+    def record_done(self, items: list):
+        self._write({"type": "done", "items": items})
+
+    def record_failed(self, item, error: str):
+        self._write({"type": "failed", "item": item, "error": error})
+
+    def finish(self):
+        self._write({"type": "finished"})
+
+
+def latest_unfinished(script: str, playlist: str | None = None) -> str | None:
+    """Most recent unfinished run of script (against playlist, if given)."""
+    journals = [Journal(path) for path in JOURNAL_DIR.glob(f"{script}-*.jsonl")]
+    # By creation time: run IDs started in the same second sort by their random suffix
+    for journal in sorted((j for j in journals if j.header), key=lambda j: j.header["created"], reverse=True):
+        if playlist in (None, journal.header["playlist"]) and not journal.finished:
+            return journal.run_id
+    return None
+
+
+def add_journal_args(parser):
+    parser.add_argument("--resume", nargs="?", const="latest", metavar="RUN_ID",
+                        help="Resume an interrupted run from its journal (default: latest unfinished)")
+    parser.add_argument("--verify", metavar="RUN_ID", help="Check a run's completed operations against the playlist")
+    parser.add_argument("--replay", metavar="RUN_ID", help="Re-apply a run's operations that --verify finds missing")
+
+
+def open_run(args, script: str, op: str, playlist: str | None) -> Journal | None:
+    """Journal for --resume/--verify/--replay (checked to be script's), or None for a fresh run.
+
+    The playlist comes from the journal header; if playlist is given as well, it must match.
+    """
+    run_id = args.resume or args.verify or args.replay
+    if not run_id:
+        return None
+    if run_id == "latest":
+        run_id = latest_unfinished(script, playlist)
+        if not run_id:
+            raise SystemExit(f"Error: no unfinished {script} run" + (f" for playlist {playlist}" if playlist else ""))
+    journal = Journal.open(run_id)
+    header = journal.header or {}
+    if header.get("script") != script or header.get("op") != op:
+        raise SystemExit(f"Error: {journal.run_id} is a {header.get('script')} ({header.get('op')}) run, "
+                         f"not {script} ({op})")
+    if playlist and header["playlist"] != playlist:
+        raise SystemExit(f"Error: {journal.run_id} is for playlist {header['playlist']}, not {playlist}")
+    return journal
@@ -0,0 +1,92 @@
+"""Local index of the videoIds in the YT Music library.
+
+Deciding what to add to the library used to rely on each playlist
+track's inLibrary flag, so every playlist run refetched the same state
+and duplicates across playlists were submitted again. The index lives in
+data/cache/library.json and is a set of videoIds:
+
+- built from get_library_songs (all pages) on first use, with --refresh-library,
+  or when older than FULL_REFRESH_DAYS
+- otherwise checked with one page of the most recently added songs: songs
+  added elsewhere show up there ahead of the first one already indexed
+  (if none of the page is indexed, or the page is empty while the index
+  isn't, the whole library is refetched)
+- updated by the scripts after each successful edit_song_library_status batch
+
+Songs removed from the library outside the scripts aren't noticed until a
+full refresh (an emptied library is noticed at the next check).
+
+The index is kept in memory per index file, so runs from another working
+directory (like each benchmark run) don't see this one's library.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+INDEX_FILE = Path("data/cache/library.json")
+PROBE_LIMIT = 100
+FULL_REFRESH_DAYS = 7
+
+_indexes = {}  # resolved index file -> {"fetchedAt", "checkedAt", "videoIds": set}
+
+
+def _load() -> dict | None:
+    try:
+        with open(INDEX_FILE) as f:
+            data = json.load(f)
+        return {**data, "videoIds": set(data["videoIds"])}
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _save(index: dict):
+    INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = INDEX_FILE.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({**index, "videoIds": sorted(index["videoIds"])}, f)
+    os.replace(tmp, INDEX_FILE)
+    _indexes[INDEX_FILE.resolve()] = index
+
+
+def _video_ids(songs: list[dict]) -> list[str]:
+    return [s["videoId"] for s in songs if s.get("videoId")]
+
+
+def get_library(yt, refresh: bool = False) -> set[str]:
+    """videoIds in the library, from the local index when it is current."""
+    index = None if refresh else _indexes.get(INDEX_FILE.resolve()) or _load()
+    now = time.time()
+
+    if index and now - index["fetchedAt"] < FULL_REFRESH_DAYS * 86400:
+        recent = _video_ids(yt.get_library_songs(limit=PROBE_LIMIT, order="recently_added"))
+        known = index["videoIds"]
+        if any(v in known for v in recent) or not (recent or known):
+            new = [v for v in recent if v not in known]
+            known.update(new)
+            index["checkedAt"] = now
+            _save(index)
+            print(f"  Using library index ({len(known)} songs, {len(new)} new)")
+            return known
+        print("  Library index out of date, refetching")
+
+    print("  Fetching library songs...")
+    songs = _video_ids(yt.get_library_songs(limit=None))
+    index = {"fetchedAt": now, "checkedAt": now, "videoIds": set(songs)}
+    _save(index)
+    return index["videoIds"]
+
+
+def mark_in_library(video_ids):
+    """Add videoIds just added to the library (after a successful edit_song_library_status)."""
+    index = _indexes.get(INDEX_FILE.resolve()) or _load()
+    if index is None:
+        return  # no index yet; the next get_library builds it
+    index["videoIds"].update(video_ids)
+    _save(index)
+
+
+def add_library_args(parser):
+    parser.add_argument("--refresh-library", action="store_true",
+                        help="Refetch the whole library instead of checking the local index")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""All migration tasks as one command, sharing one YTMusic client.
+
+    migrate.py COMMAND [ARGS...] [+ COMMAND [ARGS...] ...]
+    migrate.py -            # one command per line from stdin
+
+Commands run in order in one process, on one authenticated client with
+pooled keep-alive connections, and the auth check runs at most once per
+--auth-ttl (also across separate runs, see client.py). The first failing
+command stops the rest.
+"""
+
+import argparse
+import importlib
+import shlex
+import sys
+import time
+
+import client
+import telemetry
+
+# name -> (module, function, needs the YTMusic client)
+COMMANDS = {
+    "search": ("search_youtube", "cli", False),
+    "rescore": ("rescore", "cli", False),
+    "results": ("results_store", "cli", False),
+    "report": ("telemetry", "cli", False),
+    "import": ("import_to_playlist", "main", True),
+    "sync": ("sync_playlist", "main", True),
+    "to-library": ("playlist_to_library", "main", True),
+    "export-non-library": ("export_non_library", "main", True),
+    "find-duplicates": ("find_duplicates", "main", True),
+    "remove-duplicates": ("remove_duplicates", "main", True),
+}
+SEPARATOR = "+"
+
+
+def split_commands(argv: list[str]) -> list[list[str]]:
+    commands = [[]]
+    for arg in argv:
+        if arg == SEPARATOR:
+            commands.append([])
+        else:
+            commands[-1].append(arg)
+    return [c for c in commands if c]
+
+
+def run(command: list[str], yt=None):
+    name, argv = command[0], command[1:]
+    module, function, needs_client = COMMANDS[name]
+    entry = getattr(importlib.import_module(module), function)
+    sys.argv[0] = f"migrate.py {name}"  # for usage messages
+    if needs_client:
+        entry(argv, yt or client.get_client())
+    else:
+        entry(argv)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run migration commands in one process",
+        epilog=f"Commands: {', '.join(COMMANDS)}. Chain them with '{SEPARATOR}', or pass '-' to read them from stdin.",
+    )
+    parser.add_argument("--auth-ttl", type=float, default=client.AUTH_TTL,
+                        help=f"Seconds a passing auth check is reused (default: {client.AUTH_TTL:.0f}, env YTM_AUTH_TTL)")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="COMMAND [ARGS...] [+ COMMAND [ARGS...] ...] or -")
+    args = parser.parse_args()
+    client.AUTH_TTL = args.auth_ttl
+
+    if args.command == ["-"]:
+        commands = [shlex.split(line, comments=True) for line in sys.stdin]
+        commands = [c for c in commands if c]
+    else:
+        commands = split_commands(args.command)
+    if not commands:
+        parser.error("no command given")
+    for command in commands:
+        if command[0] not in COMMANDS:
+            parser.error(f"unknown command {command[0]!r} (choose from {', '.join(COMMANDS)})")
+
+    for n, command in enumerate(commands, 1):
+        if len(commands) > 1:
+            print(f"\n=== [{n}/{len(commands)}] {shlex.join(command)}")
+        started = time.monotonic()
+        telemetry.start(command[0])
+        try:
+            run(command)
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                if len(commands) > 1:
+                    print(f"\nStopped: command {n} failed ({len(commands) - n} not run)")
+                raise
+        if len(commands) > 1:
+            print(f"=== [{n}/{len(commands)}] done in {time.monotonic() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Near-duplicate detection for playlist tracks.
+
+The same song often sits in a playlist several times under different
+videoIds: the Art Track (ATV), the official music video (OMV) and user
+uploads (UGC). Tracks are compared on their normalized title with noise
+like "(Official Video)" removed; an "Artist - " prefix, common in video
+titles, counts as an artist name instead.
+
+Two tracks match only if
+- their artists agree (one artist's words contain the other's, for any
+  of the names a track carries), and
+- their titles have a Jaccard similarity of character 3-grams at or
+  above the threshold, contain the same numbers ("Pt. 1" / "Pt. 2") and
+  the same version markers (live, remix, ...), and
+- if both are Art Tracks, their titles are equal: an album doesn't hold
+  the same song twice under slightly different titles.
+
+Comparing every pair is quadratic, so candidates come from MinHash-LSH:
+each title's 3-gram set is reduced to a MinHash signature, signatures
+are split into bands, and only tracks sharing a band bucket are compared.
+
+Clusters are anchored, not transitive: tracks are taken in canonical
+order (ATV over OMV over UGC, then the earliest position), each track
+not yet in a cluster starts one, and it collects the candidates that
+match it directly. A chain of pairwise matches (A~B, B~C) never pulls
+in a C that doesn't match A.
+"""
+
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from rescore import normalize
+
+NUM_PERM = 64
+BANDS = 16  # 4 rows per band: pairs around Jaccard 0.5 and above become candidates
+DEFAULT_THRESHOLD = 0.85
+
+NOISE = re.compile(
+    r"\((?:official\s*)?(?:music\s*)?(?:video|audio|mv|m/v|lyrics?|lyric video|visualizer|hd|hq|4k)\)"
+    r"|\[(?:official\s*)?(?:music\s*)?(?:video|audio|mv|m/v|lyrics?|lyric video|visualizer|hd|hq|4k)\]"
+    r"|\bofficial (?:music )?(?:video|audio)\b|\s-\stopic$|vevo\b",
+    re.IGNORECASE,
+)
+NUMBER = re.compile(r"\d+")
+NON_WORD = re.compile(r"[^\w\s]")
+VERSION_MARKERS = {"live", "remix", "acoustic", "instrumental", "cover", "karaoke", "demo", "inst", "edit", "sped", "slowed"}
+
+# Lower is preferred as the entry to keep
+ATV = "MUSIC_VIDEO_TYPE_ATV"
+VIDEO_TYPE_RANK = {
+    "MUSIC_VIDEO_TYPE_ATV": 0,
+    "MUSIC_VIDEO_TYPE_OMV": 1,
+    "MUSIC_VIDEO_TYPE_OFFICIAL_SOURCE_MUSIC": 2,
+    "MUSIC_VIDEO_TYPE_UGC": 3,
+}
+
+_PRIME = (1 << 61) - 1
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, 1 << 31, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 31, NUM_PERM, dtype=np.uint64)
+
+
+def _norm(text: str) -> str:
+    text = normalize(text.replace("\u2019", "'"))  # Curly apostrophes count as straight ones
+    return " ".join(NON_WORD.sub(" ", text).split())
+
+
+def match_keys(artist: str | None, title: str | None, video_type: str | None = None) -> tuple[set[str], str]:
+    """(normalized artist names, normalized title) with upload noise removed.
+
+    Video titles often read "Artist - Song": the prefix counts as another
+    artist name (uploaders' channel names aren't the artist).
+    """
+    artist = _norm(NOISE.sub("", artist or ""))
+    title = NOISE.sub("", title or "")
+    artists = {artist} if artist else set()
+    if video_type != ATV and " - " in title:
+        prefix, rest = title.split(" - ", 1)
+        if _norm(prefix) and _norm(rest):
+            artists.add(_norm(prefix))
+            title = rest
+    return artists, _norm(title)
+
+
+def same_artist(a: set[str], b: set[str]) -> bool:
+    """Some name of a and some name of b where one's words contain the other's."""
+    for x in a:
+        for y in b:
+            wx, wy = set(x.split()), set(y.split())
+            if wx <= wy or wy <= wx:
+                return True
+    return False
+
+
+def shingles(text: str, k: int = 3) -> set[int]:
+    text = f" {text} "
+    return {zlib.crc32(text[i:i + k].encode()) for i in range(max(1, len(text) - k + 1))}
+
+
+def minhash(shingle_set: set[int]) -> np.ndarray:
+    # Shingle hashes are 32-bit, so a*x+b stays within uint64
+    x = np.fromiter(shingle_set, dtype=np.uint64, count=len(shingle_set))
+    return ((np.outer(x, _A) + _B) % _PRIME).min(axis=0)
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _entry(i: int, track: dict) -> dict:
+    return {
+        "index": i,
+        "title": track["title"],
+        "artist": track["artist"],
+        "videoId": track["videoId"],
+        "setVideoId": track["setVideoId"],
+        "videoType": track.get("videoType"),
+    }
+
+
+def canonical_key(entry: dict) -> tuple:
+    return VIDEO_TYPE_RANK.get(entry["videoType"], len(VIDEO_TYPE_RANK)), entry["index"]
+
+
+def is_match(a: dict, b: dict, threshold: float) -> bool:
+    """Whether two keyed entries (see find_clusters) are the same song."""
+    if a["videoId"] == b["videoId"]:
+        return True
+    if a["markers"] != b["markers"] or a["numbers"] != b["numbers"] or not same_artist(a["artists"], b["artists"]):
+        return False
+    if a["videoType"] == ATV and b["videoType"] == ATV:
+        return a["titleKey"] == b["titleKey"]
+    return a["titleKey"] == b["titleKey"] or jaccard(a["shingles"], b["shingles"]) >= threshold
+
+
+def find_clusters(tracks: list[dict], threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """Clusters of near-duplicate tracks, each {"canonical": entry, "duplicates": [entry, ...]}.
+
+    Entries carry index (playlist position), title, artist, videoId,
+    setVideoId and videoType. Every duplicate matches its canonical entry
+    directly. Clusters are in playlist order of their canonical entry.
+    """
+    entries = sorted((_entry(i, t) for i, t in enumerate(tracks) if t.get("videoId") and t.get("setVideoId")),
+                     key=canonical_key)
+    keyed = []
+    for e in entries:
+        artists, title = match_keys(e["artist"], e["title"], e["videoType"])
+        words = title.split()
+        keyed.append({
+            "videoId": e["videoId"],
+            "videoType": e["videoType"],
+            "artists": artists,
+            "titleKey": title,
+            "shingles": shingles(title),
+            "numbers": NUMBER.findall(title),
+            "markers": VERSION_MARKERS.intersection(words),
+        })
+
+    rows = NUM_PERM // BANDS
+    buckets = defaultdict(list)
+    for n, k in enumerate(keyed):
+        signature = minhash(k["shingles"])
+        for band in range(BANDS):
+            buckets[band, signature[band * rows:(band + 1) * rows].tobytes()].append(n)
+    # Same video under several entries always clusters, whatever LSH says
+    for n, k in enumerate(keyed):
+        buckets["videoId", k["videoId"]].append(n)
+
+    candidates = defaultdict(set)
+    for members in buckets.values():
+        if len(members) > 1:
+            for n in members:
+                candidates[n].update(members)
+
+    # Entries are in canonical order, so each cluster is anchored on its canonical entry
+    assigned = set()
+    clusters = []
+    for anchor in range(len(entries)):
+        if anchor in assigned:
+            continue
+        members = [m for m in sorted(candidates[anchor])
+                   if m > anchor and m not in assigned and is_match(keyed[anchor], keyed[m], threshold)]
+        if members:
+            assigned.update(members)
+            clusters.append({"canonical": entries[anchor], "duplicates": [entries[m] for m in members]})
+    clusters.sort(key=lambda c: c["canonical"]["index"])
+    return clusters
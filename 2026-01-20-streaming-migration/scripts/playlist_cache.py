@@ -0,0 +1,175 @@
+"""Local playlist snapshots, so scripts plan from disk instead of refetching.
+
+Snapshots live in data/cache/playlists/<playlistId>.json as a compact
+column/row table with only the fields the scripts use.
+
+ytmusicapi can't fetch a playlist from an offset or "changed since", so
+freshness is checked with a single-page probe: if the server's trackCount,
+header duration and first page match the snapshot, the snapshot is used
+as-is (with the first page's rows refreshed). Otherwise the whole playlist
+is refetched. Scripts write their own changes (adds, removes, library
+adds) through to the snapshot, so their own mutations don't force a
+refetch next run.
+
+The probe can't see past the first page: an edit elsewhere that keeps the
+track count (one track removed after position PROBE_LIMIT, another added)
+and the coarse header duration ("3 hours, 20 minutes") passes it. Such
+snapshots are served until FULL_REFRESH_HOURS after the last full fetch;
+use --refresh before removing or reordering a playlist edited elsewhere.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+CACHE_DIR = Path("data/cache/playlists")
+
+COLUMNS = ["videoId", "setVideoId", "title", "artist", "videoType", "inLibrary", "addToken"]
+
+# One get_playlist page
+PROBE_LIMIT = 100
+# A snapshot older than this is refetched in full, whatever the probe says
+FULL_REFRESH_HOURS = 24
+
+
+def to_row(track: dict) -> list:
+    """Compact a get_playlist track to a snapshot row."""
+    artists = track.get("artists") or []
+    tokens = track.get("feedbackTokens") or {}
+    return [
+        track.get("videoId"),
+        track.get("setVideoId"),
+        track.get("title") or "Unknown",
+        artists[0].get("name", "Unknown") if artists else "Unknown",
+        track.get("videoType"),
+        bool(track.get("inLibrary")),
+        tokens.get("add"),
+    ]
+
+
+def _path(playlist_id: str) -> Path:
+    return CACHE_DIR / f"{playlist_id}.json"
+
+
+def load_snapshot(playlist_id: str) -> dict | None:
+    try:
+        with open(_path(playlist_id)) as f:
+            snapshot = json.load(f)
+        return snapshot if snapshot.get("columns") == COLUMNS else None
+    except (OSError, ValueError):
+        return None
+
+
+def save_snapshot(snapshot: dict):
+    path = _path(snapshot["playlistId"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _fetch(yt, playlist_id: str, limit: int | None) -> tuple[dict, list[list]]:
+    """({"trackCount", "duration"} from the playlist header, rows)."""
+    playlist = yt.get_playlist(playlist_id, limit=limit)
+    header = {"trackCount": playlist.get("trackCount"), "duration": playlist.get("duration")}
+    return header, [to_row(t) for t in playlist.get("tracks", [])]
+
+
+def get_tracks(yt, playlist_id: str, refresh: bool = False) -> list[dict]:
+    """Playlist tracks as dicts with COLUMNS keys, from the snapshot when it is current."""
+    snapshot = None if refresh else load_snapshot(playlist_id)
+
+    if snapshot and time.time() - snapshot["fetchedAt"] > FULL_REFRESH_HOURS * 3600:
+        print(f"  Snapshot older than {FULL_REFRESH_HOURS}h, refetching")
+        snapshot = None
+
+    if snapshot:
+        header, head = _fetch(yt, playlist_id, PROBE_LIMIT)
+        rows = snapshot["rows"]
+        set_ids = [r[1] for r in rows[:len(head)]]
+        # The duration is unknown (None) after the scripts' own edits; the probe supplies it
+        if (header["trackCount"] == len(rows) and snapshot.get("duration") in (None, header["duration"])
+                and set_ids == [r[1] for r in head]):
+            rows[:len(head)] = head
+            snapshot["duration"] = header["duration"]
+            snapshot["checkedAt"] = time.time()
+            save_snapshot(snapshot)
+            print(f"  Using cached snapshot ({len(rows)} tracks)")
+            return [dict(zip(COLUMNS, r)) for r in rows]
+        print("  Snapshot out of date, refetching")
+
+    header, rows = _fetch(yt, playlist_id, None)
+    now = time.time()
+    save_snapshot({
+        "playlistId": playlist_id,
+        "fetchedAt": now,
+        "checkedAt": now,
+        "duration": header["duration"],
+        "columns": COLUMNS,
+        "rows": rows,
+    })
+    return [dict(zip(COLUMNS, r)) for r in rows]
+
+
+def _update(playlist_id: str, fn):
+    snapshot = load_snapshot(playlist_id)
+    if snapshot:
+        fn(snapshot["rows"])
+        snapshot["duration"] = None  # changed by this edit; taken from the next probe
+        save_snapshot(snapshot)
+
+
+def record_added(playlist_id: str, result, known: dict[str, dict] | None = None):
+    """Apply an add_playlist_items result (new videoId/setVideoId pairs) to the snapshot.
+
+    known: optional {videoId: track dict} to fill in title/artist/type.
+    If the result lacks setVideoIds the snapshot is dropped, forcing a refetch.
+    """
+    edits = result.get("playlistEditResults") if isinstance(result, dict) else None
+    if not edits or not all(e and e.get("setVideoId") for e in edits):
+        _path(playlist_id).unlink(missing_ok=True)
+        return
+
+    known = known or {}
+
+    def add(rows):
+        for e in edits:
+            track = {"title": "Unknown", "artist": "Unknown", "inLibrary": False,
+                     **known.get(e["videoId"], {}), "videoId": e["videoId"], "setVideoId": e["setVideoId"]}
+            rows.append([track.get(c) for c in COLUMNS])
+
+    _update(playlist_id, add)
+
+
+def record_removed(playlist_id: str, set_video_ids):
+    """Drop removed playlist items from the snapshot."""
+    removed = set(set_video_ids)
+
+    def remove(rows):
+        rows[:] = [r for r in rows if r[1] not in removed]
+
+    _update(playlist_id, remove)
+
+
+def record_in_library(playlist_id: str, add_tokens):
+    """Mark tracks added to the library (by their add token)."""
+    added = set(add_tokens)
+
+    def mark(rows):
+        for r in rows:
+            if r[6] in added:
+                r[5] = True
+
+    _update(playlist_id, mark)
+
+
+def record_order(playlist_id: str, set_video_ids: list[str]):
+    """Reorder the snapshot to match set_video_ids (rows not listed keep their place at the end)."""
+    position = {sid: i for i, sid in enumerate(set_video_ids)}
+
+    def reorder(rows):
+        rows.sort(key=lambda r: position.get(r[1], len(position)))
+
+    _update(playlist_id, reorder)
@@ -1,78 +1,90 @@
 #!/usr/bin/env python3
 """Add eligible songs from a playlist to YT Music library (Artists tab).
 
-Only adds direct Art Tracks (ATVs) that have feedbackTokens.
+Only adds direct Art Tracks (ATVs) that have feedbackTokens. What is
+already in the library comes from the local library index, so several
+playlists can be checked at once and a song is only submitted once.
 """
 
 import argparse
-import sys
 
 from ytmusicapi import YTMusic
 
-AUTH_FILE = "data/ytmusicapi-browser.json"
+from batch_executor import add_executor_args, check_feedback, run_batches, save_report
+from client import connect
+from library_index import add_library_args, get_library, mark_in_library
+from playlist_cache import get_tracks, record_in_library
 
 
-def check_auth(yt: YTMusic) -> bool:
-    """Verify credentials by testing counterpart lookup on known video pair."""
-    try:
-        # Dirty Loops - Next to You: ATV (rT_isNWT4gQ) <-> OMV (rV9uCmlMQ1c)
-        watch = yt.get_watch_playlist("rT_isNWT4gQ")
-        counterpart = watch["tracks"][0].get("counterpart")
-        return counterpart is not None and counterpart.get("videoId") == "rV9uCmlMQ1c"
-    except Exception:
-        return False
+def add_to_library(yt: YTMusic, add_tokens: list[str], concurrency: int = 4, rate: float = 2.0,
+                   on_success=None) -> dict:
+    """Add songs to the library by their add feedback tokens. Returns the executor report."""
+    return run_batches(
+        add_tokens,
+        lambda batch: check_feedback(yt.edit_song_library_status(batch)),
+        concurrency=concurrency,
+        rate=rate,
+        on_success=on_success,
+        label="added",
+    )
 
 
-def main():
+def main(argv: list[str] | None = None, yt: YTMusic | None = None):
     parser = argparse.ArgumentParser(description="Add playlist songs to YT Music library")
-    parser.add_argument("--playlist", "-p", required=True, help="Source playlist ID")
+    parser.add_argument("--playlist", "-p", required=True, action="append",
+                        help="Source playlist ID (repeat for several playlists)")
     parser.add_argument("--dry-run", "-n", action="store_true", help="Show what would be done")
-    args = parser.parse_args()
+    add_executor_args(parser)
+    parser.add_argument("--refresh", action="store_true", help="Refetch playlists instead of using the local snapshot")
+    add_library_args(parser)
+    args = parser.parse_args(argv)
 
-    yt = YTMusic(AUTH_FILE)
+    yt = connect(yt)
 
-    # Verify auth is valid
-    print("Checking credentials...")
-    if not check_auth(yt):
-        print("Error: Auth credentials are stale. Please refresh:")
-        print("  1. Go to music.youtube.com (logged in)")
-        print("  2. DevTools → Network → find any POST request")
-        print("  3. Run: uv run ytmusicapi browser")
-        sys.exit(1)
-    print("Auth OK")
+    print("Checking library...")
+    library = get_library(yt, args.refresh_library)
 
-    # Fetch playlist
-    print(f"Fetching playlist {args.playlist}...")
-    playlist = yt.get_playlist(args.playlist, limit=None)
-
-    tracks = playlist.get("tracks", [])
-    print(f"Found {len(tracks)} tracks")
-
-    # Collect tokens directly from playlist
-    add_tokens = []
+    # Collect tokens directly from the playlists, one per song
+    add_tokens = {}  # videoId -> add token
     already_in_library = 0
+    repeated = 0
     no_token = 0
     skipped = 0
+    flagged = []  # in the library per the playlist but not the index
+
+    for playlist in args.playlist:
+        print(f"Fetching playlist {playlist}...")
+        tracks = get_tracks(yt, playlist, args.refresh)
+        print(f"Found {len(tracks)} tracks")
+
+        for track in tracks:
+            video_type = track["videoType"]
+            video_id = track["videoId"]
 
-    for track in tracks:
-        video_type = track.get("videoType")
-        tokens = track.get("feedbackTokens")
+            if video_type != "MUSIC_VIDEO_TYPE_ATV":
+                skipped += 1
+                continue
 
-        if video_type != "MUSIC_VIDEO_TYPE_ATV":
-            skipped += 1
-            continue
+            if video_id in library or track["inLibrary"]:
+                already_in_library += 1
+                if video_id not in library:
+                    flagged.append(video_id)
+                continue
 
-        if track.get("inLibrary"):
-            already_in_library += 1
-            continue
+            if video_id in add_tokens:
+                repeated += 1
+            elif track["addToken"]:
+                add_tokens[video_id] = track["addToken"]
+            else:
+                no_token += 1
 
-        if tokens and tokens.get("add"):
-            add_tokens.append(tokens["add"])
-        else:
-            no_token += 1
+    if flagged:
+        mark_in_library(flagged)
 
     print(f"\nArt Tracks to add: {len(add_tokens)}")
     print(f"Already in library: {already_in_library}")
+    if repeated:
+        print(f"Repeated (same song again): {repeated}")
     print(f"Skipped (OMV/UGC): {skipped}")
     if no_token:
         print(f"No token: {no_token}")
@@ -85,23 +97,19 @@ def main():
         print(f"\n[DRY RUN] Would add {len(add_tokens)} tracks to library")
         return
 
+    video_of = {token: video_id for video_id, token in add_tokens.items()}
+
+    def on_success(batch, result):
+        mark_in_library(video_of[token] for token in batch)
+        for playlist in args.playlist:
+            record_in_library(playlist, batch)
+
     # Add to library
     print(f"\nAdding to library...")
-    batch_size = 50
-    success = 0
-    failed = 0
-
-    for i in range(0, len(add_tokens), batch_size):
-        batch = add_tokens[i:i + batch_size]
-        try:
-            yt.edit_song_library_status(batch)
-            success += len(batch)
-            print(f"  Batch {i // batch_size + 1}: {len(batch)} added")
-        except Exception as e:
-            print(f"  Error: {e}")
-            failed += len(batch)
-
-    print(f"\nDone! Added {success} to library ({failed} failed)")
+    report = add_to_library(yt, list(add_tokens.values()), args.concurrency, args.rate, on_success=on_success)
+    save_report(report, args.report)
+
+    print(f"\nDone! Added {len(report['succeeded'])} to library ({len(report['failed'])} failed)")
 
 
 if __name__ == "__main__":
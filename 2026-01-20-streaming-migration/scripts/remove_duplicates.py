@@ -1,49 +1,30 @@
 #!/usr/bin/env python3
-"""Remove duplicate videos from a playlist, keeping the first occurrence."""
+"""Remove duplicate videos from a playlist, keeping the first occurrence.
+
+With --near, the same song under different videoIds is also removed,
+keeping the preferred upload (ATV over OMV over UGC) of each cluster.
+"""
 
 import argparse
-import sys
 from collections import defaultdict
 
 from ytmusicapi import YTMusic
 
-AUTH_FILE = "data/ytmusicapi-browser.json"
-
-
-def check_auth(yt: YTMusic) -> bool:
-    """Verify credentials by testing counterpart lookup on known video pair."""
-    try:
-        # Dirty Loops - Next to You: ATV (rT_isNWT4gQ) <-> OMV (rV9uCmlMQ1c)
-        watch = yt.get_watch_playlist("rT_isNWT4gQ")
-        counterpart = watch["tracks"][0].get("counterpart")
-        return counterpart is not None and counterpart.get("videoId") == "rV9uCmlMQ1c"
-    except Exception:
-        return False
-
-
-def main():
-    parser = argparse.ArgumentParser(description="Remove duplicate videos from a playlist")
-    parser.add_argument("--playlist", "-p", required=True, help="Playlist ID")
-    parser.add_argument("--dry-run", "-n", action="store_true", help="Show what would be removed")
-    parser.add_argument("--limit", "-l", type=int, help="Limit number of duplicates to remove")
-    args = parser.parse_args()
+from batch_executor import add_executor_args, check_status, run_batches, save_report
+from client import connect
+from journal import Journal, add_journal_args, open_run
+from near_duplicates import DEFAULT_THRESHOLD, find_clusters
+from playlist_cache import get_tracks, record_removed
 
-    yt = YTMusic(AUTH_FILE)
 
-    print("Checking credentials...")
-    if not check_auth(yt):
-        print("Error: Auth credentials are stale. Please refresh:")
-        print("  1. Go to music.youtube.com (logged in)")
-        print("  2. DevTools → Network → find any POST request")
-        print("  3. Update data/ytmusicapi-browser.json")
-        sys.exit(1)
-    print("Auth OK")
+def plan_removals(tracks: list[dict], near: bool = False, threshold: float = DEFAULT_THRESHOLD) -> list[dict]:
+    """Duplicate entries to remove, keeping the first occurrence of each video.
 
-    print(f"Fetching playlist {args.playlist}...")
-    playlist = yt.get_playlist(args.playlist, limit=None)
-
-    tracks = playlist.get("tracks", [])
-    print(f"Found {len(tracks)} tracks")
+    With near, every non-canonical entry of each near-duplicate cluster.
+    """
+    if near:
+        clusters = find_clusters(tracks, threshold)
+        return sorted((e for c in clusters for e in c["duplicates"]), key=lambda e: e["index"])
 
     # Group by video ID
     by_video_id = defaultdict(list)
@@ -53,8 +34,8 @@ def main():
         if video_id and set_video_id:
             by_video_id[video_id].append({
                 "index": i,
-                "title": track.get("title", "Unknown"),
-                "artist": track.get("artists", [{}])[0].get("name", "Unknown") if track.get("artists") else "Unknown",
+                "title": track["title"],
+                "artist": track["artist"],
                 "videoId": video_id,
                 "setVideoId": set_video_id,
             })
@@ -66,42 +47,101 @@ def main():
             # Keep first (lowest index), remove the rest
             for entry in entries[1:]:
                 to_remove.append(entry)
+    return to_remove
 
-    if not to_remove:
-        print("\nNo duplicates to remove")
-        return
-
-    if args.limit:
-        to_remove = to_remove[:args.limit]
 
-    print(f"\nDuplicates to remove: {len(to_remove)}")
-    print(f"Sample:")
-    for entry in to_remove[:5]:
-        print(f"  #{entry['index']} {entry['artist']} - {entry['title']}")
-    if len(to_remove) > 5:
-        print(f"  ... and {len(to_remove) - 5} more")
+def main(argv: list[str] | None = None, yt: YTMusic | None = None):
+    parser = argparse.ArgumentParser(description="Remove duplicate videos from a playlist")
+    parser.add_argument("--playlist", "-p", help="Playlist ID")
+    parser.add_argument("--dry-run", "-n", action="store_true", help="Show what would be removed")
+    parser.add_argument("--limit", "-l", type=int, help="Limit number of duplicates to remove")
+    add_executor_args(parser)
+    parser.add_argument("--refresh", action="store_true", help="Refetch playlists instead of using the local snapshot")
+    parser.add_argument("--near", action="store_true",
+                        help="Also remove the same song under other videoIds, keeping ATV over OMV over UGC")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Title similarity needed for --near (0-1, default: {DEFAULT_THRESHOLD})")
+    add_journal_args(parser)
+    args = parser.parse_args(argv)
+
+    journal = open_run(args, "remove_duplicates", "remove", args.playlist)
+    if journal:
+        args.playlist = journal.header["playlist"]
+    elif not args.playlist:
+        parser.error("--playlist is required (unless resuming a journal)")
+
+    yt = connect(yt)
+
+    if args.verify or args.replay:
+        present = {t["setVideoId"] for t in get_tracks(yt, args.playlist, refresh=True)}
+        completed = journal.completed()
+        remaining = [e for e in completed if e["setVideoId"] in present]
+        print(f"Run {journal.run_id}: {len(completed)} removed, {len(remaining)} of them still in playlist")
+        print(f"  Pending: {len(journal.pending())}, failed: {len(journal.failed)}")
+        for entry in remaining[:10]:
+            print(f"  still present: #{entry['index']} {entry['artist']} - {entry['title']}")
+        if args.verify:
+            return
+        to_remove = remaining + journal.pending()
+    elif args.resume:
+        # setVideoIds come from the journal, not a fresh (possibly shifted) playlist read
+        to_remove = journal.pending()
+        print(f"Resuming {journal.run_id}: {len(to_remove)} of {len(journal.planned)} planned removals pending")
+    else:
+        print(f"Fetching playlist {args.playlist}...")
+        tracks = get_tracks(yt, args.playlist, args.refresh)
+        print(f"Found {len(tracks)} tracks")
+
+        to_remove = plan_removals(tracks, args.near, args.threshold)
+        if not to_remove:
+            print("\nNo duplicates to remove")
+            return
+
+        if args.limit:
+            to_remove = to_remove[:args.limit]
+
+        print(f"\nDuplicates to remove: {len(to_remove)}")
+        print(f"Sample:")
+        for entry in to_remove[:5]:
+            print(f"  #{entry['index']} {entry['artist']} - {entry['title']}")
+        if len(to_remove) > 5:
+            print(f"  ... and {len(to_remove) - 5} more")
 
     if args.dry_run:
         print(f"\n[DRY RUN] Would remove {len(to_remove)} duplicate entries")
         return
 
+    if not journal:
+        journal = Journal.create("remove_duplicates", args.playlist, "remove", to_remove)
+
+    if not to_remove:
+        journal.finish()
+        print("\nNothing to remove")
+        return
+
+    def on_success(batch, result):
+        journal.record_done(batch)
+        record_removed(args.playlist, [e["setVideoId"] for e in batch])
+
     # Remove duplicates
     print(f"\nRemoving duplicates...")
-    batch_size = 50
-    success = 0
-    failed = 0
-
-    for i in range(0, len(to_remove), batch_size):
-        batch = to_remove[i:i + batch_size]
-        try:
-            yt.remove_playlist_items(args.playlist, batch)
-            success += len(batch)
-            print(f"  Batch {i // batch_size + 1}: {len(batch)} removed")
-        except Exception as e:
-            print(f"  Error: {e}")
-            failed += len(batch)
-
-    print(f"\nDone! Removed {success} duplicates ({failed} failed)")
+    report = run_batches(
+        to_remove,
+        lambda batch: check_status(yt.remove_playlist_items(args.playlist, batch)),
+        concurrency=args.concurrency,
+        rate=args.rate,
+        on_success=on_success,
+        label="removed",
+    )
+    save_report(report, args.report)
+    for item, error in report["failed"]:
+        journal.record_failed(item, error)
+    if not report["failed"]:
+        journal.finish()
+    else:
+        print(f"Retry failed items with: --resume {journal.run_id}")
+
+    print(f"\nDone! Removed {len(report['succeeded'])} duplicates ({len(report['failed'])} failed)")
 
 
 if __name__ == "__main__":
@@ -1,19 +1,43 @@
 #!/usr/bin/env python3
-"""Re-score existing search results without re-running YouTube searches."""
+"""Re-score existing search results without re-running YouTube searches.
 
+Results are streamed in chunks (from the results store, or a JSONL file
+with --input) to a process pool. Store results get their confidence
+updated in place. For a JSONL output, each scored chunk is spilled to
+disk as a run sorted by index, and the runs are merged into a temporary
+file that atomically replaces the output. Memory stays bounded by the
+chunk size and the number of chunks in flight, not the number of results.
+"""
+
+import argparse
+import heapq
+import importlib
 import json
+import os
 import re
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
 from pathlib import Path
 
-DATA_DIR = Path(__file__).parent.parent / "data"
-RESULTS_FILE = DATA_DIR / "results.jsonl"
+import numpy as np
+from rapidfuzz import fuzz
+from rapidfuzz.process import cpdist
+
+from results_store import JSONL_FILE, dumps, open_store
+
+CHUNK_SIZE = 5000
+MAX_IN_FLIGHT = 16
+
+PUNCTUATION = re.compile(r"[-:_.'\"()[\]!?]")
+WHITESPACE = re.compile(r"\s+")
 
 
 def normalize(s: str) -> str:
     """Normalize string for fuzzy matching: lowercase, strip punctuation."""
     s = s.lower()
-    s = re.sub(r"[-:_.'\"()[\]!?]", "", s)  # strip common punctuation
-    s = re.sub(r"\s+", " ", s).strip()  # collapse whitespace
+    s = PUNCTUATION.sub("", s)  # strip common punctuation
+    s = WHITESPACE.sub(" ", s).strip()  # collapse whitespace
     return s
 
 
@@ -42,60 +66,224 @@ def compute_confidence(query: str, title: str | None, channel: str | None) -> st
         return "low"
 
 
-def main(output: str | None = None, show_changes: bool = False):
-    """Re-score all results."""
-    if not RESULTS_FILE.exists():
-        print(f"Error: {RESULTS_FILE} not found")
-        return
+CONFIDENCE_RANK = {"none": 0, "low": 1, "medium": 2, "high": 3}
+
+
+def pick_best(queries: list[str], candidates: list[list[dict]]) -> list[tuple[int, str, float] | None]:
+    """Pick the best search candidate for each query.
+
+    All query×candidate pairs are scored in one batch: token-set similarity
+    of the query against "channel title" and partial edit-distance similarity
+    of the song against the title, computed over arrays with rapidfuzz.
+    Candidates are ranked by confidence, then similarity (0-100).
+
+    Returns (candidate index, confidence, similarity) per query, or None
+    when a query has no candidates.
+    """
+    owners, slots, query_texts, texts, songs, titles, ranks = [], [], [], [], [], [], []
+    confidences = []
+    for qi, (query, cands) in enumerate(zip(queries, candidates)):
+        parts = query.split(" - ", 1)
+        song = normalize(parts[1] if len(parts) > 1 else query)
+        for ci, c in enumerate(cands):
+            title, channel = c.get("title"), c.get("channel")
+            confidence = compute_confidence(query, title, channel)
+            owners.append(qi)
+            slots.append(ci)
+            query_texts.append(normalize(query))
+            texts.append(normalize(f"{channel or ''} {title or ''}"))
+            songs.append(song)
+            titles.append(normalize(title or ""))
+            ranks.append(CONFIDENCE_RANK[confidence])
+            confidences.append(confidence)
+
+    best = [None] * len(queries)
+    if not owners:
+        return best
+
+    similarity = (0.6 * cpdist(query_texts, texts, scorer=fuzz.token_set_ratio, workers=-1)
+                  + 0.4 * cpdist(songs, titles, scorer=fuzz.partial_ratio, workers=-1))
+    width = max(slots) + 1
+    keys = np.full((len(queries), width), -1.0)
+    keys[owners, slots] = np.asarray(ranks) * 1000 + similarity
+    pair_index = np.full((len(queries), width), -1)
+    pair_index[owners, slots] = np.arange(len(owners))
+
+    for qi, ci in enumerate(keys.argmax(axis=1)):
+        if keys[qi, ci] >= 0:
+            pair = pair_index[qi, ci]
+            best[qi] = (int(ci), confidences[pair], float(similarity[pair]))
+    return best
+
+
+def fuzzy_confidence(query: str, title: str | None, channel: str | None) -> str:
+    """Confidence from token-set similarity of query vs "channel title" instead of substring checks."""
+    if not title and not channel:
+        return "none"
+    similarity = fuzz.token_set_ratio(normalize(query), normalize(f"{channel or ''} {title or ''}"))
+    if similarity >= 85:
+        return "high"
+    elif similarity >= 60:
+        return "medium"
+    else:
+        return "low"
+
+
+# Scorers take (query, title, channel) and return a confidence level.
+# --scorer also accepts "module:function" for one defined elsewhere.
+SCORERS = {
+    "normalized": compute_confidence,
+    "fuzzy": fuzzy_confidence,
+}
 
-    results = []
+
+def get_scorer(name: str):
+    if name in SCORERS:
+        return SCORERS[name]
+    module, _, func = name.partition(":")
+    if not func:
+        raise SystemExit(f"Error: unknown scorer {name!r} (choose from {', '.join(SCORERS)} or module:function)")
+    return getattr(importlib.import_module(module), func)
+
+
+def score_chunk(records: list, scorer_name: str, run_path: str | None) -> tuple[dict, list, list]:
+    """Re-score a chunk of results (dicts or JSONL lines).
+
+    With run_path, the rescored results are written there sorted by index.
+    Returns ({confidence: count}, [(index, query, old, new), ...], [(confidence, index), ...]).
+    """
+    scorer = get_scorer(scorer_name)
+    counts = {"high": 0, "medium": 0, "low": 0, "none": 0}
     changes = []
+    updates = []
+    rows = []
+    for r in records:
+        if isinstance(r, str):
+            r = json.loads(r)
+        old_conf = r["confidence"]
+        new_conf = scorer(r["query"], r["title"], r["channel"])
+        if old_conf != new_conf:
+            changes.append((r["index"], r["query"], old_conf, new_conf))
+            updates.append((new_conf, r["index"]))
+        r["confidence"] = new_conf
+        counts[new_conf] += 1
+        if run_path:
+            rows.append((r["index"], dumps(r)))
 
-    with RESULTS_FILE.open() as f:
-        for line in f:
-            r = json.loads(line)
-            old_conf = r["confidence"]
-            new_conf = compute_confidence(r["query"], r["title"], r["channel"])
+    if run_path:
+        rows.sort(key=lambda row: row[0])
+        with open(run_path, "w") as f:
+            for index, text in rows:
+                f.write(f"{index}\t{text}\n")
+    return counts, changes, updates
 
-            if old_conf != new_conf:
-                changes.append((r["index"], r["query"], old_conf, new_conf))
 
-            r["confidence"] = new_conf
-            results.append(r)
+def read_run(path: Path):
+    with open(path) as f:
+        for line in f:
+            index, text = line.rstrip("\n").split("\t", 1)
+            yield int(index), text
 
-    # Sort by index for consistent output
-    results.sort(key=lambda r: r["index"])
 
-    # Write output
-    out_path = Path(output) if output else RESULTS_FILE
-    with out_path.open("w") as f:
-        for r in results:
-            f.write(json.dumps(r, ensure_ascii=False) + "\n")
+def main(output: str | None = None, show_changes: bool = False, scorer: str = "normalized",
+         workers: int | None = None, chunk_size: int = CHUNK_SIZE, input_file: str | None = None):
+    """Re-score all results: the store in place, or a JSONL file (in place or to output)."""
+    get_scorer(scorer)  # fail fast on a bad name
+
+    store = None
+    if input_file:
+        source = Path(input_file)
+        if not source.exists():
+            print(f"Error: {source} not found")
+            return
+        out_path = Path(output) if output else source
+    else:
+        store = open_store()
+        if not store.count():
+            print(f"Error: no results in {store.path}")
+            return
+        out_path = Path(output) if output else None
 
-    # Summary
     by_conf = {"high": 0, "medium": 0, "low": 0, "none": 0}
-    for r in results:
-        by_conf[r["confidence"]] += 1
+    changes = []
+
+    with tempfile.TemporaryDirectory(dir=(out_path or JSONL_FILE).parent, prefix=".rescore-") as spill:
+        runs = []
+        f = source.open() if store is None else None
+        chunks = store.iter_chunks(chunk_size) if store else iter(lambda: list(islice(f, chunk_size)), [])
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight = set()
 
-    print(f"Re-scored {len(results)} results → {out_path}")
+            def submit_next() -> bool:
+                records = next(chunks, None)
+                if not records:
+                    return False
+                run_path = None
+                if out_path:
+                    run_path = Path(spill) / f"run-{len(runs):06d}"
+                    runs.append(run_path)
+                in_flight.add(executor.submit(score_chunk, records, scorer, str(run_path) if run_path else None))
+                return True
+
+            while len(in_flight) < MAX_IN_FLIGHT and submit_next():
+                pass
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    counts, chunk_changes, updates = future.result()
+                    for conf, n in counts.items():
+                        by_conf[conf] += n
+                    changes.extend(chunk_changes)
+                    if not out_path:
+                        store.update_confidence(updates)
+                    submit_next()
+        if f:
+            f.close()
+
+        if out_path:
+            # Merge the sorted runs (in input order, so equal indices keep their order)
+            tmp = out_path.with_name(f".{out_path.name}.tmp")
+            with tmp.open("w") as out:
+                for _, text in heapq.merge(*(read_run(r) for r in runs), key=lambda row: row[0]):
+                    out.write(text + "\n")
+            os.replace(tmp, out_path)
+        else:
+            store.export_jsonl()
+            out_path = store.path
+
+    if store:
+        store.close()
+
+    # Summary
+    total = sum(by_conf.values())
+    print(f"Re-scored {total} results → {out_path}")
     print(f"  High:   {by_conf['high']}")
     print(f"  Medium: {by_conf['medium']}")
     print(f"  Low:    {by_conf['low']}")
     print(f"  None:   {by_conf['none']}")
 
     if changes:
+        changes.sort()
         print(f"\n{len(changes)} confidence changes:")
         for idx, query, old, new in changes:
             arrow = "↑" if ["none", "low", "medium", "high"].index(new) > ["none", "low", "medium", "high"].index(old) else "↓"
             print(f"  [{idx}] {old} → {new} {arrow} {query[:50]}")
 
 
-if __name__ == "__main__":
-    import argparse
-
+def cli(argv: list[str] | None = None):
     parser = argparse.ArgumentParser(description="Re-score search results with updated algorithm")
-    parser.add_argument("-o", "--output", help="Output file (default: overwrite results.jsonl)")
+    parser.add_argument("-i", "--input", help="Re-score a results JSONL file instead of the results store")
+    parser.add_argument("-o", "--output", help="Write rescored results to this JSONL file instead of updating in place")
     parser.add_argument("--show-changes", action="store_true", help="Show what changed")
-    args = parser.parse_args()
+    parser.add_argument("--scorer", default="normalized",
+                        help=f"Scorer: {', '.join(SCORERS)} or module:function (default: normalized)")
+    parser.add_argument("-j", "--workers", type=int, help="Scoring processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help=f"Results per scoring chunk (default: {CHUNK_SIZE})")
+    args = parser.parse_args(argv)
+
+    main(args.output, args.show_changes, args.scorer, args.workers, args.chunk_size, args.input)
 
-    main(args.output, args.show_changes)
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,176 @@
+"""Indexed store of search results, keyed by query index.
+
+data/results.sqlite holds one row per query index; writing a result for
+an index replaces the previous one, so re-runs never leave duplicates.
+Confidence is indexed for filtering. data/results.jsonl is kept as an
+export of the store (for jq and manual review) and can be imported back.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+DB_FILE = DATA_DIR / "results.sqlite"
+JSONL_FILE = DATA_DIR / "results.jsonl"
+
+FIELDS = ["index", "query", "video_id", "title", "channel", "view_count", "confidence", "error", "score", "rank"]
+# "index" is an SQL keyword
+COLUMNS = ["idx" if f == "index" else f for f in FIELDS]
+
+
+def dumps(record: dict) -> str:
+    """A result as a JSONL line (results from before multi-candidate search have no score/rank)."""
+    if record.get("score") is None:
+        record = {k: v for k, v in record.items() if k not in ("score", "rank")}
+    return json.dumps(record, ensure_ascii=False)
+
+
+class ResultsStore:
+    def __init__(self, path: Path = DB_FILE, wal: bool = True):
+        """wal=False uses the rollback journal, for writers on other machines sharing the file."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        # Several search workers may write at once; wait for their transactions
+        self.db = sqlite3.connect(path, timeout=60)
+        self.db.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                idx INTEGER PRIMARY KEY,
+                query TEXT NOT NULL,
+                video_id TEXT,
+                title TEXT,
+                channel TEXT,
+                view_count INTEGER,
+                confidence TEXT NOT NULL,
+                error TEXT,
+                score REAL,
+                rank INTEGER
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS results_confidence ON results (confidence)")
+
+    def upsert(self, results: list[dict]):
+        marks = ", ".join("?" * len(FIELDS))
+        with self.db:
+            self.db.executemany(f"INSERT OR REPLACE INTO results ({', '.join(COLUMNS)}) VALUES ({marks})",
+                                [[r.get(f) for f in FIELDS] for r in results])
+
+    def update_confidence(self, updates: list[tuple[str, int]]):
+        """Apply (confidence, index) pairs."""
+        with self.db:
+            self.db.executemany("UPDATE results SET confidence = ? WHERE idx = ?", updates)
+
+    def indices(self, start: int = 0, end: int | None = None) -> set[int]:
+        """Indices with a stored result in [start, end)."""
+        rows = self.db.execute("SELECT idx FROM results WHERE idx >= ? AND idx < ?",
+                               (start, end if end is not None else 2 ** 62))
+        return {idx for idx, in rows}
+
+    def count(self) -> int:
+        return self.db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def counts_by_confidence(self) -> dict[str, int]:
+        counts = {"high": 0, "medium": 0, "low": 0, "none": 0}
+        counts.update(self.db.execute("SELECT confidence, COUNT(*) FROM results GROUP BY confidence"))
+        return counts
+
+    def iter_results(self, confidence: str | None = None):
+        """Results as dicts in index order, optionally only one confidence level."""
+        sql = f"SELECT {', '.join(COLUMNS)} FROM results"
+        params = ()
+        if confidence:
+            sql += " WHERE confidence = ?"
+            params = (confidence,)
+        for row in self.db.execute(sql + " ORDER BY idx", params):
+            yield dict(zip(FIELDS, row))
+
+    def iter_chunks(self, size: int):
+        """All results in index order, `size` at a time (keyset pagination)."""
+        last = -1
+        while True:
+            rows = self.db.execute(f"SELECT {', '.join(COLUMNS)} FROM results WHERE idx > ? ORDER BY idx LIMIT ?",
+                                   (last, size)).fetchall()
+            if not rows:
+                return
+            yield [dict(zip(FIELDS, row)) for row in rows]
+            last = rows[-1][0]
+
+    def video_ids(self, confidence: str | None = None) -> list[str]:
+        """Video IDs of successful searches in index order, optionally only one confidence level."""
+        sql = "SELECT video_id FROM results WHERE error IS NULL AND video_id IS NOT NULL"
+        params = ()
+        if confidence:
+            sql += " AND confidence = ?"
+            params = (confidence,)
+        return [vid for vid, in self.db.execute(sql + " ORDER BY idx", params)]
+
+    def import_jsonl(self, path: Path) -> int:
+        """Load a results JSONL file; later lines for the same index win."""
+        batch = []
+        total = 0
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                batch.append(json.loads(line))
+                if len(batch) >= 5000:
+                    self.upsert(batch)
+                    total += len(batch)
+                    batch = []
+        self.upsert(batch)
+        return total + len(batch)
+
+    def export_jsonl(self, path: Path = JSONL_FILE, confidence: str | None = None) -> int:
+        """Write results in index order to path (atomically)."""
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        n = 0
+        with open(tmp, "w") as f:
+            for r in self.iter_results(confidence):
+                f.write(dumps(r) + "\n")
+                n += 1
+        os.replace(tmp, path)
+        return n
+
+    def close(self):
+        self.db.close()
+
+
+def open_store(path: Path = DB_FILE, jsonl: Path = JSONL_FILE, wal: bool = True) -> ResultsStore:
+    """Open the results store, importing an existing results.jsonl the first time."""
+    store = ResultsStore(path, wal)
+    if not store.count() and jsonl.exists():
+        n = store.import_jsonl(jsonl)
+        print(f"Imported {n} records from {jsonl} into {path} ({store.count()} unique indices)")
+    return store
+
+
+def cli(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Import/export the search results store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import", help="Load a results JSONL file into the store (upsert by index)")
+    p.add_argument("file")
+    p = sub.add_parser("export", help="Write the store as JSONL in index order")
+    p.add_argument("file", nargs="?", default=str(JSONL_FILE))
+    p.add_argument("--confidence", "-c", choices=["high", "medium", "low", "none"], help="Only this confidence level")
+    sub.add_parser("stats", help="Count results by confidence")
+    args = parser.parse_args(argv)
+
+    store = ResultsStore()
+    if args.command == "import":
+        n = store.import_jsonl(Path(args.file))
+        print(f"Imported {n} records ({store.count()} unique indices in {store.path})")
+    elif args.command == "export":
+        n = store.export_jsonl(Path(args.file), args.confidence)
+        print(f"Exported {n} results to {args.file}")
+    else:
+        for conf, n in store.counts_by_confidence().items():
+            print(f"  {conf:<7} {n}")
+        print(f"  total   {store.count()}")
+    store.close()
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,94 @@
+"""Persistent cache of YouTube search results, keyed on the normalized query.
+
+Lives in data/cache/search.json:
+
+    {"version": 1, "entries": {"<normalized query>": {
+        "n": 1,                      # candidates requested (ytsearchN)
+        "candidates": [{"id", "title", "channel", "view_count"}, ...],
+        "fetchedAt": ..., "usedAt": ...}}}
+
+Queries that differ only in case or punctuation (see rescore.normalize)
+share an entry. Entries older than the TTL are refetched, and on save the
+least recently used entries beyond the size cap are dropped. Failed
+searches are never cached.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from rescore import normalize
+
+CACHE_FILE = Path(__file__).parent.parent / "data" / "cache" / "search.json"
+CACHE_VERSION = 1
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_ENTRIES = 50_000
+
+CANDIDATE_FIELDS = ("id", "title", "channel", "view_count")
+
+
+def compact(entry: dict) -> dict:
+    """Keep only the fields of a yt-dlp search entry that results use."""
+    return {k: entry.get(k) for k in CANDIDATE_FIELDS}
+
+
+class SearchCache:
+    def __init__(self, path: Path = CACHE_FILE, ttl_days: float = DEFAULT_TTL_DAYS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+        self.entries = {}
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                self.entries = data["entries"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def get(self, query: str, n: int = 1) -> list[dict] | None:
+        """Cached candidates for query, or None on a miss (absent, expired or too few requested)."""
+        entry = self.entries.get(normalize(query))
+        now = time.time()
+        if entry and now - entry["fetchedAt"] > self.ttl:
+            self.stats["expired"] += 1
+            entry = None
+        if not entry or entry["n"] < n:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        entry["usedAt"] = now
+        return entry["candidates"][:n]
+
+    def put(self, query: str, n: int, candidates: list[dict]):
+        now = time.time()
+        self.entries[normalize(query)] = {
+            "n": n,
+            "candidates": [compact(c) for c in candidates],
+            "fetchedAt": now,
+            "usedAt": now,
+        }
+
+    def save(self):
+        if len(self.entries) > self.max_entries:
+            by_use = sorted(self.entries, key=lambda k: self.entries[k]["usedAt"])
+            drop = by_use[:len(self.entries) - self.max_entries]
+            for key in drop:
+                del self.entries[key]
+            self.stats["evicted"] += len(drop)
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": CACHE_VERSION, "entries": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def summary(self) -> str:
+        s = self.stats
+        lookups = s["hits"] + s["misses"]
+        rate = s["hits"] / lookups if lookups else 0
+        return (f"Cache: {s['hits']} hits, {s['misses']} misses ({rate:.0%} hit rate), "
+                f"{s['expired']} expired, {s['evicted']} evicted, {len(self.entries)} entries")
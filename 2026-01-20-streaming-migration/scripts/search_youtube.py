@@ -1,121 +1,246 @@
 #!/usr/bin/env python3
 """Search YouTube for video IDs matching local file queries."""
 
+import argparse
 import asyncio
 import json
 import sys
+import time
 from pathlib import Path
 
-QUERIES_FILE = Path(__file__).parent.parent / "data" / "queries.txt"
-OUTPUT_FILE = Path(__file__).parent.parent / "data" / "results.jsonl"
+import telemetry
+from adaptive_limit import AimdLimiter, is_search_throttled
+from rescore import normalize, pick_best
+from results_store import JSONL_FILE, open_store
+from search_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL_DAYS, SearchCache
+from work_queue import LEASE_SECONDS, QUEUE_FILE, WorkQueue, worker_id
+from ytdlp_pool import SearchPool
 
+QUERIES_FILE = Path(__file__).parent.parent / "data" / "queries.txt"
 
-def compute_confidence(query: str, title: str | None, channel: str | None) -> str:
-    """Compute match confidence based on query vs title/channel similarity."""
-    if not title and not channel:
-        return "none"
+DEFAULT_CANDIDATES = 5
+# Finished searches are scored and written in batches of this many
+SCORE_BATCH = 64
+# Times a throttled query goes back in the queue before its error is recorded
+MAX_REQUEUES = 10
+# Seconds between checks while the rest of the queue is leased by other workers
+QUEUE_POLL = 2.0
 
-    query_lower = query.lower()
-    title_lower = (title or "").lower()
-    channel_lower = (channel or "").lower()
 
-    # Split query into artist and song title
-    parts = query.split(" - ", 1)
-    artist = parts[0].lower() if parts else ""
-    song = parts[1].lower() if len(parts) > 1 else ""
+def empty_result(index: int, query: str) -> dict:
+    return {"index": index, "query": query, "video_id": None, "title": None, "channel": None, "view_count": None, "confidence": "none", "error": None}
 
-    artist_match = artist and (artist in channel_lower or artist in title_lower)
-    song_match = song and song in title_lower
 
-    if artist_match and song_match:
-        return "high"
-    elif artist_match or song_match:
-        return "medium"
-    else:
-        return "low"
+def fill_result(result: dict, data: dict, rank: int, confidence: str, score: float) -> dict:
+    """Fill a result from the chosen yt-dlp search entry (rank = its position in the search results)."""
+    result["video_id"] = data.get("id")
+    result["title"] = data.get("title")
+    result["channel"] = data.get("channel")
+    result["view_count"] = data.get("view_count")
+    result["confidence"] = confidence
+    result["score"] = round(score, 1)
+    result["rank"] = rank
+    return result
 
 
-async def search_youtube(index: int, query: str) -> dict:
-    """Search YouTube for a single query using yt-dlp."""
+async def search_subprocess(query: str, n: int = 1) -> tuple[list[dict] | None, str | None]:
+    """Search YouTube for a single query using a yt-dlp subprocess. Returns (entries, error)."""
     proc = await asyncio.create_subprocess_exec(
         "yt-dlp",
         "--flat-playlist",
         "-j",
-        f"ytsearch1:{query}",
+        f"ytsearch{n}:{query}",
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
     )
     stdout, stderr = await proc.communicate()
 
-    result = {"index": index, "query": query, "video_id": None, "title": None, "channel": None, "view_count": None, "confidence": "none", "error": None}
-
     if proc.returncode != 0:
-        result["error"] = stderr.decode().strip()
-        return result
+        return None, stderr.decode().strip()
 
     try:
-        data = json.loads(stdout.decode())
-        result["video_id"] = data.get("id")
-        result["title"] = data.get("title")
-        result["channel"] = data.get("channel")
-        result["view_count"] = data.get("view_count")
-        result["confidence"] = compute_confidence(query, result["title"], result["channel"])
+        return [json.loads(line) for line in stdout.decode().splitlines() if line.strip()], None
     except json.JSONDecodeError as e:
-        result["error"] = f"JSON decode error: {e}"
-
-    return result
+        return None, f"JSON decode error: {e}"
 
 
-async def main(start: int = 0, end: int | None = None, concurrency: int = 10, overwrite: bool = False):
-    """Run batch YouTube searches."""
+async def main(start: int = 0, end: int | None = None, concurrency: int = 10, overwrite: bool = False,
+               engine: str = "pool", use_cache: bool = True, cache_ttl: float = DEFAULT_TTL_DAYS,
+               cache_size: int = DEFAULT_MAX_ENTRIES, candidates: int = DEFAULT_CANDIDATES, adaptive: bool = True,
+               queue_path: Path | None = None, lease_seconds: float = LEASE_SECONDS):
+    """Run batch YouTube searches (with queue_path, as one worker of a shared work queue)."""
     all_queries = QUERIES_FILE.read_text().strip().split("\n")
     queries = [(i + start, q) for i, q in enumerate(all_queries[start:end])]
 
     print(f"Searching {len(queries)} queries (index {start} to {start + len(queries) - 1})...")
-    print(f"Concurrency: {concurrency}")
+    mode = f"adaptive, max {concurrency}" if adaptive else "fixed"
+    print(f"Concurrency: {concurrency} ({engine}, {mode}), {candidates} candidates per query")
+
+    # Queue workers may run on other machines sharing data/, where WAL isn't safe
+    store = open_store(wal=not queue_path)
 
-    # Load existing results to skip (for resume)
+    # Skip queries that already have a result (for resume)
     existing_indices = set()
-    if not overwrite and OUTPUT_FILE.exists():
-        with OUTPUT_FILE.open() as f:
-            for line in f:
-                try:
-                    existing_indices.add(json.loads(line)["index"])
-                except:
-                    pass
+    if not overwrite:
+        existing_indices = store.indices(start, start + len(queries))
         if existing_indices:
             print(f"Resuming: {len(existing_indices)} already done, skipping...")
 
-    queries = [(idx, q) for idx, q in queries if idx not in existing_indices]
-    if not queries:
-        print("All queries already processed.")
-        return
-
-    print(f"Processing {len(queries)} queries...")
-
-    semaphore = asyncio.Semaphore(concurrency)
+    work = None
+    if queue_path:
+        work = WorkQueue(queue_path)
+        if not any(work.counts().values()):
+            added = work.fill(queries, existing_indices)
+            print(f"Filled work queue {queue_path} with {added} indices")
+        worker = worker_id()
+        queries = []
+        total = work.remaining()
+        print(f"Worker {worker}: {total} indices left in {queue_path}")
+    else:
+        queries = [(idx, q) for idx, q in queries if idx not in existing_indices]
+        total = len(queries)
+        if not queries:
+            print("All queries already processed.")
+            store.close()
+            return
+        print(f"Processing {len(queries)} queries...")
+
+    if adaptive:
+        limiter = AimdLimiter(concurrency)
+    else:
+        limiter = AimdLimiter(concurrency, initial=concurrency, minimum=concurrency)
     completed = 0
+    fetched = 0
+    shared = 0
     results = []
-
-    # Open file for streaming writes
-    mode = "w" if overwrite else "a"
-    outfile = OUTPUT_FILE.open(mode)
-
-    async def limited_search(idx: int, q: str):
+    cache = SearchCache(ttl_days=cache_ttl, max_entries=cache_size) if use_cache else None
+    # Normalized query -> task, so duplicate lines in one run share a single search
+    inflight = {}
+
+    pool = SearchPool(concurrency) if engine == "pool" else None
+
+    async def fetch(q: str) -> tuple[list[dict] | None, str | None]:
+        nonlocal fetched
+        for attempt in range(MAX_REQUEUES + 1):
+            queued = time.monotonic()
+            async with limiter:
+                started = time.monotonic()
+                if pool:
+                    entries, error = await pool.search(q, candidates)
+                else:
+                    entries, error = await search_subprocess(q, candidates)
+            latency = time.monotonic() - started
+            outcome = "ok" if not error else "throttled" if is_search_throttled(error) else "error"
+            telemetry.record(f"search:{engine}", len(entries or []), latency, outcome, attempt, error,
+                             wait=started - queued)
+            if not error:
+                await limiter.success(started)
+                break
+            if not is_search_throttled(error) or attempt == MAX_REQUEUES:
+                limiter.error()
+                break
+            # Throttled: back in the queue instead of recording an error row
+            await limiter.throttled(started)
+        if cache and not error:
+            cache.put(q, candidates, entries)
+            fetched += 1
+            if fetched % 200 == 0:
+                cache.save()
+        return entries, error
+
+    finished = []  # (index, query, entries, error) awaiting scoring
+
+    def flush():
+        """Score a batch of finished searches in one pass and store their results."""
         nonlocal completed
-        async with semaphore:
-            result = await search_youtube(idx, q)
+        if not finished:
+            return
+        started = time.monotonic()
+        batch = []
+        best = pick_best([q for _, q, _, _ in finished], [entries or [] for _, _, entries, _ in finished])
+        for (idx, q, entries, error), choice in zip(finished, best):
+            result = empty_result(idx, q)
+            if error:
+                result["error"] = error
+            elif choice:
+                rank, confidence, score = choice
+                fill_result(result, entries[rank], rank, confidence, score)
+            batch.append(result)
+
             completed += 1
             conf = result["confidence"][0].upper() if result["video_id"] else "✗"
-            print(f"[{completed}/{len(queries)}] {conf} [{idx}] {q[:50]}")
-            # Stream write immediately
-            outfile.write(json.dumps(result, ensure_ascii=False) + "\n")
-            outfile.flush()
-            return result
+            print(f"[{completed}/{total}] {conf} [{idx}] {q[:50]}")
+        store.upsert(batch)
+        if work:
+            work.complete([r["index"] for r in batch])
+        telemetry.record("score+store", len(batch), time.monotonic() - started)
+        results.extend(batch)
+        finished.clear()
+
+    async def search(idx: int, q: str):
+        nonlocal shared
+        key = normalize(q)
+        error = None
+        if key in inflight:
+            # Duplicate of a query searched in this run: not a cache lookup
+            shared += 1
+            entries, error = await inflight[key]
+        else:
+            entries = cache.get(q, candidates) if cache else None
+            if entries is not None:
+                telemetry.record("search:cache", len(entries))
+            else:
+                inflight[key] = asyncio.ensure_future(fetch(q))
+                entries, error = await inflight[key]
+        finished.append((idx, q, entries, error))
+        if len(finished) >= SCORE_BATCH:
+            flush()
+
+    async def run_queue():
+        """Lease indices as searches finish, renewing leases, until the queue is drained."""
+        lease_size = max(2 * concurrency, SCORE_BATCH)
+        renew_every = lease_seconds / 3
+        active = set()
+        renewed = time.monotonic()
+        try:
+            while True:
+                if len(active) < lease_size // 2:
+                    for idx, q in work.lease(worker, lease_size - len(active), lease_seconds):
+                        active.add(asyncio.ensure_future(search(idx, q)))
+                if active:
+                    done, active = await asyncio.wait(active, timeout=renew_every, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                else:
+                    flush()
+                    if not work.remaining():
+                        break
+                    # The rest is leased by other workers; take it over if their leases expire
+                    await asyncio.sleep(min(QUEUE_POLL, renew_every))
+                if time.monotonic() - renewed >= renew_every:
+                    work.renew(worker, lease_seconds)
+                    renewed = time.monotonic()
+        finally:
+            for task in active:
+                task.cancel()
+            flush()
+            work.release(worker)
 
-    # Gather preserves order in results
-    results = await asyncio.gather(*[limited_search(idx, q) for idx, q in queries])
-    outfile.close()
+    try:
+        if work:
+            await run_queue()
+        else:
+            await asyncio.gather(*[search(idx, q) for idx, q in queries])
+            flush()
+    finally:
+        store.export_jsonl()
+        store.close()
+        if work:
+            work.close()
+        if pool:
+            pool.close()
+        if cache:
+            cache.save()
 
     # Summary
     by_conf = {"high": [], "medium": [], "low": [], "none": []}
@@ -127,6 +252,9 @@ async def main(start: int = 0, end: int | None = None, concurrency: int = 10, ov
     print(f"  Medium: {len(by_conf['medium'])}")
     print(f"  Low:    {len(by_conf['low'])}")
     print(f"  None:   {len(by_conf['none'])}")
+    not_first = sum(1 for r in results if r.get("rank"))
+    if not_first:
+        print(f"  ({not_first} matched a candidate other than the top search result)")
 
     if by_conf["low"]:
         print(f"\n⚠️  Low confidence ({len(by_conf['low'])}):")
@@ -141,17 +269,48 @@ async def main(start: int = 0, end: int | None = None, concurrency: int = 10, ov
         for r in by_conf["none"]:
             print(f"  [{r['index']}] {r['query']}")
 
-    print(f"\nResults written to {OUTPUT_FILE}")
+    stats = limiter.stats
+    if stats["throttled"]:
+        print(f"\nThrottled {stats['throttled']}x (requeued), concurrency cut {stats['cuts']}x")
+    if adaptive:
+        print(f"Concurrency: peak {stats['peak']}, final {limiter.limit}")
 
+    if cache:
+        print(f"\n{cache.summary()}")
+    if shared:
+        print(f"  {shared} duplicate queries shared a search")
+
+    print(f"\nResults written to {store.path} (exported to {JSONL_FILE})")
 
-if __name__ == "__main__":
-    import argparse
 
+def cli(argv: list[str] | None = None):
     parser = argparse.ArgumentParser()
     parser.add_argument("--start", type=int, default=0, help="Start index")
     parser.add_argument("--end", type=int, default=None, help="End index")
     parser.add_argument("--concurrency", type=int, default=10, help="Parallel requests")
-    parser.add_argument("--overwrite", action="store_true", help="Overwrite output file (default: append)")
-    args = parser.parse_args()
+    parser.add_argument("--overwrite", action="store_true", help="Re-search queries that already have a result (default: skip them)")
+    parser.add_argument("--engine", choices=["pool", "subprocess"], default="pool",
+                        help="pool: persistent yt-dlp worker processes (default); subprocess: one yt-dlp CLI per query")
+    parser.add_argument("--no-cache", action="store_true", help="Always search, ignoring data/cache/search.json")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL_DAYS,
+                        help=f"Days before a cached search is refetched (default: {DEFAULT_TTL_DAYS})")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help=f"Max cached queries, least recently used dropped first (default: {DEFAULT_MAX_ENTRIES})")
+    parser.add_argument("-n", "--candidates", type=int, default=DEFAULT_CANDIDATES,
+                        help=f"Search results fetched and scored per query (default: {DEFAULT_CANDIDATES})")
+    parser.add_argument("--adaptive", action=argparse.BooleanOptionalAction, default=True,
+                        help="Grow concurrency up to --concurrency while healthy, halve it on throttling (default: on)")
+    parser.add_argument("--queue", nargs="?", const=str(QUEUE_FILE), metavar="PATH",
+                        help=f"Work as one of several workers on a shared lease queue (default: {QUEUE_FILE}); "
+                             "filled from --start/--end on first use")
+    parser.add_argument("--lease", type=float, default=LEASE_SECONDS,
+                        help=f"Seconds a leased index is held without renewal before others take it (default: {LEASE_SECONDS})")
+    args = parser.parse_args(argv)
+
+    asyncio.run(main(args.start, args.end, args.concurrency, args.overwrite, args.engine,
+                     not args.no_cache, args.cache_ttl, args.cache_size, args.candidates,
+                     args.adaptive, Path(args.queue) if args.queue else None, args.lease))
 
-    asyncio.run(main(args.start, args.end, args.concurrency, args.overwrite))
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""Sync a playlist to a desired list of videos with the fewest writes.
+
+Reads the playlist once (local snapshot, see playlist_cache.py), diffs it
+against the desired videoIds and applies, in order:
+
+  1. removes: entries whose video isn't wanted, and repeat entries of a video
+  2. adds: wanted videos not in the playlist (appended in desired order)
+  3. moves: only entries outside the longest run already in desired order
+     (longest increasing subsequence), each placed before its successor
+
+So an up-to-date playlist costs one read and no writes, and a reorder
+moves the fewest possible items.
+"""
+
+import argparse
+import sys
+from bisect import bisect_left
+from pathlib import Path
+
+from ytmusicapi import YTMusic
+
+from batch_executor import add_executor_args, check_status, run_batches, save_report
+from client import connect
+from import_to_playlist import load_video_ids
+from playlist_cache import get_tracks, record_added, record_order, record_removed
+
+
+def longest_increasing(seq: list[int]) -> set[int]:
+    """Values of a longest strictly increasing subsequence of seq (values are unique)."""
+    tails = []  # tails[k] = index in seq of the smallest tail of an increasing run of length k+1
+    prev = [-1] * len(seq)
+    for i, value in enumerate(seq):
+        k = bisect_left(tails, value, key=lambda t: seq[t])
+        if k > 0:
+            prev[i] = tails[k - 1]
+        if k == len(tails):
+            tails.append(i)
+        else:
+            tails[k] = i
+    result = set()
+    i = tails[-1] if tails else -1
+    while i >= 0:
+        result.add(seq[i])
+        i = prev[i]
+    return result
+
+
+def plan_sync(tracks: list[dict], desired: list[str], prune: bool = True, reorder: bool = True) -> dict:
+    """Minimal operations to turn tracks into desired.
+
+    Returns {"desired": [videoId, ...] (deduplicated), "keep": {videoId: setVideoId},
+    "remove": [entry, ...], "add": [videoId, ...], "move": [desired position, ...]}.
+    Moves are in the order to apply them (last desired position first).
+    With prune=False, entries of unwanted videos stay where they are.
+    """
+    desired = list(dict.fromkeys(v for v in desired if v))
+    position = {vid: i for i, vid in enumerate(desired)}
+
+    keep = {}
+    remove = []
+    for i, track in enumerate(tracks):
+        vid, sid = track["videoId"], track["setVideoId"]
+        if vid in position and vid not in keep:
+            keep[vid] = sid
+        elif vid in position or prune:
+            remove.append({"index": i, "title": track["title"], "artist": track["artist"],
+                           "videoId": vid, "setVideoId": sid})
+
+    add = [vid for vid in desired if vid not in keep]
+
+    move = []
+    if reorder:
+        # Playlist order after removes and adds, as desired positions
+        sequence = [position[t["videoId"]] for t in tracks if keep.get(t["videoId"]) == t["setVideoId"]]
+        sequence += [position[vid] for vid in add]
+        in_place = longest_increasing(sequence)
+        move = [p for p in reversed(range(len(desired))) if p not in in_place]
+
+    return {"desired": desired, "keep": keep, "remove": remove, "add": add, "move": move}
+
+
+def main(argv: list[str] | None = None, yt: YTMusic | None = None):
+    parser = argparse.ArgumentParser(description="Make a playlist match a desired list of videos")
+    parser.add_argument("--input", "-i", required=True, help="Desired videos, in order (results.sqlite, jsonl or tsv)")
+    parser.add_argument("--playlist", "-p", required=True, help="Playlist ID")
+    parser.add_argument("--confidence", "-c", choices=["high", "medium", "low", "none"],
+                        help="Only this confidence level (sqlite/jsonl only)")
+    parser.add_argument("--keep-extra", action="store_true", help="Don't remove videos that aren't in the input")
+    parser.add_argument("--no-reorder", action="store_true", help="Only add/remove, leave the order alone")
+    parser.add_argument("--batch-size", "-b", type=int, default=50, help="Videos per add/remove batch (default: 50)")
+    parser.add_argument("--dry-run", "-n", action="store_true", help="Show the plan without applying it")
+    add_executor_args(parser)
+    parser.add_argument("--refresh", action="store_true", help="Refetch playlists instead of using the local snapshot")
+    args = parser.parse_args(argv)
+
+    input_path = Path(args.input)
+    if not input_path.exists():
+        print(f"Error: {input_path} not found")
+        sys.exit(1)
+    desired = load_video_ids(input_path, confidence=args.confidence)
+    print(f"Loaded {len(desired)} video IDs from {input_path}")
+
+    yt = connect(yt)
+
+    print(f"Fetching playlist {args.playlist}...")
+    tracks = get_tracks(yt, args.playlist, args.refresh)
+    print(f"Found {len(tracks)} tracks")
+
+    plan = plan_sync(tracks, desired, prune=not args.keep_extra, reorder=not args.no_reorder)
+    desired = plan["desired"]
+    print(f"\nDesired: {len(desired)} videos")
+    print(f"  Remove: {len(plan['remove'])}")
+    print(f"  Add:    {len(plan['add'])}")
+    print(f"  Move:   {len(plan['move'])}")
+    for entry in plan["remove"][:5]:
+        print(f"  - #{entry['index']} {entry['artist']} - {entry['title']}")
+
+    if not (plan["remove"] or plan["add"] or plan["move"]):
+        print("\nPlaylist already in sync")
+        return
+    if args.dry_run:
+        print("\n[DRY RUN] No changes made")
+        return
+
+    set_ids = dict(plan["keep"])
+    # Simulated playlist order (setVideoIds), kept in step with successful writes
+    order = [t["setVideoId"] for t in tracks]
+    reports = []
+
+    if plan["remove"]:
+        print(f"\nRemoving {len(plan['remove'])}...")
+
+        def on_removed(batch, result):
+            removed = {e["setVideoId"] for e in batch}
+            order[:] = [sid for sid in order if sid not in removed]
+            record_removed(args.playlist, removed)
+
+        reports.append(run_batches(
+            plan["remove"],
+            lambda batch: check_status(yt.remove_playlist_items(args.playlist, batch)),
+            batch_size=args.batch_size, concurrency=args.concurrency, rate=args.rate,
+            on_success=on_removed, label="removed",
+        ))
+
+    if plan["add"]:
+        print(f"\nAdding {len(plan['add'])}...")
+
+        def on_added(batch, result):
+            for edit in result.get("playlistEditResults") or []:
+                if edit and edit.get("setVideoId"):
+                    set_ids[edit["videoId"]] = edit["setVideoId"]
+                    order.append(edit["setVideoId"])
+            record_added(args.playlist, result)
+
+        # Sequential, so appended videos land in desired order
+        reports.append(run_batches(
+            plan["add"],
+            lambda batch: check_status(yt.add_playlist_items(args.playlist, batch, duplicates=True)),
+            batch_size=args.batch_size, concurrency=1, rate=args.rate,
+            on_success=on_added, label="added",
+        ))
+
+    moves = []
+    for p in plan["move"]:
+        sid = set_ids.get(desired[p])
+        if not sid:
+            continue  # add failed
+        successor = next((set_ids[v] for v in desired[p + 1:] if v in set_ids), None)
+        moves.append((sid, successor))
+
+    if moves:
+        print(f"\nMoving {len(moves)}...")
+
+        def on_moved(batch, result):
+            sid, successor = batch[0]
+            order.remove(sid)
+            order.insert(order.index(successor) if successor else len(order), sid)
+
+        # One move per call, in plan order: each item goes before one already in place
+        reports.append(run_batches(
+            moves,
+            lambda batch: check_status(yt.edit_playlist(args.playlist, moveItem=batch[0] if batch[0][1] else batch[0][0])),
+            batch_size=1, concurrency=1, rate=args.rate,
+            on_success=on_moved, label="moved",
+        ))
+        record_order(args.playlist, order)
+
+    report = {
+        "succeeded": [item for r in reports for item in r["succeeded"]],
+        "failed": [f for r in reports for f in r["failed"]],
+        "calls": sum(r["calls"] for r in reports),
+        "retries": sum(r["retries"] for r in reports),
+    }
+    save_report(report, args.report)
+    print(f"\nDone! {report['calls']} write calls, {len(report['failed'])} failed")
+
+
+if __name__ == "__main__":
+    main()
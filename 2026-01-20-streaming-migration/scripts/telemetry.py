@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""Run log of every network call and subprocess, and a report over it.
+
+Each process appends to data/telemetry/<run-id>.jsonl, one compact line
+per call:
+
+    {"t": 1769334000.123, "c": "sync", "e": "add_playlist_items", "n": 50,
+     "ms": 412.5, "o": "ok", "a": 0}
+
+t = start time, c = command, e = endpoint, n = items in the call (batch
+size, or tracks/candidates returned), ms = latency, o = outcome
+(ok | throttled | error), a = attempt (0 = first try), plus optional
+w = ms spent queued before the call and x = error message.
+
+YTMusic calls are recorded by the instrument() wrapper the shared client
+gets; the executor, counterpart resolver and search loop set the attempt
+number and record their own calls. Lines are buffered and flushed every
+FLUSH_EVERY records and at exit. Set YTM_TELEMETRY=0 to turn it off.
+
+    telemetry.py report              # latest run
+    telemetry.py report RUN_ID --bucket 60
+    telemetry.py list
+"""
+
+import argparse
+import atexit
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import batch_executor
+
+RUN_DIR = Path("data/telemetry")
+ENABLED = os.environ.get("YTM_TELEMETRY", "1") != "0"
+FLUSH_EVERY = 200
+
+_lock = threading.Lock()
+_local = threading.local()
+_buffer = []
+_path = None
+_command = None
+_script = Path(sys.argv[0]).stem or "python"
+
+
+def start(command: str):
+    """Label the following records with command (migrate.py calls this per command)."""
+    global _command
+    _command = command
+
+
+def set_attempt(attempt: int):
+    """Attempt number for the calls this thread makes next (0 = first try)."""
+    _local.attempt = attempt
+
+
+def run_file() -> Path | None:
+    """This process's run log (None until something is recorded)."""
+    return _path
+
+
+def _open() -> Path:
+    global _path
+    RUN_DIR.mkdir(parents=True, exist_ok=True)
+    _path = RUN_DIR / f"{_script}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.jsonl"
+    return _path
+
+
+def flush():
+    with _lock:
+        if not _buffer:
+            return
+        with open(_path or _open(), "a") as f:
+            f.write("\n".join(_buffer) + "\n")
+        _buffer.clear()
+
+
+atexit.register(flush)
+
+
+def record(endpoint: str, items: int = 1, latency: float = 0.0, outcome: str = "ok", attempt: int | None = None,
+           error: str | None = None, wait: float | None = None, started: float | None = None):
+    """Log one call; latency and wait in seconds, started as time.time()."""
+    if not ENABLED:
+        return
+    entry = {
+        "t": round(started if started is not None else time.time() - latency, 3),
+        "c": _command or _script,
+        "e": endpoint,
+        "n": items,
+        "ms": round(latency * 1000, 1),
+        "o": outcome,
+        "a": getattr(_local, "attempt", 0) if attempt is None else attempt,
+    }
+    if wait:
+        entry["w"] = round(wait * 1000, 1)
+    if error:
+        entry["x"] = error[:200]
+    line = json.dumps(entry, ensure_ascii=False)
+    with _lock:
+        _buffer.append(line)
+        full = len(_buffer) >= FLUSH_EVERY
+    if full:
+        flush()
+
+
+def outcome_of(error: str | Exception | None) -> str:
+    if error is None:
+        return "ok"
+    return "throttled" if batch_executor.is_throttled(error if isinstance(error, Exception) else Exception(error)) else "error"
+
+
+def _count_items(args: tuple, kwargs: dict, result) -> int:
+    if isinstance(result, dict) and isinstance(result.get("tracks"), list):
+        return len(result["tracks"])
+    for value in list(args) + list(kwargs.values()):
+        if isinstance(value, list):
+            return len(value)
+    return 1
+
+
+class Instrumented:
+    """Proxy for a YTMusic client that records every method call."""
+
+    def __init__(self, client):
+        self._client = client
+        self._wrapped = {}
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+        if name not in self._wrapped:
+            def call(*args, **kwargs):
+                started = time.time()
+                t0 = time.perf_counter()
+                try:
+                    result = attr(*args, **kwargs)
+                except Exception as e:
+                    record(name, _count_items(args, kwargs, None), time.perf_counter() - t0, outcome_of(e),
+                           error=str(e).splitlines()[0] if str(e) else type(e).__name__, started=started)
+                    raise
+                record(name, _count_items(args, kwargs, result), time.perf_counter() - t0, started=started)
+                return result
+            self._wrapped[name] = call
+        return self._wrapped[name]
+
+
+def instrument(client):
+    return Instrumented(client) if ENABLED and not isinstance(client, Instrumented) else client
+
+
+# Report
+
+def load_run(path: Path) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_run(run_id: str | None) -> Path | None:
+    if run_id:
+        path = Path(run_id)
+        return path if path.exists() else RUN_DIR / f"{run_id.removesuffix('.jsonl')}.jsonl"
+    runs = sorted(RUN_DIR.glob("*.jsonl"), key=lambda p: p.stat().st_mtime)
+    return runs[-1] if runs else None
+
+
+def percentile(values: list[float], p: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def report(records: list[dict], bucket: float | None = None, width: int = 40):
+    if not records:
+        print("No calls recorded")
+        return
+    records.sort(key=lambda r: r["t"])
+    first = records[0]["t"]
+    last = max(r["t"] + r["ms"] / 1000 for r in records)
+    duration = max(last - first, 1e-3)
+    commands = list(dict.fromkeys(r["c"] for r in records))
+    print(f"{len(records)} calls over {duration:.1f}s ({', '.join(commands)})")
+    print(f"Started {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(first))}\n")
+
+    by_endpoint = defaultdict(list)
+    for r in records:
+        by_endpoint[r["e"]].append(r)
+    total_ms = sum(r["ms"] for r in records) or 1
+
+    print(f"{'endpoint':<26} {'calls':>6} {'items':>7} {'items/s':>8} {'p50':>7} {'p90':>7} {'p99':>7} {'max':>7} "
+          f"{'time%':>6} {'retry':>5} {'429':>5} {'err':>5}")
+    for endpoint, calls in sorted(by_endpoint.items(), key=lambda kv: -sum(r["ms"] for r in kv[1])):
+        latencies = sorted(r["ms"] for r in calls)
+        items = sum(r["n"] for r in calls if r["o"] == "ok")
+        outcomes = Counter(r["o"] for r in calls)
+        print(f"{endpoint:<26} {len(calls):>6} {items:>7} {items / duration:>8.1f} "
+              f"{percentile(latencies, 50):>7.0f} {percentile(latencies, 90):>7.0f} {percentile(latencies, 99):>7.0f} "
+              f"{latencies[-1]:>7.0f} {100 * sum(latencies) / total_ms:>5.1f}% "
+              f"{sum(1 for r in calls if r['a']):>5} {outcomes['throttled']:>5} {outcomes['error']:>5}")
+    waits = sorted(r["w"] for r in records if r.get("w"))
+    if waits:
+        print(f"\nQueued before calls: p50 {percentile(waits, 50):.0f} ms, p90 {percentile(waits, 90):.0f} ms, "
+              f"max {waits[-1]:.0f} ms")
+
+    bucket = bucket or max(1.0, round(duration / 20))
+    slots = defaultdict(lambda: [0, 0, 0, 0])  # calls, items, throttled, errors
+    for r in records:
+        slot = slots[int((r["t"] - first) // bucket)]
+        slot[0] += 1
+        if r["o"] == "ok":
+            slot[1] += r["n"]
+        elif r["o"] == "throttled":
+            slot[2] += 1
+        else:
+            slot[3] += 1
+    peak = max(s[1] for s in slots.values()) or 1
+    print(f"\nThroughput ({bucket:g}s buckets):")
+    print(f"  {'time':>8} {'calls/s':>8} {'items/s':>8} {'429':>4} {'err':>4}")
+    for i in range(int((last - first) // bucket) + 1):
+        calls, items, throttled, errors = slots.get(i, (0, 0, 0, 0))
+        bar = "█" * round(width * items / peak)
+        print(f"  {i * bucket:>7g}s {calls / bucket:>8.1f} {items / bucket:>8.1f} {throttled or '':>4} {errors or '':>4} {bar}")
+
+    failures = Counter((r["e"], r["o"], r.get("x", "")) for r in records if r["o"] != "ok")
+    if failures:
+        print("\nErrors:")
+        for (endpoint, outcome, message), n in failures.most_common(15):
+            print(f"  {n:>5}x {endpoint} {outcome}: {message[:90]}")
+        if len(failures) > 15:
+            print(f"  ... and {len(failures) - 15} more kinds")
+
+
+def cli(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Show telemetry from migration runs")
+    sub = parser.add_subparsers(dest="action", required=True)
+    p = sub.add_parser("report", help="Latency percentiles, throughput over time and errors for a run")
+    p.add_argument("run", nargs="*", help="Run IDs or files (default: latest run; several are combined)")
+    p.add_argument("--bucket", type=float, help="Seconds per throughput row (default: ~20 rows)")
+    p.add_argument("--command", "-c", help="Only calls made by this command")
+    p.add_argument("--endpoint", "-e", help="Only this endpoint")
+    sub.add_parser("list", help="List recorded runs")
+    args = parser.parse_args(argv)
+
+    if args.action == "list":
+        for path in sorted(RUN_DIR.glob("*.jsonl"), key=lambda p: p.stat().st_mtime):
+            records = load_run(path)
+            span = max(r["t"] + r["ms"] / 1000 for r in records) - min(r["t"] for r in records) if records else 0
+            commands = ", ".join(dict.fromkeys(r["c"] for r in records))
+            print(f"  {path.stem:<45} {len(records):>7} calls {span:>8.1f}s  {commands}")
+        return
+
+    paths = [find_run(run) for run in args.run] if args.run else [find_run(None)]
+    records = []
+    for path in paths:
+        if not path or not path.exists():
+            print(f"Error: run not found ({path or 'no runs in ' + str(RUN_DIR)})")
+            sys.exit(1)
+        print(f"Run: {path.stem}")
+        records += load_run(path)
+    records = [r for r in records if (not args.command or r["c"] == args.command)
+               and (not args.endpoint or r["e"] == args.endpoint)]
+    report(records, args.bucket)
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""Lease-based work queue of search query indices, shared by worker processes.
+
+data/queue.sqlite holds one row per query index. A worker leases a batch
+of pending indices for LEASE_SECONDS, keeps renewing its leases while it
+works, and marks indices done once their results are in the results
+store. Leases a worker stops renewing (it crashed or was killed) expire
+and are handed out again; an index whose lease expired MAX_ATTEMPTS times
+is marked failed so one bad query can't take down every worker.
+
+All state changes are single SQLite transactions (BEGIN IMMEDIATE), so
+any number of workers can share the queue: on one machine, or on several
+machines with the data directory on a shared filesystem with working
+file locks. The queue uses SQLite's rollback journal rather than WAL for
+that reason (WAL needs shared memory between the processes).
+
+    work_queue.py init --start 0 --end 30000   # or let the first worker fill it
+    work_queue.py status
+    work_queue.py retry-failed
+"""
+
+import argparse
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+QUEUE_FILE = DATA_DIR / "queue.sqlite"
+
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    def __init__(self, path: Path = QUEUE_FILE):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=DELETE")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                idx INTEGER PRIMARY KEY,
+                query TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                worker TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, idx)")
+
+    def _transaction(self, fn):
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn()
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+        return result
+
+    def fill(self, queries: list[tuple[int, str]], done: set[int] = frozenset(), overwrite: bool = False) -> int:
+        """Add (index, query) pairs; indices in done start as done. Returns the number added.
+
+        With overwrite, the given indices go back to pending even if already queued or done.
+        """
+        def run():
+            verb = "INSERT OR REPLACE" if overwrite else "INSERT OR IGNORE"
+            before = self.db.total_changes
+            self.db.executemany(f"{verb} INTO tasks (idx, query, state) VALUES (?, ?, ?)",
+                                [(idx, q, "done" if idx in done and not overwrite else "pending") for idx, q in queries])
+            return self.db.total_changes - before
+
+        return self._transaction(run)
+
+    def lease(self, worker: str, n: int, lease_seconds: float = LEASE_SECONDS) -> list[tuple[int, str]]:
+        """Up to n pending (or expired) indices, leased to worker, in index order."""
+        def run():
+            now = time.time()
+            # Expired leases that ran out of attempts are given up on
+            self.db.execute("UPDATE tasks SET state = 'failed', worker = NULL "
+                            "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?", (now, MAX_ATTEMPTS))
+            rows = self.db.execute(
+                "SELECT idx, query FROM tasks WHERE state = 'pending' "
+                "OR (state = 'leased' AND lease_until < ?) ORDER BY idx LIMIT ?", (now, n)).fetchall()
+            self.db.executemany(
+                "UPDATE tasks SET state = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1 WHERE idx = ?",
+                [(worker, now + lease_seconds, idx) for idx, _ in rows])
+            return rows
+
+        return self._transaction(run)
+
+    def renew(self, worker: str, lease_seconds: float = LEASE_SECONDS) -> int:
+        """Extend all of worker's leases; returns how many it still holds."""
+        cursor = self.db.execute("UPDATE tasks SET lease_until = ? WHERE state = 'leased' AND worker = ?",
+                                 (time.time() + lease_seconds, worker))
+        return cursor.rowcount
+
+    def complete(self, indices: list[int]):
+        """Mark indices done (their results are stored), whoever holds them now."""
+        self.db.executemany("UPDATE tasks SET state = 'done', worker = NULL, lease_until = NULL WHERE idx = ?",
+                            [(idx,) for idx in indices])
+
+    def release(self, worker: str):
+        """Hand worker's unfinished leases back (on a clean shutdown)."""
+        self.db.execute("UPDATE tasks SET state = 'pending', worker = NULL, lease_until = NULL, "
+                        "attempts = MAX(0, attempts - 1) WHERE state = 'leased' AND worker = ?", (worker,))
+
+    def retry_failed(self) -> int:
+        cursor = self.db.execute("UPDATE tasks SET state = 'pending', attempts = 0 WHERE state = 'failed'")
+        return cursor.rowcount
+
+    def remaining(self) -> int:
+        """Indices not yet done or failed (pending or leased by someone)."""
+        return self.db.execute("SELECT COUNT(*) FROM tasks WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def counts(self) -> dict[str, int]:
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update(self.db.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state"))
+        return counts
+
+    def workers(self) -> list[tuple[str, int, float]]:
+        """(worker, leased indices, seconds until its earliest lease expires)."""
+        now = time.time()
+        return [(w, n, until - now) for w, n, until in self.db.execute(
+            "SELECT worker, COUNT(*), MIN(lease_until) FROM tasks WHERE state = 'leased' GROUP BY worker")]
+
+    def close(self):
+        self.db.close()
+
+
+def cli(argv: list[str] | None = None):
+    from results_store import open_store
+    from search_youtube import QUERIES_FILE
+
+    parser = argparse.ArgumentParser(description="Manage the shared search work queue")
+    parser.add_argument("--queue", default=str(QUEUE_FILE), help=f"Queue database (default: {QUEUE_FILE})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("init", help="Queue query indices from queries.txt (those with a stored result start as done)")
+    p.add_argument("--start", type=int, default=0, help="Start index")
+    p.add_argument("--end", type=int, default=None, help="End index")
+    p.add_argument("--overwrite", action="store_true", help="Queue indices again even if queued or done")
+    sub.add_parser("status", help="Counts by state and active workers")
+    sub.add_parser("retry-failed", help="Put failed indices back to pending")
+    args = parser.parse_args(argv)
+
+    queue = WorkQueue(Path(args.queue))
+    if args.command == "init":
+        all_queries = QUERIES_FILE.read_text().strip().split("\n")
+        queries = [(i + args.start, q) for i, q in enumerate(all_queries[args.start:args.end])]
+        store = open_store()
+        done = store.indices(args.start, args.start + len(queries))
+        store.close()
+        added = queue.fill(queries, done, args.overwrite)
+        print(f"Queued {added} of {len(queries)} indices ({len(done)} already have results)")
+    elif args.command == "retry-failed":
+        print(f"Requeued {queue.retry_failed()} failed indices")
+    for state, n in queue.counts().items():
+        print(f"  {state:<8} {n}")
+    for worker, n, expires in queue.workers():
+        status = f"lease expires in {expires:.0f}s" if expires > 0 else f"expired {-expires:.0f}s ago"
+        print(f"  worker {worker}: {n} leased, {status}")
+    queue.close()
+
+
+if __name__ == "__main__":
+    cli()
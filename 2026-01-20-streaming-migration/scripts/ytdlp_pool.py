@@ -0,0 +1,55 @@
+"""Pool of long-lived yt-dlp worker processes for YouTube searches.
+
+Spawning the yt-dlp CLI per query pays a full interpreter start and
+yt-dlp import every time, which costs more than the search itself. Each
+worker here imports yt_dlp and builds one YoutubeDL instance at startup,
+then serves searches until the pool is closed.
+"""
+
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+YDL_OPTIONS = {
+    "quiet": True,
+    "no_warnings": True,
+    "skip_download": True,
+    "extract_flat": True,
+}
+
+_ydl = None
+
+
+def _init_worker():
+    global _ydl
+    import yt_dlp
+
+    _ydl = yt_dlp.YoutubeDL(YDL_OPTIONS)
+
+
+def _search(query: str, n: int) -> tuple[list[dict] | None, str | None]:
+    """Returns (entries, error). Errors are returned as text so they pickle cleanly."""
+    try:
+        info = _ydl.extract_info(f"ytsearch{n}:{query}", download=False)
+    except Exception as e:
+        return None, str(e).strip()
+    return list(info.get("entries") or []), None
+
+
+class SearchPool:
+    """Run ytsearch queries on `workers` persistent yt-dlp processes."""
+
+    def __init__(self, workers: int):
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+
+    async def search(self, query: str, n: int = 1) -> tuple[list[dict] | None, str | None]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _search, query, n)
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()